@@ -63,7 +63,7 @@ INSTALLED_APPS = [
 
     'sso',
     'core.apps.CoreConfig',
-    'domestic',
+    'domestic.apps.DomesticConfig',
     'exportplan.apps.ExportPlanConfig',
     'users.apps.UsersConfig',
     'learn.apps.LearnConfig'
@@ -71,6 +71,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'wagtailcache.cache.UpdateCacheMiddleware',
+    'core.middleware.RequestCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -150,6 +151,40 @@ CACHES = {
 
 CACHE_EXPIRE_SECONDS = env.int('CACHE_EXPIRE_SECONDS', 60 * 30)  # 30 minutes
 
+# upstream responses shared by all users, e.g. per-country dataservices data, which changes at most daily
+SHARED_API_CACHE_TIMEOUT = env.int('SHARED_API_CACHE_TIMEOUT', 60 * 60 * 24)  # 24 hours
+# per namespace overrides, e.g.
+# SHARED_API_CACHE_TIMEOUTS="dataservices.country_data=3600;dataservices.population_data=604800"
+SHARED_API_CACHE_TIMEOUTS = env.dict('SHARED_API_CACHE_TIMEOUTS', cast={'value': int}, default={})
+# the SSO session user looked up by the authentication backend on every request, see sso.helpers
+SSO_SESSION_USER_CACHE_TIMEOUT = env.int('SSO_SESSION_USER_CACHE_TIMEOUT', 60)  # 1 minute
+# the user's company profile, invalidated by every company profile write made by this service, see sso.helpers
+COMPANY_PROFILE_CACHE_TIMEOUT = env.int('COMPANY_PROFILE_CACHE_TIMEOUT', 60 * 5)  # 5 minutes
+# the user's export plan pk, remembered by every export plan read and write
+EXPORTPLAN_PK_CACHE_TIMEOUT = env.int('EXPORTPLAN_PK_CACHE_TIMEOUT', 60 * 5)  # 5 minutes
+
+# last good upstream responses, served while they are refreshed in the background or when the upstream is failing.
+# Responses also in the shared cache are refreshed after its timeout for their namespace instead of the soft timeout
+API_FALLBACK_SOFT_TIMEOUT = env.int('API_FALLBACK_SOFT_TIMEOUT', 60 * 5)  # 5 minutes
+API_FALLBACK_TIMEOUT = env.int('API_FALLBACK_TIMEOUT', 60 * 60 * 24 * 7)  # 7 days
+
+# concurrent misses of the same shared cache key wait for one worker's fetch rather than all calling the upstream
+SINGLE_FLIGHT_WAIT = env.float('SINGLE_FLIGHT_WAIT', 2)
+SINGLE_FLIGHT_POLL_INTERVAL = env.float('SINGLE_FLIGHT_POLL_INTERVAL', 0.05)
+SINGLE_FLIGHT_LOCK_TIMEOUT = env.int('SINGLE_FLIGHT_LOCK_TIMEOUT', 20)
+
+# fail fast rather than waiting for the timeout when an upstream keeps failing, see core.circuit_breaker
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = env.int('CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5)
+CIRCUIT_BREAKER_FAILURE_WINDOW = env.int('CIRCUIT_BREAKER_FAILURE_WINDOW', 60)
+CIRCUIT_BREAKER_RESET_TIMEOUT = env.int('CIRCUIT_BREAKER_RESET_TIMEOUT', 30)
+
+# keep-alive connection pools for upstreams called without an API client, see core.http_sessions
+HTTP_POOL_MAXSIZE = env.int('HTTP_POOL_MAXSIZE', 10)
+# per upstream overrides, e.g. HTTP_POOL_MAXSIZES="commodity-search=20;sso-proxy=5"
+HTTP_POOL_MAXSIZES = env.dict('HTTP_POOL_MAXSIZES', cast={'value': int}, default={})
+HTTP_CONNECT_TIMEOUT = env.float('HTTP_CONNECT_TIMEOUT', 3.05)
+HTTP_READ_TIMEOUT = env.float('HTTP_READ_TIMEOUT', 15)
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
@@ -429,17 +464,45 @@ ENROLMENT_WELCOME_TEMPLATE_ID = env.str('ENROLMENT_WELCOME_TEMPLATE_ID', '0a4ae7
 GEOIP_PATH = os.path.join(ROOT_DIR, 'core/geolocation_data')
 GEOIP_COUNTRY = 'GeoLite2-Country.mmdb'
 GEOIP_CITY = 'GeoLite2-City.mmdb'
+GEOIP_LOOKUP_CACHE_SIZE = env.int('GEOIP_LOOKUP_CACHE_SIZE', 10000)
+GEOIP_RELOAD_CHECK_INTERVAL = env.int('GEOIP_RELOAD_CHECK_INTERVAL', 60)
 MAXMIND_LICENCE_KEY = env.str('MAXMIND_LICENCE_KEY')
 GEOLOCATION_MAXMIND_DATABASE_FILE_URL = env.str(
     'GEOLOCATION_MAXMIND_DATABASE_FILE_URL', 'https://download.maxmind.com/app/geoip_download'
 )
 
+# the core/fixtures datasets compiled to typed columns by manage.py compile_fixtures, see core.datasets
+COMPILED_FIXTURES_DIR = env.str('COMPILED_FIXTURES_DIR', os.path.join(ROOT_DIR, 'core/fixtures/compiled'))
+
 # directory-api
 DIRECTORY_API_CLIENT_BASE_URL = env.str('DIRECTORY_API_CLIENT_BASE_URL')
 DIRECTORY_API_CLIENT_API_KEY = env.str('DIRECTORY_API_CLIENT_API_KEY')
 DIRECTORY_API_CLIENT_SENDER_ID = 'directory'
 DIRECTORY_API_CLIENT_DEFAULT_TIMEOUT = 15
 
+# maximum number of upstream API reads a single request may make at the same time
+UPSTREAM_MAX_CONCURRENCY = env.int('UPSTREAM_MAX_CONCURRENCY', 5)
+
+# fire-and-forget upstream writes, run by manage.py run_task_worker. See core.tasks
+TASK_QUEUE_BACKEND = env.str('TASK_QUEUE_BACKEND', 'core.tasks.RedisBackend')
+TASK_MAX_ATTEMPTS = env.int('TASK_MAX_ATTEMPTS', 5)
+# doubled after each attempt
+TASK_RETRY_DELAY = env.float('TASK_RETRY_DELAY', 1)
+TASK_WORKER_POLL_TIMEOUT = env.int('TASK_WORKER_POLL_TIMEOUT', 1)
+TASK_FAILED_MAX = env.int('TASK_FAILED_MAX', 1000)
+
+# cached learning structure, cleared when lessons and modules are published, unpublished, moved or deleted
+LESSON_CACHE_TIMEOUT = env.int('LESSON_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# maximum number of countries the market comparison API compares in one request
+MARKET_COMPARISON_MAX_COUNTRIES = env.int('MARKET_COMPARISON_MAX_COUNTRIES', 10)
+
+# views of lessons are buffered and written together by the task worker. See core.page_views
+PAGE_VIEW_BUFFER_BACKEND = env.str('PAGE_VIEW_BUFFER_BACKEND', 'core.page_views.RedisBuffer')
+PAGE_VIEW_FLUSH_INTERVAL = env.int('PAGE_VIEW_FLUSH_INTERVAL', 10)
+PAGE_VIEW_FLUSH_BATCH_SIZE = env.int('PAGE_VIEW_FLUSH_BATCH_SIZE', 1000)
+PAGE_VIEW_FLUSH_LOCK_TIMEOUT = env.int('PAGE_VIEW_FLUSH_LOCK_TIMEOUT', 300)
+
 MADB_URL = env.str(
     'MADB_URL', 'https://www.check-duties-customs-exporting-goods.service.gov.uk'
 )
@@ -454,6 +517,8 @@ COMMODITY_SEARCH_REFINE_URL = env.str(
     'http://info.dev.3ceonline.com/ccce/apis/classify/v1/interactive/classify-continue'
 )
 COMMODITY_SEARCH_TOKEN = env.str('CCCE_COMMODITY_SEARCH_TOKEN', '')
+COMMODITY_SEARCH_CACHE_TIMEOUT = env.int('COMMODITY_SEARCH_CACHE_TIMEOUT', 60 * 30)  # 30 minutes
+COMMODITY_SEARCH_LOCAL_CACHE_SIZE = env.int('COMMODITY_SEARCH_LOCAL_CACHE_SIZE', 1000)
 
 # directory constants
 DIRECTORY_CONSTANTS_URL_SINGLE_SIGN_ON = env.str('DIRECTORY_CONSTANTS_URL_SINGLE_SIGN_ON', '')
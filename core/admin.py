@@ -7,3 +7,9 @@ from core import models
 class PageViewAdmin(admin.ModelAdmin):
     list_display = ('page', 'sso_id', 'list_page')
     list_filter = ('page', 'sso_id', 'list_page')
+
+
+@admin.register(models.ReadProgress)
+class ReadProgressAdmin(admin.ModelAdmin):
+    list_display = ('sso_id', 'module', 'read_count')
+    list_filter = ('module',)
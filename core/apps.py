@@ -1,4 +1,7 @@
 from django.apps import AppConfig
+from django.contrib.gis.geoip2 import GeoIP2Exception
+from django.db.models.signals import post_delete
+from wagtail.core.signals import page_published, page_unpublished, post_page_move
 
 
 class CoreConfig(AppConfig):
@@ -6,3 +9,28 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         from core import rules  # noqa F401
+        from directory_api_client import api_client
+        from directory_sso_api_client import sso_api_client
+        from core import circuit_breaker, geolocation, request_cache, signals
+        from core.models import CuratedListPage, DetailPage, ListPage
+
+        circuit_breaker.protect_api_client(api_client, circuit_breaker.directory_api_breaker)
+        circuit_breaker.protect_api_client(sso_api_client, circuit_breaker.directory_sso_api_breaker)
+        # outside the circuit breaker, so reads served from the request cache are never rejected
+        request_cache.memoize_api_client(api_client)
+        request_cache.memoize_api_client(sso_api_client)
+        for sender in (CuratedListPage, DetailPage):
+            page_published.connect(receiver=signals.refresh_lesson_navigation, sender=sender)
+            page_unpublished.connect(receiver=signals.refresh_lesson_navigation, sender=sender)
+            post_delete.connect(receiver=signals.invalidate_lesson_navigation, sender=sender)
+        for signal in (page_published, page_unpublished, post_delete):
+            signal.connect(receiver=signals.invalidate_read_progress_list_pages, sender=ListPage)
+        # both are by path, which changes when the page or any of its ancestors move
+        post_page_move.connect(receiver=signals.refresh_lesson_navigation)
+        post_page_move.connect(receiver=signals.invalidate_read_progress_list_pages)
+        try:
+            # mapped before the workers are forked, so they share the pages
+            geolocation.reader.refresh()
+        except GeoIP2Exception:
+            # not downloaded yet, opened on first lookup
+            pass
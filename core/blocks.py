@@ -1,8 +1,8 @@
 from wagtail.core import blocks
+from wagtail.core.models import Page
 from wagtail.images.blocks import ImageChooserBlock
 from wagtailmedia.blocks import AbstractMediaChooserBlock
 
-from django.core.exceptions import ObjectDoesNotExist
 from core import models
 from core.constants import RICHTEXT_FEATURES__MINIMAL
 
@@ -125,24 +125,61 @@ class RouteSectionBlock(blocks.StructBlock):
         icon = 'redirect'
 
 
+def get_internal_link(value):
+    try:
+        return value['link']['internal_link']
+    except (KeyError, TypeError):
+        return None
+
+
+def get_link_pages(page_ids):
+    """The specific pages by id, loaded with one query per page type, and the titles of their parents by path."""
+    pages = {page.pk: page for page in Page.objects.filter(pk__in=page_ids).specific()}
+    # the path of a page's parent is the page's path without its last step
+    parent_paths = {page.path[:-Page.steplen] for page in pages.values()}
+    parent_titles = dict(Page.objects.filter(path__in=parent_paths).values_list('path', 'title'))
+    return pages, parent_titles
+
+
 class SidebarLinkBlock(blocks.StructBlock):
     # a link to a learning page in the RH column
     link = LinkBlock(required=True)
     title_override = blocks.CharBlock(max_length=255, required=False)
     lede_override = blocks.CharBlock(max_length=255, required=False)
 
-    def render(self, value, context={}):
-        try:
-            internal_link = value['link']['internal_link']
-            value['target_lede'] = internal_link.get_parent() and internal_link.get_parent().title
-            value['target_title'] = internal_link.title
-            # If it's a detail page, get the read duration
-            if isinstance(internal_link.specific, models.DetailPage):
-                detail_page = (internal_link.specific.__class__.objects.get(id=internal_link.id))
-                value['read_time'] = getattr(detail_page, 'estimated_read_duration')
-        except (ObjectDoesNotExist, KeyError, TypeError, AttributeError):
-            pass
+    @staticmethod
+    def set_target(value, page, parent_titles):
+        if page is None:
+            return
+        value['target_lede'] = parent_titles.get(page.path[:-Page.steplen])
+        value['target_title'] = page.title
+        if isinstance(page, models.DetailPage):
+            value['read_time'] = page.estimated_read_duration
+
+    def bulk_to_python(self, values):
+        # Wagtail converts every side link in a section at once when the first is read, so their pages, parents and
+        # read times are loaded together rather than with a few queries per link
+        values = list(values)
+        page_ids = {(value.get('link') or {}).get('internal_link') for value in values} - {None}
+        pages, parent_titles = get_link_pages(page_ids)
+        struct_values = []
+        for value in values:
+            link = value.get('link') or {}
+            # the page is taken from those loaded above rather than looked up by the page chooser
+            struct_value = self.to_python({**value, 'link': {**link, 'internal_link': None}})
+            page = pages.get(link.get('internal_link'))
+            struct_value['link']['internal_link'] = page
+            self.set_target(struct_value, page, parent_titles)
+            struct_values.append(struct_value)
+        return struct_values
 
+    def render(self, value, context={}):
+        # set already if the link was loaded with the rest of its section, see bulk_to_python
+        if 'target_title' not in value:
+            page = get_internal_link(value)
+            if page:
+                pages, parent_titles = get_link_pages({page.pk})
+                self.set_target(value, pages.get(page.pk), parent_titles)
         return super().render(value, context=context)
 
     class Meta:
@@ -0,0 +1,256 @@
+from collections import OrderedDict
+import functools
+import hashlib
+import inspect
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django_redis.cache import RedisCache
+from redis.exceptions import LockError
+
+from core import concurrency
+from core.request_cache import freeze
+
+
+KEY_PREFIX = 'shared-api-cache'
+FALLBACK_KEY_PREFIX = 'api-fallback'
+HITS = 'hits'
+MISSES = 'misses'
+COALESCED = 'coalesced'
+
+
+def normalise(value):
+    # 'Germany ' and 'Germany', and ['15-19', '0-14'] and ['0-14', '15-19'] are the same request upstream. Case is
+    # left alone: the upstream may treat identifiers case sensitively
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return sorted((normalise(item) for item in value), key=repr)
+    if isinstance(value, dict):
+        return {key: normalise(item) for key, item in value.items()}
+    return value
+
+
+def make_key(namespace, func, args, kwargs, prefix=KEY_PREFIX):
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = freeze(normalise(dict(bound.arguments)))
+    digest = hashlib.md5(repr(arguments).encode()).hexdigest()
+    return f'{prefix}:{namespace}:{digest}'
+
+
+def get_timeout(namespace):
+    return settings.SHARED_API_CACHE_TIMEOUTS.get(namespace, settings.SHARED_API_CACHE_TIMEOUT)
+
+
+def increment_counter(namespace, outcome):
+    key = f'{KEY_PREFIX}:counters:{namespace}:{outcome}'
+    if isinstance(caches['default'], RedisCache):
+        # one INCR, which creates the key if it is missing, rather than a round trip each for add and incr
+        cache.incr(key, ignore_key_check=True)
+        return
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the key was evicted between add and incr, or the cache is disabled
+        pass
+
+
+def get_counters(namespace, outcomes=(HITS, MISSES, COALESCED)):
+    return {outcome: cache.get(f'{KEY_PREFIX}:counters:{namespace}:{outcome}', 0) for outcome in outcomes}
+
+
+class CacheLock:
+    """
+    A lock held by adding its key to a cache other than Redis, e.g. the in-process cache in tests and local
+    development. Only the holder releases it, though checking and deleting are two steps, as these caches are not
+    shared between servers.
+    """
+
+    def __init__(self, key, timeout):
+        self.key = key
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+
+    def acquire(self, blocking=False):
+        return cache.add(self.key, self.token, timeout=self.timeout)
+
+    def locked(self):
+        return cache.get(self.key) is not None
+
+    def release(self):
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+
+def get_lock(key, timeout):
+    if isinstance(caches['default'], RedisCache):
+        # released by a script that compares the holder's token and deletes the key in one step
+        return cache.lock(key, timeout=timeout)
+    return CacheLock(key, timeout)
+
+
+def release(lock):
+    try:
+        lock.release()
+    except LockError:
+        # the lock expired, and may have been taken by another worker, whose lock is not ours to release
+        pass
+
+
+def single_flight(namespace, key, fetch, timeout):
+    """
+    Fetches and caches the value of a missed `key`, but only in one worker at a time: the others wait up to
+    SINGLE_FLIGHT_WAIT seconds for it to appear in the cache rather than all calling the upstream at once. If the
+    fetching worker fails, or takes too long, the waiting workers fetch it themselves.
+    """
+    lock = get_lock(f'{key}:lock', timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT)
+    if lock.acquire(blocking=False):
+        try:
+            value = fetch()
+            cache.set(key, value, timeout=timeout)
+            return value
+        finally:
+            release(lock)
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            increment_counter(namespace, COALESCED)
+            return value
+        if not lock.locked():
+            break
+    value = fetch()
+    cache.set(key, value, timeout=timeout)
+    return value
+
+
+class LocalLRUCache:
+    """
+    Bounded in-process cache to put in front of the shared cache for very hot keys. Entries expire after their
+    timeout, and the least recently used entry is evicted once there are more than `maxsize`. Thread safe.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def read_through(namespace):
+    """
+    Caches the decorated upstream read in the default cache, shared by all users and workers. Use only for reads
+    whose response does not depend on the user. Keyed by namespace and the normalised arguments. Concurrent misses are
+    coalesced, see single_flight. Errors are never cached. `wrapper.warm(*args, **kwargs)` fetches from upstream and
+    stores the result regardless of the cache, and `wrapper.get_timeout()` is how long the result is kept.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(namespace, func, args, kwargs)
+            value = cache.get(key)
+            if value is not None:
+                increment_counter(namespace, HITS)
+                return value
+            increment_counter(namespace, MISSES)
+            return single_flight(namespace, key, functools.partial(func, *args, **kwargs), get_timeout(namespace))
+
+        def warm(*args, **kwargs):
+            value = func(*args, **kwargs)
+            cache.set(make_key(namespace, func, args, kwargs), value, timeout=get_timeout(namespace))
+            return value
+
+        wrapper.warm = warm
+        wrapper.get_timeout = functools.partial(get_timeout, namespace)
+        return wrapper
+    return decorator
+
+
+def refresh_in_background(key, fetch):
+    lock_key = f'{key}:refreshing'
+    # one refresh per key at a time across all workers, rather than one per request
+    if not caches['api_fallback'].add(lock_key, True, timeout=settings.API_FALLBACK_SOFT_TIMEOUT):
+        return
+
+    def refresh():
+        try:
+            return fetch()
+        finally:
+            caches['api_fallback'].delete(lock_key)
+
+    return concurrency.run_in_background(refresh)
+
+
+def get_soft_timeout(func):
+    # stacked on read_through, e.g. daily data is fetched at most daily however often it is read
+    if hasattr(func, 'get_timeout'):
+        return func.get_timeout()
+    return settings.API_FALLBACK_SOFT_TIMEOUT
+
+
+def stale_while_revalidate(namespace):
+    """
+    Serves the last good response of the decorated idempotent upstream read from the api_fallback cache. Once it is
+    older than API_FALLBACK_SOFT_TIMEOUT it is still served straight away, and refreshed in the background, so a slow
+    or failing upstream does not hold up the worker. Errors during the refresh are logged and the stale response is
+    kept until API_FALLBACK_TIMEOUT. Only the first read of a key waits for the upstream and raises its errors.
+    When stacked on read_through the response is only stale once the shared cache would have expired it, and the
+    refresh goes to the upstream through its `warm`, so it also updates the shared cache rather than reading back the
+    value it holds. `wrapper.warm(*args, **kwargs)` refreshes both.
+    """
+
+    def decorator(func):
+        upstream = getattr(func, 'warm', func)
+
+        def fetch(key, args, kwargs, read=func):
+            value = read(*args, **kwargs)
+            caches['api_fallback'].set(key, (time.time(), value), timeout=settings.API_FALLBACK_TIMEOUT)
+            return value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(namespace, func, args, kwargs, prefix=FALLBACK_KEY_PREFIX)
+            entry = caches['api_fallback'].get(key)
+            if entry is None:
+                return fetch(key, args, kwargs)
+            fetched_at, value = entry
+            if time.time() - fetched_at >= get_soft_timeout(func):
+                refresh_in_background(key, functools.partial(fetch, key, args, kwargs, read=upstream))
+            return value
+
+        def warm(*args, **kwargs):
+            key = make_key(namespace, func, args, kwargs, prefix=FALLBACK_KEY_PREFIX)
+            return fetch(key, args, kwargs, read=upstream)
+
+        wrapper.warm = warm
+        return wrapper
+    return decorator
@@ -0,0 +1,119 @@
+import functools
+from logging import getLogger
+import time
+
+from requests.exceptions import RequestException
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import increment_counter
+
+
+KEY_PREFIX = 'circuit-breaker'
+OPENED = 'opened'
+CLOSED = 'closed'
+
+logger = getLogger(__name__)
+
+
+class CircuitBreakerOpen(RequestException):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing, so workers fail fast rather than waiting for the timeout.
+
+    Connection errors, timeouts and 5xx responses are failures. After CIRCUIT_BREAKER_FAILURE_THRESHOLD failures
+    within CIRCUIT_BREAKER_FAILURE_WINDOW seconds the breaker opens and calls raise CircuitBreakerOpen. After
+    CIRCUIT_BREAKER_RESET_TIMEOUT seconds one probe call is let through (half-open): success closes the breaker,
+    failure opens it again. The state lives in the default cache so all workers trip together, and each process
+    remembers when the breaker opened so rejecting a call does not need a round trip to the cache.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.opened_until = 0
+
+    def get_key(self, suffix):
+        return f'{KEY_PREFIX}:{self.name}:{suffix}'
+
+    def record_transition(self, transition):
+        logger.warning(f'Circuit breaker {self.name} {transition}')
+        increment_counter(f'{KEY_PREFIX}.{self.name}', transition)
+
+    def open(self):
+        opened_at = time.time()
+        self.opened_until = opened_at + settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+        cache.set(self.get_key(OPENED), opened_at, timeout=None)
+        cache.delete_many([self.get_key('failures'), self.get_key('probe')])
+        self.record_transition(OPENED)
+
+    def close(self):
+        self.opened_until = 0
+        cache.delete_many([self.get_key(OPENED), self.get_key('failures'), self.get_key('probe')])
+        self.record_transition(CLOSED)
+
+    def reject(self):
+        raise CircuitBreakerOpen(f'Circuit breaker {self.name} is open')
+
+    def before_call(self):
+        """Returns whether the call is the half-open probe, or raises CircuitBreakerOpen."""
+        if time.time() < self.opened_until:
+            self.reject()
+        opened_at = cache.get(self.get_key(OPENED))
+        if opened_at is None:
+            return False
+        self.opened_until = opened_at + settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+        if time.time() < self.opened_until:
+            self.reject()
+        if not cache.add(self.get_key('probe'), True, timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT):
+            self.reject()
+        return True
+
+    def record_failure(self, is_probe):
+        if is_probe:
+            self.open()
+            return
+        key = self.get_key('failures')
+        cache.add(key, 0, timeout=settings.CIRCUIT_BREAKER_FAILURE_WINDOW)
+        try:
+            failures = cache.incr(key)
+        except ValueError:
+            # the window expired between add and incr, or the cache is disabled
+            return
+        if failures >= settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD:
+            self.open()
+
+    def call(self, func, *args, **kwargs):
+        is_probe = self.before_call()
+        try:
+            response = func(*args, **kwargs)
+        except RequestException:
+            self.record_failure(is_probe)
+            raise
+        if response.status_code >= 500:
+            self.record_failure(is_probe)
+        elif is_probe:
+            self.close()
+        return response
+
+    def protect(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return wrapper
+
+
+def protect_api_client(client, breaker):
+    # every resource client (e.g. api_client.dataservices) sends its own requests
+    clients = [client] + [value for value in vars(client).values() if hasattr(value, 'send')]
+    for item in clients:
+        item.send = breaker.protect(item.send)
+
+
+directory_api_breaker = CircuitBreaker('directory-api')
+directory_sso_api_breaker = CircuitBreaker('directory-sso-api')
+sso_proxy_breaker = CircuitBreaker('sso-proxy')
+commodity_search_breaker = CircuitBreaker('commodity-search')
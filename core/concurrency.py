@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+import functools
+from logging import getLogger
+
+from django.conf import settings
+
+from core import request_cache
+
+
+BACKGROUND_CALL_ERROR = 'Background upstream call failed'
+
+logger = getLogger(__name__)
+
+
+def run_concurrently(*calls):
+    """
+    Runs independent upstream reads at the same time on a bounded thread pool, so the latency is that of the
+    slowest call rather than the sum of all of them. Results are returned in the order the calls were given, and
+    the exception (e.g., HTTPError or a requests Timeout) of the first failing call is re-raised, as the serial code
+    would. The calls must not touch the database: each thread would open its own connection.
+    """
+    cache = request_cache.get_current()
+
+    def run(call):
+        if cache:
+            request_cache.activate(cache)
+        try:
+            return call()
+        finally:
+            request_cache.deactivate()
+
+    max_workers = max(min(len(calls), settings.UPSTREAM_MAX_CONCURRENCY), 1)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upstream') as executor:
+        futures = [executor.submit(run, call) for call in calls]
+        return [future.result() for future in futures]
+
+
+@functools.lru_cache(maxsize=None)
+def get_background_executor():
+    # created lazily so each forked worker process gets its own threads
+    return ThreadPoolExecutor(max_workers=settings.UPSTREAM_MAX_CONCURRENCY, thread_name_prefix='upstream-background')
+
+
+def log_background_call_error(future):
+    if future.exception():
+        logger.error(BACKGROUND_CALL_ERROR, exc_info=future.exception())
+
+
+def run_in_background(call):
+    """Fire-and-forget an upstream write whose result nobody reads. Errors are logged rather than raised."""
+    future = get_background_executor().submit(call)
+    future.add_done_callback(log_background_call_error)
+    return future
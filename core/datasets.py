@@ -0,0 +1,241 @@
+import collections.abc
+import csv
+import functools
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from array import array
+
+from django.conf import settings
+
+
+MAGIC = b'GRFX'
+HEADER_LENGTH = struct.Struct('<I')
+NUMBER_TYPECODE = 'd'
+CODE_TYPECODE = 'I'
+ALIGNMENT = 8
+MISSING_VALUES = ('', '...')
+
+
+class Dataset:
+    """
+    A CSV fixture in core/fixtures. Values are read from the first row after the header row, which is the first row
+    whose first cell is `header`, or the first row of the file. The columns in `text_columns` are kept as strings,
+    every other named column is a float64, with NaN for missing values.
+    """
+
+    def __init__(self, file_name, text_columns, header=None, first_column=None):
+        self.file_name = file_name
+        self.text_columns = text_columns
+        self.header = header
+        # the name of the first column if its header cell is empty
+        self.first_column = first_column
+
+    @property
+    def path(self):
+        return os.path.join(settings.ROOT_DIR, 'core/fixtures', self.file_name)
+
+
+DATASETS = {
+    'populations': Dataset(
+        'countries-populations.csv',
+        header='Index',
+        text_columns=('Variant', 'Region, subregion, country or area *', 'Notes', 'Type'),
+    ),
+    'populations_male': Dataset(
+        'countries-populations-male.csv',
+        header='Index',
+        text_columns=('Variant', 'Region, subregion, country or area *', 'Notes', 'Type'),
+    ),
+    'populations_female': Dataset(
+        'countries-populations-female.csv',
+        header='Index',
+        text_columns=('Variant', 'Region, subregion, country or area *', 'Notes', 'Type'),
+    ),
+    'urban_rural': Dataset(
+        'countries-urban-rural.csv',
+        header='Index',
+        text_columns=('Region, subregion, country or area', 'Note'),
+    ),
+    'consumer_price_index': Dataset(
+        'countries-consumer-price-index.csv',
+        header='Country Name',
+        text_columns=('Country Name', 'Country Code', 'Indicator Name', 'Indicator Code'),
+    ),
+    'average_income': Dataset('countries-average-income.csv', first_column='Country', text_columns=('Country',)),
+    'sectors_export': Dataset(
+        'countries-sectors-export.csv', text_columns=('country', 'sector', 'service', 'type', 'source'),
+    ),
+}
+
+
+class TextColumn(collections.abc.Sequence):
+    """Dictionary encoded strings: `values` holds each distinct string once, `codes` the index of each row's."""
+
+    def __init__(self, values, codes):
+        self.values = values
+        self.codes = codes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.values[code] for code in self.codes[index]]
+        return self.values[self.codes[index]]
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class Table:
+    """
+    Columns of a dataset by name. Number columns are typed arrays, memory mapped from the compiled file when there is
+    one, so they are shared by every process on the instance rather than copied into each.
+    """
+
+    def __init__(self, columns, length, buffer=None):
+        self.columns = columns
+        self.length = length
+        # keeps the memory map open while the columns refer to it
+        self.buffer = buffer
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.length
+
+    def rows(self):
+        names = list(self.columns)
+        for values in zip(*(self.columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+
+def normalise_header(value):
+    # e.g. 'Country\ncode'
+    return re.sub(r'\s+', ' ', value).strip()
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        # e.g. '  166 077' thousands separated by spaces
+        value = re.sub(r'\s+', '', value)
+        return math.nan if value in MISSING_VALUES else float(value)
+
+
+def read_rows(dataset):
+    with open(dataset.path, 'r', newline='') as f:
+        rows = csv.reader(f)
+        for row in rows:
+            if dataset.header is None or (row and row[0] == dataset.header):
+                header = [normalise_header(value) for value in row]
+                break
+        else:
+            raise ValueError(f'{dataset.file_name} has no header row')
+        if dataset.first_column and not header[0]:
+            header[0] = dataset.first_column
+        for row in rows:
+            if any(value.strip() for value in row):
+                yield {name: value for name, value in zip(header, row) if name}
+
+
+def parse(dataset):
+    """Reads the dataset from its CSV into a Table, for when it has not been compiled."""
+    columns = collections.defaultdict(list)
+    length = 0
+    for row in read_rows(dataset):
+        for name, value in row.items():
+            columns[name].append(value if name in dataset.text_columns else parse_number(value))
+        length += 1
+    return Table(columns={name: make_column(name, values, dataset) for name, values in columns.items()}, length=length)
+
+
+def make_column(name, values, dataset):
+    if name in dataset.text_columns:
+        distinct = list(dict.fromkeys(values))
+        codes = {value: code for code, value in enumerate(distinct)}
+        return TextColumn(values=distinct, codes=array(CODE_TYPECODE, (codes[value] for value in values)))
+    return array(NUMBER_TYPECODE, values)
+
+
+def get_compiled_path(name):
+    return os.path.join(settings.COMPILED_FIXTURES_DIR, f'{name}.bin')
+
+
+def align(offset):
+    return offset + -offset % ALIGNMENT
+
+
+def compile_dataset(name):
+    """
+    Writes the dataset to a file of typed columns: the magic number, the length of the JSON header, the header, and
+    then each column's array 8 byte aligned. Text columns store their distinct values in the header.
+    """
+    dataset = DATASETS[name]
+    table = parse(dataset)
+    columns = []
+    buffers = []
+    for column_name, column in table.columns.items():
+        if isinstance(column, TextColumn):
+            buffers.append(column.codes.tobytes())
+            columns.append({'name': column_name, 'typecode': CODE_TYPECODE, 'values': column.values})
+        else:
+            buffers.append(column.tobytes())
+            columns.append({'name': column_name, 'typecode': NUMBER_TYPECODE})
+    # offsets are relative to the end of the header
+    offset = 0
+    for column, data in zip(columns, buffers):
+        column['offset'] = offset
+        offset = align(offset + len(data))
+    header = json.dumps({
+        'source_mtime_ns': os.stat(dataset.path).st_mtime_ns, 'length': table.length, 'columns': columns,
+    }).encode()
+    path = get_compiled_path(name)
+    os.makedirs(settings.COMPILED_FIXTURES_DIR, exist_ok=True)
+    # written alongside and then renamed over the old file, so processes that have it memory mapped keep reading it
+    with open(path + '.compiling', 'wb') as f:
+        f.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        f.write(b'\0' * (align(f.tell()) - f.tell()))
+        for data in buffers:
+            f.write(data)
+            f.write(b'\0' * (align(len(data)) - len(data)))
+    os.replace(path + '.compiling', path)
+    return path
+
+
+def load_compiled(name):
+    """Memory maps the compiled dataset, or returns None if it has not been compiled since its CSV changed."""
+    path = get_compiled_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        return None
+    start = len(MAGIC) + HEADER_LENGTH.size
+    header_length, = HEADER_LENGTH.unpack(buffer[len(MAGIC):start])
+    header = json.loads(buffer[start:start + header_length])
+    if header['source_mtime_ns'] != os.stat(DATASETS[name].path).st_mtime_ns:
+        return None
+    data = memoryview(buffer)[align(start + header_length):]
+    columns = {}
+    for column in header['columns']:
+        size = array(column['typecode']).itemsize * header['length']
+        values = data[column['offset']:column['offset'] + size].cast(column['typecode'])
+        columns[column['name']] = TextColumn(column['values'], values) if 'values' in column else values
+    return Table(columns=columns, length=header['length'], buffer=buffer)
+
+
+@functools.lru_cache(maxsize=None)
+def get_table(name):
+    """
+    Loads the named dataset the first time it is used, from the file written by manage.py compile_fixtures if it is
+    current, or else from its CSV.
+    """
+    table = load_compiled(name)
+    if table is None:
+        table = parse(DATASETS[name])
+    return table
@@ -0,0 +1,155 @@
+import functools
+import math
+import re
+
+from directory_constants import choices
+from iso3166 import countries_by_alpha2
+
+from core import datasets
+
+
+COUNTRY_CODE = 'Country code'
+COUNTRY_NAME = 'Region, subregion, country or area *'
+COUNTRY_TYPE = 'Country/Area'
+YEAR = 'Reference date (as of 1 July)'
+PERCENTAGE_URBAN = 'Percentage urban'
+AGE_RANGE_PATTERN = re.compile(r'^(\d+)(?:-(\d+)|\+)$')
+
+
+def parse_age_range(value):
+    """'25-34' is (25, 34) and '65+' is (65, None). Raises ValueError for anything else."""
+    match = AGE_RANGE_PATTERN.match(value.strip())
+    if not match:
+        raise ValueError(f'{value} is not an age range')
+    start, end = match.groups()
+    return int(start), None if end is None else int(end)
+
+
+def is_missing(value):
+    return math.isnan(value)
+
+
+class Populations:
+    """
+    The UN World Population Prospects estimates in core/fixtures: the population of each country by year and five year
+    age band for each sex, in thousands. The rows of each country and year are indexed once, then a query sums the
+    band columns at that row, so answering one is a handful of array reads rather than a scan of the CSV.
+    """
+
+    def __init__(self, male, female, urban_rural):
+        self.tables = {'male': male, 'female': female}
+        self.bands = [(name, *parse_age_range(name)) for name in male.columns if AGE_RANGE_PATTERN.match(name)]
+        self.rows = {sex: self.index_rows(table) for sex, table in self.tables.items()}
+        self.latest_years = {}
+        for code, year in self.rows['male']:
+            self.latest_years[code] = max(year, self.latest_years.get(code, year))
+        self.codes = self.index_country_names(male)
+        self.percentages_urban = {
+            int(code): percentage / 100
+            for code, percentage in zip(urban_rural[COUNTRY_CODE], urban_rural[PERCENTAGE_URBAN])
+            if not is_missing(code) and not is_missing(percentage)
+        }
+
+    @staticmethod
+    def index_rows(table):
+        return {
+            (int(code), int(year)): row
+            for row, (code, year, row_type) in enumerate(zip(table[COUNTRY_CODE], table[YEAR], table['Type']))
+            if row_type == COUNTRY_TYPE
+        }
+
+    @staticmethod
+    def index_country_names(table):
+        codes = {
+            name: int(code) for name, code, row_type in zip(table[COUNTRY_NAME], table[COUNTRY_CODE], table['Type'])
+            if row_type == COUNTRY_TYPE
+        }
+        # the names the export plan offers, e.g. 'United States' rather than 'United States of America'
+        for alpha2, name in choices.COUNTRY_CHOICES:
+            country = countries_by_alpha2.get(alpha2)
+            if country:
+                codes.setdefault(name, int(country.numeric))
+        return codes
+
+    def get_country_code(self, country):
+        """The ISO 3166 numeric code of the country, or None if there are no estimates for it."""
+        code = self.codes.get(country)
+        return code if code in self.latest_years else None
+
+    def get_bands(self, age_ranges):
+        """The names of the bands that make up the age ranges. Raises ValueError if a range does not fit the bands."""
+        names = set()
+        for age_range in age_ranges:
+            start, end = parse_age_range(age_range)
+            matched = [
+                band for band in self.bands
+                if band[1] >= start and (end is None or (band[2] is not None and band[2] <= end))
+            ]
+            # the bands are contiguous, so they cover the range if they start and end with it
+            if not matched or matched[0][1] != start or matched[-1][2] != end:
+                raise ValueError(f'{age_range} does not fit the five year age bands')
+            names.update(name for name, _, _ in matched)
+        return names
+
+    def sum(self, sex, code, year, bands):
+        table = self.tables[sex]
+        row = self.rows[sex][(code, year)]
+        return math.fsum(value for value in (table[band][row] for band in bands) if not is_missing(value))
+
+    def get_population_data(self, country, target_ages, year=None):
+        """
+        The population of the country in the target age ranges, in the shape of the dataservices population data.
+        Returns None if the country is not in the estimates, the year is not estimated or an age range does not fit
+        the five year bands, for the caller to ask dataservices instead.
+        """
+        return self.get_population_data_by_country([country], target_ages, year)[country]
+
+    def get_population_data_by_country(self, countries, target_ages, year=None):
+        """get_population_data for each of the countries, by country. The age ranges are resolved to bands once."""
+        try:
+            bands = self.get_bands(target_ages)
+        except ValueError:
+            return {country: None for country in countries}
+        return {country: self.get_country_population_data(country, target_ages, bands, year) for country in countries}
+
+    def get_country_population_data(self, country, target_ages, bands, year):
+        code = self.get_country_code(country)
+        if code is None:
+            return None
+        year = year or self.latest_years[code]
+        if (code, year) not in self.rows['male'] or (code, year) not in self.rows['female']:
+            return None
+        all_bands = [name for name, _, _ in self.bands]
+        male = self.sum('male', code, year, bands)
+        female = self.sum('female', code, year, bands)
+        percentage_urban = self.percentages_urban.get(code)
+        return {
+            'population_data': {
+                'country': country,
+                'target_ages': target_ages,
+                'year': year,
+                'total_population': self.sum('male', code, year, all_bands) + self.sum('female', code, year, all_bands),
+                'male_target_age_population': male,
+                'female_target_age_population': female,
+                'total_target_age_population': male + female,
+                'urban_percentage': percentage_urban,
+                'rural_percentage': None if percentage_urban is None else 1 - percentage_urban,
+            }
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_populations():
+    return Populations(
+        male=datasets.get_table('populations_male'),
+        female=datasets.get_table('populations_female'),
+        urban_rural=datasets.get_table('urban_rural'),
+    )
+
+
+def get_population_data(country, target_ages, year=None):
+    return get_populations().get_population_data(country, target_ages, year)
+
+
+def get_population_data_by_country(countries, target_ages, year=None):
+    return get_populations().get_population_data_by_country(countries, target_ages, year)
@@ -0,0 +1,59 @@
+import functools
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.gis.geoip2 import GeoIP2
+
+
+class GeoIPReader:
+    """
+    Process wide GeoIP2 reader. The MaxMind databases are memory mapped once rather than reopened for every lookup,
+    and when they are opened before gunicorn forks its workers (--preload) the mapped pages are shared between them.
+    The results of the most recent lookups are kept in an LRU cache. At most every GEOIP_RELOAD_CHECK_INTERVAL
+    seconds the database files are checked, and reopened if download_geolocation_data has installed new ones.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.geoip = None
+        self.signature = None
+        self.checked_at = 0
+
+    def get_signature(self):
+        paths = [os.path.join(settings.GEOIP_PATH, name) for name in (settings.GEOIP_CITY, settings.GEOIP_COUNTRY)]
+        return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths)
+
+    def open(self):
+        # raises GeoIP2Exception if neither database can be read
+        signature = self.get_signature()
+        # MODE_AUTO maps the file with the maxminddb C extension if it is installed, or in pure Python otherwise
+        geoip = GeoIP2(settings.GEOIP_PATH, cache=GeoIP2.MODE_AUTO)
+        self.lookup_city = functools.lru_cache(maxsize=self.maxsize)(geoip.city)
+        self.lookup_country = functools.lru_cache(maxsize=self.maxsize)(geoip.country)
+        # the previous reader is closed once the threads still using it let go of it
+        self.geoip = geoip
+        self.signature = signature
+        self.checked_at = time.monotonic()
+
+    def refresh(self):
+        with self.lock:
+            if self.geoip is None:
+                self.open()
+            elif time.monotonic() - self.checked_at >= settings.GEOIP_RELOAD_CHECK_INTERVAL:
+                self.checked_at = time.monotonic()
+                if self.get_signature() != self.signature:
+                    self.open()
+
+    def city(self, ip):
+        self.refresh()
+        return self.lookup_city(ip)
+
+    def country(self, ip):
+        self.refresh()
+        return self.lookup_country(ip)
+
+
+reader = GeoIPReader(maxsize=settings.GEOIP_LOOKUP_CACHE_SIZE)
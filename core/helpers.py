@@ -1,59 +1,35 @@
 from collections import Counter
 from difflib import SequenceMatcher
 from logging import getLogger
-import csv
-from io import StringIO
 import functools
+import hashlib
+import itertools
+import json
 
 from directory_api_client import api_client
 import great_components.helpers
 from directory_constants import choices
 from directory_sso_api_client import sso_api_client
 from ipware import get_client_ip
-import requests
 
-from django.contrib.gis.geoip2 import GeoIP2, GeoIP2Exception
+from django.contrib.gis.geoip2 import GeoIP2Exception
 from django.conf import settings
+from django.utils.functional import cached_property
 
+from core import cache, circuit_breaker, datasets, geolocation, http_sessions, request_cache, tasks
 from core.serializers import parse_opportunities, parse_events
+from sso import helpers as sso_helpers
 
 USER_LOCATION_CREATE_ERROR = 'Unable to save user location'
 USER_LOCATION_DETERMINE_ERROR = 'Unable to determine user location'
 MALE = 'xy'
 FEMALE = 'xx'
+COMMODITY_SEARCH_CACHE_NAMESPACE = 'commodity_search'
 
 
 logger = getLogger(__name__)
 
 
-with open(settings.ROOT_DIR + 'core/fixtures/countries-populations.csv', 'r') as f:
-    country_population_data = f.read()
-
-
-with open(settings.ROOT_DIR + 'core/fixtures/countries-populations-male.csv', 'r') as f:
-    country_population_data_male = f.read()
-
-
-with open(settings.ROOT_DIR + 'core/fixtures/countries-populations-female.csv', 'r') as f:
-    country_population_data_female = f.read()
-
-
-with open(settings.ROOT_DIR + 'core/fixtures/countries-sectors-export.csv', 'r') as f:
-    countries_sectors = f.read()
-
-
-with open(settings.ROOT_DIR + 'core/fixtures/countries-average-income.csv', 'r') as f:
-    country_average_income_data = f.read()
-
-
-with open(settings.ROOT_DIR + 'core/fixtures/countries-urban-rural.csv', 'r') as f:
-    country_urban_rural_data = f.read()
-
-
-with open(settings.ROOT_DIR + 'core/fixtures/countries-consumer-price-index.csv', 'r') as f:
-    country_consumer_price_index_data = f.read()
-
-
 population_age_range_choices = [
     '0-8',
     '5-9',
@@ -83,7 +59,7 @@ def get_location(request):
     client_ip, is_routable = get_client_ip(request)
     if client_ip and is_routable:
         try:
-            city = GeoIP2().city(client_ip)
+            city = geolocation.reader.city(client_ip)
         except GeoIP2Exception:
             logger.error(USER_LOCATION_DETERMINE_ERROR)
         else:
@@ -99,26 +75,37 @@ def get_location(request):
 def store_user_location(request):
     location = get_location(request)
     if location:
-        response = api_client.personalisation.user_location_create(
-            sso_session_id=request.user.session_id,
-            data=location
-        )
-        if not response.ok:
-            logger.error(USER_LOCATION_CREATE_ERROR)
+        create_user_location.enqueue(sso_session_id=request.user.session_id, location=location)
+
+
+@tasks.task
+def create_user_location(sso_session_id, location):
+    response = api_client.personalisation.user_location_create(sso_session_id=sso_session_id, data=location)
+    if response.status_code >= 500:
+        # raised to be retried
+        response.raise_for_status()
+    if not response.ok:
+        logger.error(USER_LOCATION_CREATE_ERROR)
 
 
+@tasks.task
+@request_cache.invalidates('company.profile')
 def update_company_profile(data, sso_session_id):
     response = api_client.company.profile_update(sso_session_id=sso_session_id, data=data)
     response.raise_for_status()
+    sso_helpers.invalidate_cached_company_profile(sso_session_id)
     return response
 
 
+@request_cache.invalidates('sso.user_profile')
 def create_user_profile(data, sso_session_id):
     response = sso_api_client.user.create_user_profile(sso_session_id=sso_session_id, data=data)
     response.raise_for_status()
+    sso_helpers.invalidate_cached_session_user(sso_session_id)
     return response
 
 
+@request_cache.memoize('personalisation.events')
 def get_dashboard_events(sso_session_id):
     results = api_client.personalisation.events_by_location_list(sso_session_id)
     if (results.status_code == 200):
@@ -175,35 +162,38 @@ class CompanyParser(great_components.helpers.CompanyParser):
     def __getattr__(self, name):
         return self.data.get(name)
 
-    @property
+    # the labels are worked out once per parser, as templates read them many times per request. `data` is not
+    # changed after the parser is created: build a new parser instead
+
+    @cached_property
     def expertise_industries_labels(self):
         if self.data['expertise_industries']:
             return values_to_labels(values=self.data['expertise_industries'], choices=self.INDUSTRIES)
         return []
 
-    @property
+    @cached_property
     def expertise_countries_labels(self):
         return values_to_labels(
             values=self.data['expertise_countries'], choices=self.COUNTRIES
         ) if self.data.get('expertise_countries') else []
 
-    @property
+    @cached_property
     def expertise_countries_value_label_pairs(self):
         if self.data['expertise_countries']:
             return values_to_value_label_pairs(values=self.data['expertise_countries'], choices=self.COUNTRIES)
         return []
 
-    @property
+    @cached_property
     def expertise_industries_value_label_pairs(self):
         if self.data['expertise_industries']:
             return values_to_value_label_pairs(values=self.data['expertise_industries'], choices=self.INDUSTRIES)
         return []
 
-    @property
+    @cached_property
     def expertise_products_services(self):
         return self.data['expertise_products_services'].get('other', [])
 
-    @property
+    @cached_property
     def expertise_products_value_label_pairs(self):
         return [{'value': item, 'label': item} for item in self.expertise_products_services]
 
@@ -216,8 +206,9 @@ def values_to_value_label_pairs(values, choices):
     return [{'value': item, 'label': choices.get(item)} for item in values if item in choices]
 
 
-def search_commodity_by_term(term):
-    response = requests.post(
+def fetch_commodity_search(term):
+    response = circuit_breaker.commodity_search_breaker.call(
+        http_sessions.get_session(http_sessions.COMMODITY_SEARCH).post,
         url=settings.COMMODITY_SEARCH_URL,
         json={
             'proddesc': term,
@@ -225,7 +216,6 @@ def search_commodity_by_term(term):
         },
         headers={
             'Accept': '*/*',
-            'Accept-Encoding': 'gzip, deflate',
             'Content-Type': 'application/json',
             'Authorization': settings.COMMODITY_SEARCH_TOKEN,
         }
@@ -235,8 +225,52 @@ def search_commodity_by_term(term):
     return response.json()
 
 
-def search_commodity_refine(interraction_id, tx_id, values):
-    response = requests.post(
+commodity_search_local_cache = cache.LocalLRUCache(maxsize=settings.COMMODITY_SEARCH_LOCAL_CACHE_SIZE)
+
+
+def singularise(word):
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'zes', 'ches', 'shes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def normalise_commodity_search_term(term):
+    # 'Whiskies ', 'whisky' and 'WHISKY' are the same search
+    return ' '.join(singularise(word) for word in term.lower().split())
+
+
+def get_commodity_search_cache_key(*request):
+    digest = hashlib.md5(json.dumps(request, sort_keys=True).encode()).hexdigest()
+    return f'{COMMODITY_SEARCH_CACHE_NAMESPACE}:{digest}'
+
+
+def read_commodity_search(key, fetch):
+    # the 3CE responses do not depend on the user, so they are shared by everyone making the same request
+    value = commodity_search_local_cache.get(key)
+    if value is None:
+        value = cache.cache.get(key)
+        if value is None:
+            cache.increment_counter(COMMODITY_SEARCH_CACHE_NAMESPACE, cache.MISSES)
+            value = fetch()
+            cache.cache.set(key, value, timeout=settings.COMMODITY_SEARCH_CACHE_TIMEOUT)
+        else:
+            cache.increment_counter(COMMODITY_SEARCH_CACHE_NAMESPACE, cache.HITS)
+        commodity_search_local_cache.set(key, value, timeout=settings.COMMODITY_SEARCH_CACHE_TIMEOUT)
+    return value
+
+
+def search_commodity_by_term(term):
+    key = get_commodity_search_cache_key('start', normalise_commodity_search_term(term))
+    return read_commodity_search(key, functools.partial(fetch_commodity_search, term))
+
+
+def fetch_commodity_refine(interraction_id, tx_id, values):
+    response = circuit_breaker.commodity_search_breaker.call(
+        http_sessions.get_session(http_sessions.COMMODITY_SEARCH).post,
         url=settings.COMMODITY_SEARCH_REFINE_URL,
         json={
             'state': 'continue',
@@ -246,7 +280,6 @@ def search_commodity_refine(interraction_id, tx_id, values):
         },
         headers={
             'Accept': '*/*',
-            'Accept-Encoding': 'gzip, deflate',
             'Content-Type': 'application/json',
             'Authorization': settings.COMMODITY_SEARCH_TOKEN,
         }
@@ -255,11 +288,60 @@ def search_commodity_refine(interraction_id, tx_id, values):
     return response.json()
 
 
+def search_commodity_refine(interraction_id, tx_id, values):
+    # keyed on the whole refine state, the transaction, the question answered and the answers, so a search refined
+    # differently is never served another's result
+    key = get_commodity_search_cache_key('refine', tx_id, interraction_id, values)
+    return read_commodity_search(key, functools.partial(fetch_commodity_refine, interraction_id, tx_id, values))
+
+
+@functools.lru_cache(maxsize=None)
+def get_export_destinations_index():
+    """
+    Maps each top level sector in the export fixture to the countries exported to in it, most exported to first, as
+    (country, count, first row) so rankings of several sectors can be merged exactly as if the rows were counted
+    together. Built once per process, so a sector lookup matches the label against the sectors, not every row.
+    """
+    table = datasets.get_table('sectors_export')
+    countries, sectors = table['country'], table['sector']
+    # row has multi level delimited by ' :'. Get top level.
+    sector_labels = [value.split(' :')[0] for value in sectors.values]
+    index = {}
+    for position, (country_code, sector_code) in enumerate(zip(countries.codes, sectors.codes)):
+        destinations = index.setdefault(sector_labels[sector_code], {})
+        count, first_row = destinations.get(country_code, (0, position))
+        destinations[country_code] = (count + 1, first_row)
+    return {
+        sector_label: rank_export_destinations(
+            (countries.values[country_code], count, first_row)
+            for country_code, (count, first_row) in destinations.items()
+        )
+        for sector_label, destinations in index.items()
+    }
+
+
+def rank_export_destinations(destinations):
+    # ties are broken by which was exported to first in the fixture, as Counter.most_common does
+    return sorted(destinations, key=lambda destination: (-destination[1], destination[2]))
+
+
 @functools.lru_cache(maxsize=None)
 def get_popular_export_destinations(sector_label):
-    export_destinations = Counter()
-    for row in csv.DictReader(StringIO(countries_sectors), delimiter=','):
-        row_sector_label = row['sector'].split(' :')[0]  # row has multi level delimited by ' :'. Get top level.
-        if is_fuzzy_match(label_a=row_sector_label, label_b=sector_label):
-            export_destinations.update([row['country']])
-    return export_destinations.most_common(5)
+    rankings = [
+        ranking for row_sector_label, ranking in get_export_destinations_index().items()
+        if is_fuzzy_match(label_a=row_sector_label, label_b=sector_label)
+    ]
+    if len(rankings) == 1:
+        ranking = rankings[0]
+    else:
+        merged = {}
+        for country, count, first_row in itertools.chain.from_iterable(rankings):
+            merged_count, merged_first_row = merged.get(country, (0, first_row))
+            merged[country] = (merged_count + count, min(merged_first_row, first_row))
+        ranking = rank_export_destinations((country, *value) for country, value in merged.items())
+    return [(country, count) for country, count, _ in ranking[:5]]
+
+
+def get_top_export_destinations(count):
+    export_destinations = Counter(datasets.get_table('sectors_export')['country'])
+    return [country for country, _ in export_destinations.most_common(count)]
@@ -0,0 +1,73 @@
+from http import cookiejar
+import functools
+import logging
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+
+from core import request_cache
+
+
+COMMODITY_SEARCH = 'commodity-search'
+SSO_PROXY = 'sso-proxy'
+
+logger = logging.getLogger(__name__)
+
+
+class NoCookiesPolicy(cookiejar.DefaultCookiePolicy):
+    def set_ok(self, *args, **kwargs):
+        # the session is shared by all users of the process, so it must never hold on to one user's cookies. The
+        # cookies are still available on each response.
+        return False
+
+
+class PooledSession(requests.Session):
+    """Keep-alive session with a bounded connection pool per host and a default connect and read timeout."""
+
+    def __init__(self, pool_maxsize, timeout):
+        super().__init__()
+        self.timeout = timeout
+        self.adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        self.mount('https://', self.adapter)
+        self.mount('http://', self.adapter)
+        self.cookies.set_policy(NoCookiesPolicy())
+        self.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        cache = request_cache.get_current()
+        if cache:
+            cache.record_upstream_call(f'{method} {urlparse(url).path}')
+        response = super().request(method, url, *args, **kwargs)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Connection pool stats %s', self.get_pool_stats())
+        return response
+
+    def get_pool_stats(self):
+        pools = self.adapter.poolmanager.pools
+        stats = {}
+        for key in pools.keys():
+            pool = pools[key]
+            stats[f'{key.key_scheme}://{key.key_host}:{key.key_port}'] = {
+                'maxsize': pool.pool.maxsize,
+                'idle': sum(connection is not None for connection in list(pool.pool.queue)),
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+            }
+        return stats
+
+
+@functools.lru_cache(maxsize=None)
+def get_session(name):
+    # created lazily so each forked worker process gets its own connections
+    return PooledSession(
+        pool_maxsize=settings.HTTP_POOL_MAXSIZES.get(name, settings.HTTP_POOL_MAXSIZE),
+        timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT),
+    )
+
+
+def get_pool_stats():
+    return {name: get_session(name).get_pool_stats() for name in (COMMODITY_SEARCH, SSO_PROXY)}
@@ -0,0 +1,82 @@
+import functools
+
+from iso3166 import countries_by_alpha3
+
+from core import datasets, demographics
+
+
+ALL_AGES = ['0+']
+
+
+def is_year(name):
+    return name.isdigit()
+
+
+def get_latest_values(table, codes):
+    """The latest year with a value in each row and that value, by code. `codes` gives the code of each row."""
+    years = sorted((name for name in table.columns if is_year(name)), reverse=True)
+    latest = {}
+    for year in years:
+        column = table[year]
+        for row, code in enumerate(codes):
+            if code is not None and code not in latest and not demographics.is_missing(column[row]):
+                latest[code] = {'value': column[row], 'year': int(year)}
+    return latest
+
+
+class Indicators:
+    """
+    The market indicators in core/fixtures joined by ISO 3166 numeric country code: population from the UN estimates,
+    the urban and rural split, the World Bank consumer price index and the average income. The latest value of each
+    indicator is found once for every country when the store is built, so comparing markets is a lookup per country.
+    """
+
+    def __init__(self, populations, consumer_price_index, average_income):
+        self.populations = populations
+        self.consumer_price_index = get_latest_values(
+            consumer_price_index,
+            codes=[self.get_alpha3_code(alpha3) for alpha3 in consumer_price_index['Country Code']],
+        )
+        self.average_income = get_latest_values(
+            average_income, codes=[populations.codes.get(name) for name in average_income['Country']],
+        )
+
+    @staticmethod
+    def get_alpha3_code(alpha3):
+        country = countries_by_alpha3.get(alpha3)
+        return int(country.numeric) if country else None
+
+    def get_indicators_by_country(self, countries, target_ages=ALL_AGES):
+        """
+        The indicators for each of the countries, by country. An indicator is None where the fixtures do not cover
+        the country, and the populations are None where an age range does not fit the five year bands.
+        """
+        population_data = self.populations.get_population_data_by_country(countries, target_ages)
+        indicators = {}
+        for country in countries:
+            code = self.populations.codes.get(country)
+            population = (population_data[country] or {}).get('population_data', {})
+            percentage_urban = self.populations.percentages_urban.get(code)
+            indicators[country] = {
+                'country': country,
+                'total_population': population.get('total_population'),
+                'total_target_age_population': population.get('total_target_age_population'),
+                'urban_percentage': percentage_urban,
+                'rural_percentage': None if percentage_urban is None else 1 - percentage_urban,
+                'consumer_price_index': self.consumer_price_index.get(code),
+                'average_income': self.average_income.get(code),
+            }
+        return indicators
+
+
+@functools.lru_cache(maxsize=None)
+def get_indicators():
+    return Indicators(
+        populations=demographics.get_populations(),
+        consumer_price_index=datasets.get_table('consumer_price_index'),
+        average_income=datasets.get_table('average_income'),
+    )
+
+
+def get_indicators_by_country(countries, target_ages=ALL_AGES):
+    return get_indicators().get_indicators_by_country(countries, target_ages)
@@ -0,0 +1,45 @@
+import ipaddress
+import random
+import time
+
+from geoip2.errors import AddressNotFoundError
+
+from django.contrib.gis.geoip2 import GeoIP2
+from django.core.management import BaseCommand
+
+from core import geolocation
+
+
+class Command(BaseCommand):
+
+    help = 'Compare GeoIP lookups per second of a reader opened per lookup against the shared cached reader'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', choices=['city', 'country'], default='city')
+        parser.add_argument('--lookups', type=int, default=10000, help='Number of lookups per reader')
+        parser.add_argument('--distinct', type=int, default=1000, help='Number of distinct IP addresses looked up')
+
+    def get_ips(self, lookups, distinct):
+        generator = random.Random(0)
+        ips = [str(ipaddress.IPv4Address(generator.getrandbits(32))) for _ in range(distinct)]
+        return [generator.choice(ips) for _ in range(lookups)]
+
+    def measure(self, lookup, ips):
+        start = time.perf_counter()
+        for ip in ips:
+            try:
+                lookup(ip)
+            except AddressNotFoundError:
+                pass
+        return len(ips) / (time.perf_counter() - start)
+
+    def handle(self, *args, **options):
+        ips = self.get_ips(options['lookups'], options['distinct'])
+        database = options['database']
+        results = [
+            ('Reader per lookup', lambda ip: getattr(GeoIP2(), database)(ip)),
+            ('Shared reader', getattr(geolocation.GeoIPReader(maxsize=0), database)),
+            ('Shared reader with cache', getattr(geolocation.reader, database)),
+        ]
+        for name, lookup in results:
+            self.stdout.write(f'{name}: {self.measure(lookup, ips):.0f} lookups/sec')
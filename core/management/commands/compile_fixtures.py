@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand, CommandError
+
+from core import datasets
+
+
+class Command(BaseCommand):
+
+    help = 'Compile the core/fixtures CSVs to typed column files, memory mapped the first time they are used'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f'Defaults to all of {", ".join(sorted(datasets.DATASETS))}')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(datasets.DATASETS)
+        if unknown:
+            raise CommandError(f'Unknown datasets {", ".join(sorted(unknown))}')
+        for name in options['names'] or sorted(datasets.DATASETS):
+            path = datasets.compile_dataset(name)
+            self.stdout.write(f'Compiled {name} to {path}')
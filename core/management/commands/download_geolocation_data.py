@@ -19,8 +19,14 @@ class GeolocationRemoteFileArchive:
         tar = tarfile.open(mode='r:gz', fileobj=file_like_object)
         for member in tar.getmembers():
             if member.name.endswith(file_name):
-                member.name = file_name
+                # extracted alongside and then renamed over the old database, so processes that have the old one
+                # memory mapped keep reading it until they reload
+                member.name = file_name + '.download'
                 tar.extract(member, path=settings.GEOIP_PATH)
+                os.replace(
+                    os.path.join(settings.GEOIP_PATH, member.name),
+                    os.path.join(settings.GEOIP_PATH, file_name),
+                )
                 break
         else:
             raise ValueError(file_name + ' not found in geolocation archive')
@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from core import page_views
+
+
+class Command(BaseCommand):
+
+    help = 'Recount the lessons each user has read in each module from their page views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sso_ids', nargs='*', help='Defaults to every user')
+
+    def handle(self, *args, **options):
+        page_views.rebuild_read_progress(sso_ids=options['sso_ids'] or None)
+        self.stdout.write('Rebuilt read progress')
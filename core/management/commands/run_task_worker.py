@@ -0,0 +1,34 @@
+import signal
+import socket
+
+from django.core.management import BaseCommand
+
+from core import cache, tasks
+
+
+class Command(BaseCommand):
+
+    help = 'Run the tasks enqueued by the web workers, e.g. writes to upstream APIs whose result nobody reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--name', default=socket.gethostname(),
+            help='Unique name of the worker. A restarted worker queues again the tasks it was running when it died',
+        )
+        parser.add_argument('--burst', action='store_true', help='Exit once there are no tasks due')
+        parser.add_argument('--stats', action='store_true', help='Print the queue length and task counters, and exit')
+
+    def write_stats(self):
+        self.stdout.write(f'Queue: {tasks.get_backend().get_stats()}')
+        for name in sorted(tasks.registry):
+            counters = cache.get_counters(tasks.get_counter_namespace(name), outcomes=tasks.OUTCOMES)
+            self.stdout.write(f'{name}: {counters}')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.write_stats()
+            return
+        worker = tasks.Worker(backend=tasks.get_backend(), name=options['name'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        worker.work(burst=options['burst'])
@@ -0,0 +1,42 @@
+from iso3166 import countries
+from requests.exceptions import RequestException
+
+from django.core.management import BaseCommand
+
+from core import cache, helpers
+from exportplan import helpers as exportplan_helpers
+
+
+WARMED_NAMESPACES = [
+    'dataservices.country_data',
+    'dataservices.cia_world_factbook_data',
+    'dataservices.corruption_perceptions_index',
+    'dataservices.ease_of_doing_business',
+]
+
+
+class Command(BaseCommand):
+
+    help = 'Pre-warm the shared cache of per-country dataservices data for the most popular export destinations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=50, help='Number of countries to warm')
+
+    def warm_country(self, country):
+        exportplan_helpers.get_country_data.warm(country)
+        exportplan_helpers.get_cia_world_factbook_data.warm(country=country, key='people,languages')
+        iso_country = countries.get(country, None)
+        if iso_country:
+            exportplan_helpers.get_corruption_perceptions_index.warm(iso_country.alpha3)
+            exportplan_helpers.get_ease_of_doing_business.warm(iso_country.alpha3)
+
+    def handle(self, *args, **options):
+        for country in helpers.get_top_export_destinations(options['top']):
+            try:
+                self.warm_country(country)
+            except RequestException as error:
+                self.stderr.write(f'Unable to warm {country}: {error}')
+            else:
+                self.stdout.write(f'Warmed {country}')
+        for namespace in WARMED_NAMESPACES:
+            self.stdout.write(f'{namespace}: {cache.get_counters(namespace)}')
@@ -1,11 +1,13 @@
 import os
 import logging
 from great_components.helpers import add_next
+from ipware import get_client_ip
 
 from django.shortcuts import redirect
 from django.urls import reverse
 
-from core import helpers
+from core import helpers, request_cache
+from sso import helpers as sso_helpers
 from sso.models import BusinessSSOUser
 from datetime import datetime
 from django.http import HttpResponseForbidden
@@ -20,10 +22,31 @@ from jsonschema import ValidationError
 logger = logging.getLogger(__name__)
 
 
+class RequestCacheMiddleware(MiddlewareMixin):
+    # dedupes the upstream API reads made while serving a request, and counts the calls that went upstream
+
+    def process_request(self, request):
+        request.request_cache = request_cache.activate()
+
+    def process_response(self, request, response):
+        cache = getattr(request, 'request_cache', None)
+        if cache:
+            logger.debug('%s made %s upstream API calls', request.path, cache.upstream_call_count)
+        request_cache.deactivate()
+        return response
+
+
 class UserLocationStoreMiddleware(MiddlewareMixin):
+    # the location is stored once per session, and again if the user's IP changes
+
+    SESSION_KEY_IP = 'USER_LOCATION_IP'
+
     def process_request(self, request):
         if request.user.is_authenticated and isinstance(request.user, BusinessSSOUser):
-            helpers.store_user_location(request)
+            client_ip, _ = get_client_ip(request)
+            if request.session.get(self.SESSION_KEY_IP) != client_ip:
+                request.session[self.SESSION_KEY_IP] = client_ip
+                helpers.store_user_location(request)
 
 
 class UserSpecificRedirectMiddleware(GA360Mixin, MiddlewareMixin):
@@ -64,18 +87,17 @@ class StoreUserExpertiseMiddleware(MiddlewareMixin):
         if self.should_set_product_expertise(request):
             products = request.GET.getlist('product')
             hs_codes = request.GET.getlist('hs_codes')
-            helpers.update_company_profile(
-                sso_session_id=request.user.session_id,
-                data={
-                    'expertise_products_services': {'other': products},
-                    'hs_codes': hs_codes
-                }
-            )
-            # invalidating the cached property
-            try:
-                del request.user.company
-            except AttributeError:
-                pass
+            data = {
+                'expertise_products_services': {'other': products},
+                'hs_codes': hs_codes
+            }
+            helpers.update_company_profile.enqueue(sso_session_id=request.user.session_id, data=data)
+            # the task worker makes the update, so it is written through to the cached profile for this and later
+            # requests to show it straight away
+            company = request.user.company
+            profile = {**(company.data if company else {}), **data}
+            sso_helpers.set_cached_company_profile(request.user.session_id, profile)
+            request.user.company = helpers.CompanyParser(profile)
 
 
 # testing method
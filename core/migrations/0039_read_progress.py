@@ -0,0 +1,29 @@
+# Generated by Django 2.2.14 on 2026-10-18 08:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_add_image_and_video_to_lesson_body'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, null=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, null=True, verbose_name='modified')),
+                ('sso_id', models.TextField()),
+                ('read_count', models.PositiveIntegerField(default=0)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_progress', to='core.CuratedListPage')),
+            ],
+            options={
+                'unique_together': {('sso_id', 'module')},
+            },
+        ),
+    ]
@@ -2,6 +2,8 @@ import hashlib
 import mimetypes
 from urllib.parse import unquote
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.functional import cached_property
@@ -34,10 +36,10 @@ from wagtail_personalisation.blocks import PersonalisedStructBlock
 from wagtail_personalisation.models import PersonalisablePageMixin
 from wagtailmedia.models import Media
 
-from core import blocks as core_blocks, mixins
+from core import blocks as core_blocks, mixins, page_views
 from core.constants import BACKLINK_QUERYSTRING_NAME, RICHTEXT_FEATURES__MINIMAL
 from core.context import get_context_provider
-from core.utils import PageTopic, get_first_lesson
+from core.utils import get_raw_topics
 
 from exportplan.data import SECTION_URLS as EXPORT_PLAN_SECTION_TITLES_URLS
 
@@ -346,6 +348,17 @@ class ListPage(CMSGenericPage):
     settings_panels = CMSGenericPage.settings_panels + [FieldPanel('record_read_progress')]
     content_panels = CMSGenericPage.content_panels + [FieldPanel('description'), FieldPanel('button_label')]
 
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        context['modules'] = list(self.get_children().live().specific())
+        if self.record_read_progress and request.user.is_authenticated:
+            # imported when run, as domestic.helpers imports this module
+            from domestic.helpers import get_module_read_counts
+            read_counts = get_module_read_counts(request.user)
+            for module in context['modules']:
+                module.read_counts = read_counts.get(module.pk)
+        return context
+
 
 class CuratedListPage(CMSGenericPage):
     parent_page_types = ['core.ListPage']
@@ -392,6 +405,60 @@ class CuratedListPage(CMSGenericPage):
         return context
 
 
+READ_PROGRESS_LIST_PAGES_CACHE_KEY = 'read-progress-list-pages'
+LESSON_NAVIGATION_CACHE_KEY = 'lesson-navigation'
+
+
+def build_lesson_navigation():
+    """
+    The live lessons of every module in the order of its topics, each lesson's position in them, and the module
+    after it under the same parent, by the module's path. The topics' pages are read from the stored JSON, and are
+    checked to be live in one query.
+    """
+    modules = list(CuratedListPage.objects.order_by('path'))
+    topics = {module.pk: get_raw_topics(module) for module in modules}
+    page_ids = [page_id for module_topics in topics.values() for topic in module_topics for page_id in topic['pages']]
+    live = set(Page.objects.live().filter(pk__in=page_ids).values_list('pk', flat=True))
+    navigation = {}
+    # the modules under a parent are consecutive in path order
+    for module, next_module in zip(modules, modules[1:] + [None]):
+        lessons = [page_id for topic in topics[module.pk] for page_id in topic['pages'] if page_id in live]
+        positions = {}
+        for position, lesson_id in enumerate(lessons):
+            positions.setdefault(lesson_id, position)
+        is_sibling = next_module and next_module.path[:-Page.steplen] == module.path[:-Page.steplen]
+        navigation[module.path] = {
+            'id': module.pk,
+            'lessons': lessons,
+            'positions': positions,
+            'next_module': next_module.path if is_sibling else None,
+        }
+    return navigation
+
+
+def get_lesson_navigation():
+    navigation = cache.get(LESSON_NAVIGATION_CACHE_KEY)
+    if navigation is None:
+        navigation = refresh_lesson_navigation()
+    return navigation
+
+
+def refresh_lesson_navigation():
+    # when a lesson or module is published, unpublished, moved or deleted. See core.signals
+    navigation = build_lesson_navigation()
+    cache.set(LESSON_NAVIGATION_CACHE_KEY, navigation, timeout=settings.LESSON_CACHE_TIMEOUT)
+    return navigation
+
+
+def get_read_progress_list_pages():
+    """The ids of the list pages that record the read progress of the lessons below them, by path."""
+    list_pages = cache.get(READ_PROGRESS_LIST_PAGES_CACHE_KEY)
+    if list_pages is None:
+        list_pages = dict(ListPage.objects.filter(record_read_progress=True).values_list('path', 'pk'))
+        cache.set(READ_PROGRESS_LIST_PAGES_CACHE_KEY, list_pages, timeout=settings.LESSON_CACHE_TIMEOUT)
+    return list_pages
+
+
 def hero_singular_validation(value):
     if value and len(value) > 1:
         raise StreamBlockValidationError(
@@ -512,22 +579,19 @@ class DetailPage(CMSGenericPage):
         StreamFieldPanel('recap'),
     ]
 
+    def get_read_progress_list_page_id(self):
+        list_pages = get_read_progress_list_pages()
+        # the path of each ancestor is a prefix of the page's
+        for end in range(Page.steplen, len(self.path), Page.steplen):
+            if self.path[:end] in list_pages:
+                return list_pages[self.path[:end]]
+
     def handle_page_view(self, request):
         if request.user.is_authenticated:
-            # checking if the page should record read progress
-            # checking if the page is already marked as read
-            list_page = (
-                ListPage.objects.ancestor_of(self)
-                .filter(record_read_progress=True)
-                .exclude(page_views_list__sso_id=request.user.pk, page_views_list__page=self)
-                .first()
-            )
-            if list_page:
-                PageView.objects.get_or_create(
-                    page=self,
-                    list_page=list_page,
-                    sso_id=request.user.pk,
-                )
+            # checking if the page should record read progress. Views of lessons already read are skipped when written
+            list_page_id = self.get_read_progress_list_page_id()
+            if list_page_id:
+                page_views.record(page_id=self.pk, list_page_id=list_page_id, sso_id=request.user.pk)
 
     def serve(self, request, *args, **kwargs):
         self.handle_page_view(request)
@@ -597,19 +661,29 @@ class DetailPage(CMSGenericPage):
             context['backlink'] = _backlink
             context['backlink_title'] = self._get_backlink_title(_backlink)
 
-        if hasattr(self.get_parent().specific, 'topics'):
-            page_topic = PageTopic(self)
-            next_lesson = page_topic.get_next_lesson()
-            context['current_module'] = page_topic.module
-
-            if next_lesson:
-                context['next_lesson'] = next_lesson
-            else:
-                next_module = self.module.get_next_sibling()
-                if not next_module:
-                    return context
-                context['next_module'] = next_module.specific
-                context['next_lesson'] = get_first_lesson(next_module)
+        navigation = get_lesson_navigation()
+        if self.path[:-Page.steplen] in navigation:
+            context.update(self.get_navigation_context(navigation))
+        return context
+
+    def get_navigation_context(self, navigation):
+        """The module of the lesson, and the lesson to read next: the next in the module, or the first of the next."""
+        module = navigation[self.path[:-Page.steplen]]
+        next_module = None
+        position = module['positions'].get(self.pk)
+        if position is not None and position + 1 < len(module['lessons']):
+            next_lesson_id = module['lessons'][position + 1]
+        else:
+            next_module = navigation.get(module['next_module'])
+            next_lesson_id = next_module['lessons'][0] if next_module and next_module['lessons'] else None
+        page_ids = [module['id'], next_module and next_module['id'], next_lesson_id]
+        pages = {page.pk: page for page in Page.objects.filter(pk__in=filter(None, page_ids)).specific()}
+        context = {'current_module': pages[module['id']]}
+        # either may have been deleted since the navigation was built
+        if next_module and next_module['id'] in pages:
+            context['next_module'] = pages[next_module['id']]
+        if next_lesson_id in pages:
+            context['next_lesson'] = pages[next_lesson_id]
         return context
 
 
@@ -623,6 +697,19 @@ class PageView(TimeStampedModel):
         unique_together = ['page', 'sso_id']
 
 
+class ReadProgress(TimeStampedModel):
+    """
+    The number of lessons in a module a user has read, counted from their page views as they are written. See
+    core.page_views. Rebuilt with manage.py rebuild_read_progress.
+    """
+    sso_id = models.TextField()
+    module = models.ForeignKey(CuratedListPage, on_delete=models.CASCADE, related_name='read_progress')
+    read_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['sso_id', 'module']
+
+
 # TODO: deprecate and remove
 class ContentModuleTag(TaggedItemBase):
     content_object = ParentalKey('core.ContentModule', on_delete=models.CASCADE, related_name='tagged_items')
@@ -0,0 +1,193 @@
+from collections import Counter, deque
+import functools
+import json
+from logging import getLogger
+import threading
+
+import redis
+from wagtail.core.models import Page
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from core import tasks
+
+
+KEY_PREFIX = 'page-views'
+FLUSH_SCHEDULED_KEY = f'{KEY_PREFIX}:flush-scheduled'
+PAGE_VIEW_BUFFER_ERROR = 'Unable to buffer page view'
+
+logger = getLogger(__name__)
+
+
+class ProcessLock:
+    """A lock held within the process, with the interface of the Redis lock. It does not expire."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.lock.release()
+
+    def reacquire(self):
+        pass
+
+
+class InMemoryBuffer:
+    """Keeps the page views in the process. For tests and local development only: they are lost on restart."""
+
+    def __init__(self):
+        self.messages = deque()
+        self.messages_lock = threading.Lock()
+        self.flush_lock = ProcessLock()
+
+    def push(self, message):
+        with self.messages_lock:
+            self.messages.append(message)
+        return True
+
+    def read(self, count):
+        with self.messages_lock:
+            return list(self.messages)[:count]
+
+    def trim(self, count):
+        with self.messages_lock:
+            for _ in range(min(count, len(self.messages))):
+                self.messages.popleft()
+
+    def lock(self):
+        return self.flush_lock
+
+
+class RedisBuffer:
+    """
+    Keeps the page views in a Redis list shared by every web worker. They are removed only once they are written, so
+    a flush that fails part way through writes them again next time.
+    """
+
+    def __init__(self):
+        self.client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.key = f'{KEY_PREFIX}:buffer'
+
+    def push(self, message):
+        try:
+            self.client.rpush(self.key, message)
+        except redis.RedisError:
+            logger.error(PAGE_VIEW_BUFFER_ERROR, exc_info=True)
+            return False
+        return True
+
+    def read(self, count):
+        return self.client.lrange(self.key, 0, count - 1)
+
+    def trim(self, count):
+        self.client.ltrim(self.key, count, -1)
+
+    def lock(self):
+        # released by comparing its token and deleting it in one script, so only the flush holding it releases it
+        return self.client.lock(
+            f'{KEY_PREFIX}:flush-lock',
+            timeout=settings.PAGE_VIEW_FLUSH_LOCK_TIMEOUT,
+            blocking_timeout=settings.PAGE_VIEW_FLUSH_LOCK_TIMEOUT,
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_buffer():
+    return import_string(settings.PAGE_VIEW_BUFFER_BACKEND)()
+
+
+def record(page_id, list_page_id, sso_id):
+    """
+    Buffers a view of a lesson, to be written with the others at most PAGE_VIEW_FLUSH_INTERVAL seconds later, so
+    serving the lesson does not write to the database.
+    """
+    message = json.dumps({'page_id': page_id, 'list_page_id': list_page_id, 'sso_id': str(sso_id)})
+    # the first view since the last flush schedules the next one
+    if get_buffer().push(message) and cache.add(FLUSH_SCHEDULED_KEY, True, timeout=settings.PAGE_VIEW_FLUSH_INTERVAL):
+        flush.schedule(settings.PAGE_VIEW_FLUSH_INTERVAL)
+
+
+def get_module_path(path, module_paths):
+    # the nearest module above the page, found from its materialised path as in domestic.helpers.build_lesson_modules
+    for end in range(len(path) - Page.steplen, 0, -Page.steplen):
+        if path[:end] in module_paths:
+            return path[:end]
+    return None
+
+
+def rebuild_read_progress(sso_ids=None):
+    """
+    Recounts the lessons each user has read in each module from their page views, for the users in `sso_ids` or for
+    everyone, replacing their ReadProgress rows. A lesson moved to another module is counted there from the next
+    rebuild.
+    """
+    from core.models import CuratedListPage, PageView, ReadProgress
+    modules = dict(CuratedListPage.objects.values_list('path', 'id'))
+    # a lesson is counted only while it is live, as domestic.helpers.get_lesson_modules counts the lessons to read
+    views = PageView.objects.filter(page__live=True)
+    if sso_ids is not None:
+        views = views.filter(sso_id__in=sso_ids)
+    counts = Counter()
+    for sso_id, path in views.values_list('sso_id', 'page__path'):
+        module_path = get_module_path(path, modules)
+        if module_path:
+            counts[(sso_id, modules[module_path])] += 1
+    with transaction.atomic():
+        progress = ReadProgress.objects.all()
+        if sso_ids is not None:
+            progress = progress.filter(sso_id__in=sso_ids)
+        progress.delete()
+        ReadProgress.objects.bulk_create(
+            ReadProgress(sso_id=sso_id, module_id=module_id, read_count=read_count)
+            for (sso_id, module_id), read_count in counts.items()
+        )
+
+
+def write(messages):
+    # imported when run, as core.models imports this module to record the views
+    from core.models import DetailPage, ListPage, PageView
+    views = set()
+    for message in messages:
+        data = json.loads(message)
+        views.add((data['page_id'], data['list_page_id'], data['sso_id']))
+    # the pages may have been deleted since they were viewed
+    page_ids = set(DetailPage.objects.filter(pk__in={view[0] for view in views}).values_list('pk', flat=True))
+    list_page_ids = set(ListPage.objects.filter(pk__in={view[1] for view in views}).values_list('pk', flat=True))
+    PageView.objects.bulk_create(
+        [
+            PageView(page_id=page_id, list_page_id=list_page_id, sso_id=sso_id)
+            for page_id, list_page_id, sso_id in views
+            if page_id in page_ids and list_page_id in list_page_ids
+        ],
+        # the lessons the user has already read
+        ignore_conflicts=True,
+    )
+    # recounted rather than incremented, as the views ignored above are already counted
+    rebuild_read_progress(sso_ids={view[2] for view in views})
+
+
+@tasks.task
+def flush():
+    """
+    Writes the buffered page views, PAGE_VIEW_FLUSH_BATCH_SIZE at a time, skipping those already recorded. One flush
+    runs at a time, as each removes the views it read from the front of the buffer once they are written.
+    """
+    # cleared first, so a view buffered while flushing schedules another flush rather than waiting for this one
+    cache.delete(FLUSH_SCHEDULED_KEY)
+    buffer = get_buffer()
+    with buffer.lock() as lock:
+        while True:
+            messages = buffer.read(settings.PAGE_VIEW_FLUSH_BATCH_SIZE)
+            if not messages:
+                return
+            write(messages)
+            # raises rather than removing views another flush may have read, if the lock expired while writing
+            lock.reacquire()
+            buffer.trim(len(messages))
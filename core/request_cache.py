@@ -0,0 +1,137 @@
+import functools
+import inspect
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+
+_local = threading.local()
+
+API_CLIENT_NAMESPACE = 'api-client'
+
+
+class RequestCache:
+    """
+    Read-through store for upstream API reads made while serving a single request.
+
+    Entries are keyed by namespace (the upstream endpoint) and the bound arguments of the helper, which always
+    include the sso_session_id for user-specific reads, so two users can never share an entry. `upstream_calls`
+    counts the requests that actually went upstream, by method and path, see memoize_api_client.
+    """
+
+    def __init__(self):
+        self.store = {}
+        self.upstream_calls = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def upstream_call_count(self):
+        return sum(self.upstream_calls.values())
+
+    def record_upstream_call(self, namespace):
+        with self.lock:
+            self.upstream_calls[namespace] += 1
+
+    def invalidate(self, namespace):
+        with self.lock:
+            for key in [key for key in self.store if key[0] == namespace]:
+                del self.store[key]
+
+
+def activate(cache=None):
+    _local.cache = cache or RequestCache()
+    return _local.cache
+
+
+def deactivate():
+    _local.cache = None
+
+
+def get_current():
+    return getattr(_local, 'cache', None)
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def make_key(namespace, func, args, kwargs):
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return (namespace, freeze(bound.arguments))
+
+
+def memoize(namespace):
+    """Serve repeated reads of `namespace` from the active request cache, parsed. Errors are never cached."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_current()
+            if cache is None:
+                return func(*args, **kwargs)
+            key = make_key(namespace, func, args, kwargs)
+            if key not in cache.store:
+                cache.store[key] = func(*args, **kwargs)
+            return cache.store[key]
+        return wrapper
+    return decorator
+
+
+def invalidates(*namespaces):
+    """Drop cached reads of `namespaces` once the decorated write helper has run, whether or not it succeeded."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_current()
+            if cache is None:
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                for namespace in namespaces:
+                    cache.invalidate(namespace)
+        return wrapper
+    return decorator
+
+
+def memoize_send(send):
+    """
+    Wraps an API client's `send` so every request made while serving a request is counted, and repeated GETs of the
+    same url, params and headers (which carry the sso session id) are served from the request cache, whichever helper
+    makes them. Responses with a 5xx status are not cached. Any other method drops the cached GETs, as the write may
+    have changed them.
+    """
+
+    @functools.wraps(send)
+    def wrapper(method, url, *args, **kwargs):
+        cache = get_current()
+        if cache is None:
+            return send(method, url, *args, **kwargs)
+        if method != 'GET':
+            cache.record_upstream_call(f'{method} {urlparse(url).path}')
+            try:
+                return send(method, url, *args, **kwargs)
+            finally:
+                cache.invalidate(API_CLIENT_NAMESPACE)
+        key = (API_CLIENT_NAMESPACE, freeze((url, kwargs.get('params'), kwargs.get('headers'))))
+        if key in cache.store:
+            return cache.store[key]
+        cache.record_upstream_call(f'{method} {urlparse(url).path}')
+        response = send(method, url, *args, **kwargs)
+        if response.status_code < 500:
+            cache.store[key] = response
+        return response
+    return wrapper
+
+
+def memoize_api_client(client):
+    # every resource client (e.g. api_client.exportplan) sends its own requests
+    clients = [client] + [value for value in vars(client).values() if hasattr(value, 'send')]
+    for item in clients:
+        item.send = memoize_send(item.send)
@@ -0,0 +1,16 @@
+from django.core.cache import cache
+
+from core import models
+
+
+def refresh_lesson_navigation(sender, *args, **kwargs):
+    models.refresh_lesson_navigation()
+
+
+def invalidate_lesson_navigation(sender, *args, **kwargs):
+    # deleting a module deletes each of its lessons too, so it is built once on the next read rather than for each
+    cache.delete(models.LESSON_NAVIGATION_CACHE_KEY)
+
+
+def invalidate_read_progress_list_pages(sender, *args, **kwargs):
+    cache.delete(models.READ_PROGRESS_LIST_PAGES_CACHE_KEY)
@@ -0,0 +1,236 @@
+from collections import deque
+import functools
+import json
+from logging import getLogger
+import threading
+import time
+import uuid
+
+import redis
+from requests.exceptions import HTTPError, RequestException
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from core.cache import increment_counter
+
+
+KEY_PREFIX = 'tasks'
+ENQUEUED = 'enqueued'
+DROPPED = 'dropped'
+SUCCEEDED = 'succeeded'
+RETRIED = 'retried'
+FAILED = 'failed'
+OUTCOMES = (ENQUEUED, DROPPED, SUCCEEDED, RETRIED, FAILED)
+TASK_ENQUEUE_ERROR = 'Unable to enqueue task'
+TASK_FAILED_ERROR = 'Task failed'
+
+logger = getLogger(__name__)
+
+registry = {}
+
+
+def task(func):
+    """
+    Registers the decorated module level function to be run by the task worker (manage.py run_task_worker), and adds
+    `func.enqueue(*args, **kwargs)` to run it later rather than in the request. Use for writes whose result nobody
+    reads, and `func.schedule(delay, *args, **kwargs)` to run it no sooner than `delay` seconds from now. Its arguments
+    must be JSON serialisable. It is retried with exponential backoff while it fails with a connection error, a
+    timeout or a 5xx response, up to TASK_MAX_ATTEMPTS times, so it may run more than once.
+    """
+    name = f'{func.__module__}.{func.__qualname__}'
+    registry[name] = func
+    func.enqueue = functools.partial(enqueue, name)
+    func.schedule = functools.partial(schedule, name)
+    return func
+
+
+def get_counter_namespace(name):
+    return f'{KEY_PREFIX}.{name}'
+
+
+def enqueue(name, *args, **kwargs):
+    push(name, args, kwargs, run_at=None)
+
+
+def schedule(name, delay, *args, **kwargs):
+    push(name, args, kwargs, run_at=time.time() + delay)
+
+
+def push(name, args, kwargs, run_at):
+    message = json.dumps({'id': str(uuid.uuid4()), 'name': name, 'args': args, 'kwargs': kwargs, 'attempt': 1})
+    outcome = ENQUEUED if get_backend().push(message, run_at=run_at) else DROPPED
+    increment_counter(get_counter_namespace(name), outcome)
+
+
+class InMemoryBackend:
+    """Keeps the queue in the process. For tests and local development only: tasks are lost on restart."""
+
+    def __init__(self):
+        self.queue = deque()
+        self.scheduled = []
+        self.failed = []
+        self.lock = threading.Lock()
+
+    def push(self, message, run_at=None):
+        with self.lock:
+            if run_at is None:
+                self.queue.appendleft(message)
+            else:
+                self.scheduled.append((run_at, message))
+        return True
+
+    def pop(self, worker, block):
+        with self.lock:
+            now = time.time()
+            for entry in [entry for entry in self.scheduled if entry[0] <= now]:
+                self.scheduled.remove(entry)
+                self.queue.appendleft(entry[1])
+            if self.queue:
+                return self.queue.pop()
+        if block:
+            time.sleep(settings.TASK_WORKER_POLL_TIMEOUT)
+
+    def ack(self, worker, message):
+        pass
+
+    def fail(self, message):
+        self.failed.append(message)
+
+    def recover(self, worker):
+        pass
+
+    def get_stats(self):
+        return {'queued': len(self.queue), 'scheduled': len(self.scheduled), 'failed': len(self.failed)}
+
+
+class RedisBackend:
+    """
+    Keeps the queue in Redis so it survives restarts. A popped task stays in the worker's processing list until it
+    is acknowledged, and is queued again when the worker restarts if it died part way through. Retries wait in a
+    sorted set scored by when they are due. The last TASK_FAILED_MAX tasks that failed for good are kept for
+    inspection, without their arguments. See Worker.fail
+    """
+
+    def __init__(self):
+        self.client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    def get_key(self, suffix):
+        return f'{KEY_PREFIX}:{suffix}'
+
+    def push(self, message, run_at=None):
+        try:
+            if run_at is None:
+                self.client.lpush(self.get_key('queue'), message)
+            else:
+                self.client.zadd(self.get_key('scheduled'), {message: run_at})
+        except redis.RedisError:
+            logger.error(TASK_ENQUEUE_ERROR, exc_info=True)
+            return False
+        return True
+
+    def move_scheduled(self):
+        for message in self.client.zrangebyscore(self.get_key('scheduled'), 0, time.time()):
+            # only the worker that removes it queues it
+            if self.client.zrem(self.get_key('scheduled'), message):
+                self.client.lpush(self.get_key('queue'), message)
+
+    def pop(self, worker, block):
+        self.move_scheduled()
+        processing_key = self.get_key(f'processing:{worker}')
+        if block:
+            return self.client.brpoplpush(self.get_key('queue'), processing_key, settings.TASK_WORKER_POLL_TIMEOUT)
+        return self.client.rpoplpush(self.get_key('queue'), processing_key)
+
+    def ack(self, worker, message):
+        self.client.lrem(self.get_key(f'processing:{worker}'), 1, message)
+
+    def fail(self, message):
+        pipeline = self.client.pipeline()
+        pipeline.lpush(self.get_key('failed'), message)
+        pipeline.ltrim(self.get_key('failed'), 0, settings.TASK_FAILED_MAX - 1)
+        pipeline.execute()
+
+    def recover(self, worker):
+        while self.client.rpoplpush(self.get_key(f'processing:{worker}'), self.get_key('queue')):
+            pass
+
+    def get_stats(self):
+        return {
+            'queued': self.client.llen(self.get_key('queue')),
+            'scheduled': self.client.zcard(self.get_key('scheduled')),
+            'failed': self.client.llen(self.get_key('failed')),
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.TASK_QUEUE_BACKEND)()
+
+
+def is_transient(error):
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return True
+
+
+def get_task(name):
+    # importing the module registers its tasks. Looked up by import path so the module's current value is run
+    func = import_string(name)
+    if name not in registry:
+        raise ValueError(f'{name} is not a registered task')
+    return func
+
+
+class Worker:
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self.stopped = False
+
+    def fail(self, message, data):
+        # the arguments are left out of the log and the failed list, as some are credentials such as session ids
+        summary = {'id': data['id'], 'name': data['name'], 'attempt': data['attempt']}
+        logger.error(TASK_FAILED_ERROR, exc_info=True, extra={'task': summary})
+        self.backend.fail(json.dumps(summary))
+        increment_counter(get_counter_namespace(data['name']), FAILED)
+
+    def retry(self, message, data):
+        if data['attempt'] >= settings.TASK_MAX_ATTEMPTS:
+            self.fail(message, data)
+            return
+        delay = settings.TASK_RETRY_DELAY * 2 ** (data['attempt'] - 1)
+        self.backend.push(json.dumps({**data, 'attempt': data['attempt'] + 1}), run_at=time.time() + delay)
+        increment_counter(get_counter_namespace(data['name']), RETRIED)
+
+    def run(self, message):
+        data = json.loads(message)
+        try:
+            get_task(data['name'])(*data['args'], **data['kwargs'])
+        except RequestException as error:
+            if is_transient(error):
+                self.retry(message, data)
+            else:
+                # e.g. a 4xx response will not go away by retrying
+                self.fail(message, data)
+        except Exception:
+            self.fail(message, data)
+        else:
+            increment_counter(get_counter_namespace(data['name']), SUCCEEDED)
+        finally:
+            self.backend.ack(self.name, message)
+
+    def work(self, burst=False):
+        """Runs tasks until stopped, or in burst mode until there are none due."""
+        self.backend.recover(self.name)
+        while not self.stopped:
+            message = self.backend.pop(self.name, block=not burst)
+            if message is not None:
+                self.run(message)
+            elif burst:
+                return
+
+    def stop(self, *args):
+        # finishes the current task first
+        self.stopped = True
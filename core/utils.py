@@ -13,6 +13,26 @@ def get_all_lessons(module):
         return lessons
 
 
+def get_raw_topics(module):
+    """
+    Helper function to get the topics of a module without loading their pages
+    @return: list of dicts of the topic's id, title and the ids of its pages
+    """
+    topics = module.topics
+    if topics is None:
+        return []
+    if not topics.is_lazy:
+        return [
+            {'id': topic.id, 'title': topic.value['title'], 'pages': [page.id for page in topic.value['pages']]}
+            for topic in topics
+        ]
+    # the JSON as stored: reading `topic.value` would load each of the topic's pages with its own query
+    return [
+        {'id': topic['id'], 'title': topic['value']['title'], 'pages': topic['value']['pages']}
+        for topic in topics.stream_data
+    ]
+
+
 def get_first_lesson(module):
     """
     Helper function to get first lesson of a module
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete
+from wagtail.core.signals import page_published, page_unpublished, post_page_move
+
+
+class DomesticConfig(AppConfig):
+    name = 'domestic'
+
+    def ready(self):
+        from core.models import CuratedListPage, DetailPage
+        from domestic import signals
+
+        for sender in (CuratedListPage, DetailPage):
+            for signal in (page_published, page_unpublished, post_page_move, post_delete):
+                signal.connect(receiver=signals.invalidate_lesson_modules, sender=sender)
@@ -1,5 +1,22 @@
-from sso import helpers as sso_helpers
-from core.models import DetailPage, CuratedListPage
+import collections
+import functools
+from logging import getLogger
+
+from requests.exceptions import RequestException
+from wagtail.core.models import Page
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import helpers as core_helpers
+from core.models import DetailPage, CuratedListPage, ReadProgress
+from core.concurrency import run_concurrently
+
+
+DASHBOARD_FEED_ERROR = 'Unable to load dashboard feed'
+LESSON_MODULES_CACHE_KEY = 'lesson-modules'
+
+logger = getLogger(__name__)
 
 
 def check_route(route_type, context, user_profile):
@@ -31,41 +48,103 @@ def build_route_context(user, context={}):
     return routes
 
 
-def get_ancestor(page, ancestor_class):
-    # Seek up the tree to fin a page matching class
-    while page:
-        if isinstance(page.specific, ancestor_class):
-            return page
-        page = page.get_parent()
+def build_lesson_modules():
+    """
+    Maps each live lesson to the nearest CuratedListPage above it, by id, in tree order. A page's materialised path
+    starts with the path of each of its ancestors, Page.steplen characters per level, so the modules are found from
+    the paths rather than by walking up the tree from each lesson.
+    """
+    modules = dict(CuratedListPage.objects.values_list('path', 'id'))
+    lesson_modules = {}
+    for lesson_id, path in DetailPage.objects.live().order_by('path').values_list('id', 'path'):
+        for end in range(len(path) - Page.steplen, 0, -Page.steplen):
+            if path[:end] in modules:
+                lesson_modules[lesson_id] = modules[path[:end]]
+                break
+    return lesson_modules
+
+
+def get_lesson_modules():
+    # cleared when a lesson or module is published, unpublished, moved or deleted. See domestic.signals
+    lesson_modules = cache.get(LESSON_MODULES_CACHE_KEY)
+    if lesson_modules is None:
+        lesson_modules = build_lesson_modules()
+        cache.set(LESSON_MODULES_CACHE_KEY, lesson_modules, settings.LESSON_CACHE_TIMEOUT)
+    return lesson_modules
+
+
+def invalidate_lesson_modules():
+    cache.delete(LESSON_MODULES_CACHE_KEY)
+
+
+def get_module_read_counts(user):
+    """
+    The number of lessons the user has read, and the number of live lessons, in each module with live lessons, by
+    module id. The read counts are kept by core.page_views as the views are written, so this is one indexed query.
+    """
+    read_counts = dict(ReadProgress.objects.filter(sso_id=str(user.pk)).values_list('module_id', 'read_count'))
+    return {
+        # a lesson unpublished since the last rebuild is still counted as read until the user's next flush
+        module_id: {'read_count': min(read_counts.get(module_id, 0), total_pages), 'total_pages': total_pages}
+        for module_id, total_pages in collections.Counter(get_lesson_modules().values()).items()
+    }
+
+
+def with_default(call, default):
+    # a feed that fails or times out is shown empty rather than failing the whole page
+    def wrapper():
+        try:
+            return call()
+        except RequestException:
+            logger.error(DASHBOARD_FEED_ERROR, exc_info=True)
+            return default
+    return wrapper
+
+
+def get_page_visit(user, page_slug):
+    # the visit is recorded only after checking for a previous one, otherwise the check would always pass
+    visited_already = user.has_visited_page(page_slug)
+    user.set_page_view(page_slug)
+    return visited_already
+
+
+def get_export_opportunities(user):
+    # needs the company profile to find the user's sectors
+    return core_helpers.get_dashboard_export_opportunities(user.session_id, user.company)
+
+
+def get_dashboard_context(user, page_slug):
+    # Fetches the independent upstream data for the dashboard at the same time. Calls that depend on an earlier
+    # result are chained within one thread. Must not touch the database, see run_concurrently
+    visited_already, events, export_opportunities = run_concurrently(
+        functools.partial(get_page_visit, user, page_slug),
+        with_default(functools.partial(core_helpers.get_dashboard_events, user.session_id), default=[]),
+        with_default(functools.partial(get_export_opportunities, user), default=[]),
+    )
+    return {
+        'visited_already': visited_already,
+        'events': events,
+        'export_opportunities': export_opportunities,
+    }
 
 
 def get_read_progress(user, context={}):
-    # Gets all detail pages and uses the parental tree to get a list of learning
-    # sections with a count of read lessons in each
+    # Gets the live lessons in each learning module, and a count of the read lessons in each, from the per-module
+    # counters. The number of queries does not grow with the number of lessons
 
     def lesson_comparator(lp):
         total = lp.get('total_pages')
         read = lp.get('read_count')
         return total - read if read else -1
 
-    lessons_in_progress = False
-    completed = set()
-    data = sso_helpers.get_lesson_completed(user.session_id)
-    for lesson in data.get('lesson_completed', []):
-        completed.add(lesson.get('lesson'))
-    page_map = {}
-    for detail_page in DetailPage.objects.live():
-        module_page = get_ancestor(detail_page, CuratedListPage)
-        if module_page:
-            page_map[module_page.id] = page_map.get(
-                module_page.id) or {'total_pages': 0, 'read_count': 0, 'page': module_page}
-            page_map[module_page.id]['total_pages'] += 1
-            if detail_page.id in completed:
-                page_map[module_page.id]['read_count'] += 1
-                lessons_in_progress = True
-    module_pages = list(page_map.values())
+    read_counts = get_module_read_counts(user)
+    pages = Page.objects.in_bulk(list(read_counts))
+    module_pages = [
+        # a module deleted since the map was built is left out
+        {**counts, 'page': pages[module_id]} for module_id, counts in read_counts.items() if module_id in pages
+    ]
     module_pages.sort(key=lesson_comparator, reverse=True)
     return {
         'module_pages': module_pages,
-        'lessons_in_progress': lessons_in_progress
+        'lessons_in_progress': any(module_page['read_count'] for module_page in module_pages)
     }
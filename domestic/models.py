@@ -11,8 +11,8 @@ from wagtail.images import get_image_model_string
 from core import blocks as core_blocks
 from core.models import CMSGenericPage
 from directory_constants import choices
-from domestic.helpers import build_route_context, get_read_progress
-from core import helpers, forms
+from domestic.helpers import build_route_context, get_dashboard_context, get_read_progress
+from core import forms
 
 
 class DomesticHomePage(
@@ -57,14 +57,14 @@ class DomesticDashboard(
 
         user = request.user
         context = super().get_context(request)
-        context['visited_already'] = user.has_visited_page(self.slug)
-        user.set_page_view(self.slug)
+        dashboard_context = get_dashboard_context(user, page_slug=self.slug)
+        context['visited_already'] = dashboard_context['visited_already']
         context['export_plan_progress_form'] = forms.ExportPlanForm(
             initial={'step_a': True, 'step_b': True, 'step_c': True}
         )
         context['industry_options'] = [{'value': key, 'label': label} for key, label in choices.SECTORS]
-        context['events'] = helpers.get_dashboard_events(user.session_id)
-        context['export_opportunities'] = helpers.get_dashboard_export_opportunities(user.session_id, user.company)
+        context['events'] = dashboard_context['events']
+        context['export_opportunities'] = dashboard_context['export_opportunities']
         context.update(get_read_progress(user, context))
         context['routes'] = build_route_context(user, context)
         context['routes_wide'] = len(context['routes']) < 3
@@ -0,0 +1,5 @@
+from domestic import helpers
+
+
+def invalidate_lesson_modules(sender, instance, *args, **kwargs):
+    helpers.invalidate_lesson_modules()
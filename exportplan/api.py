@@ -1,11 +1,14 @@
 from datetime import datetime
+import functools
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from rest_framework import generics
+from requests.exceptions import HTTPError, RequestException
 
+from core import concurrency, demographics, indicators
 from . import helpers
 from exportplan import serializers
 
@@ -19,7 +22,7 @@ class ExportPlanCountryDataView(APIView):
         serializer.is_valid(raise_exception=True)
         country = serializer.validated_data['country_name']
 
-        # To make more efficient by removing get
+        # read first: the target markets may have been changed in another session
         export_plan = helpers.get_exportplan(sso_session_id=self.request.user.session_id)
         data = {'target_markets': export_plan['target_markets'] + [{'country_name': country}]}
         export_plan = helpers.update_exportplan(
@@ -43,7 +46,7 @@ class ExportPlanRemoveCountryDataView(APIView):
         serializer = self.serializer_class(data=self.request.GET)
         serializer.is_valid(raise_exception=True)
         country = serializer.validated_data['country_name']
-        # To make more efficient by removing get
+        # read first: the target markets may have been changed in another session
         export_plan = helpers.get_exportplan(sso_session_id=self.request.user.session_id)
         data = [item for item in export_plan['target_markets'] if item['country_name'] != country]
         export_plan = helpers.update_exportplan(
@@ -63,10 +66,8 @@ class ExportPlanRemoveSectorView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        export_plan = helpers.get_exportplan(sso_session_id=self.request.user.session_id)
-        updated_export_plan = helpers.update_exportplan(
+        updated_export_plan = helpers.update_exportplan_by_pk(
             sso_session_id=self.request.user.session_id,
-            id=export_plan['pk'],
             data={'sectors': []}
         )
         data = {'sectors': updated_export_plan['sectors']}
@@ -82,11 +83,8 @@ class ExportPlanRecommendedCountriesDataView(APIView):
         serializer.is_valid(raise_exception=True)
         sectors = serializer.validated_data['sectors']
 
-        # To make more efficient by removing get export plan
-        export_plan = helpers.get_exportplan(sso_session_id=self.request.user.session_id)
-        helpers.update_exportplan(
+        helpers.update_exportplan_by_pk(
             sso_session_id=self.request.user.session_id,
-            id=export_plan['pk'],
             data={'sectors': sectors}
         )
         recommended_countries = helpers.get_recommended_countries(
@@ -108,13 +106,53 @@ class RetrieveMarketingCountryData(APIView):
         target_age_groups = serializer.validated_data['target_age_groups']
         country = serializer.validated_data['country']
 
-        population_data = helpers.get_population_data(country=country, target_ages=target_age_groups)
-        country_data = helpers.get_country_data(country)
-        factbook_data = helpers.get_cia_world_factbook_data(country=country, key='people,languages')
+        fetchers = [
+            functools.partial(helpers.get_country_data, country),
+            functools.partial(helpers.get_cia_world_factbook_data, country=country, key='people,languages'),
+        ]
+        # answered from the UN estimates in core/fixtures where they cover the country and the age groups
+        population_data = demographics.get_population_data(country=country, target_ages=target_age_groups)
+        if population_data is None:
+            fetchers.append(
+                functools.partial(helpers.get_population_data, country=country, target_ages=target_age_groups)
+            )
+        country_data, factbook_data, *fetched = concurrency.run_concurrently(*fetchers)
+        population_data = population_data or fetched[0]
         data = {**population_data, **country_data, **factbook_data}
         return Response(data)
 
 
+class MarketComparisonView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.MarketComparisonSerializer
+
+    @staticmethod
+    def get_country_data(country):
+        # the local indicators are still shown if dataservices is unavailable
+        try:
+            return helpers.get_country_data(country).get('country_data', {})
+        except RequestException:
+            return {}
+
+    def get(self, request):
+        serializer = self.serializer_class(data=self.request.GET)
+        serializer.is_valid(raise_exception=True)
+        countries = serializer.validated_data['countries']
+        target_age_groups = serializer.validated_data.get('target_age_groups', indicators.ALL_AGES)
+
+        rows = indicators.get_indicators_by_country(countries, target_ages=target_age_groups)
+        # the indicators not in core/fixtures, cached by get_country_data
+        country_data = concurrency.run_concurrently(
+            *[functools.partial(self.get_country_data, country) for country in countries]
+        )
+        return Response({
+            'countries': [
+                {**rows[country], 'internet_usage': data.get('internet_usage')}
+                for country, data in zip(countries, country_data)
+            ]
+        })
+
+
 class UpdateExportPlanAPIView(generics.GenericAPIView):
     serializer_class = serializers.ExportPlanSerializer
     permission_classes = [IsAuthenticated]
@@ -234,3 +272,44 @@ class TargetMarketDocumentsDestroyAPIView(generics.GenericAPIView):
         if serializer.is_valid(raise_exception=True):
             helpers.delete_target_market_documents(self.request.user.session_id, serializer.validated_data)
             return Response({})
+
+
+class BatchAPIView(generics.GenericAPIView):
+    """
+    Runs a list of independent create, update and delete operations on objectives, routes to market and target
+    market documents, validated with the same serializers as the single operation views, at the same time. Responds
+    with the status and data of each operation, in the order given.
+    """
+
+    serializer_class = serializers.BatchSerializer
+    permission_classes = [IsAuthenticated]
+    helper_names = {
+        ('objectives', 'create'): 'create_objective',
+        ('objectives', 'update'): 'update_objective',
+        ('objectives', 'delete'): 'delete_objective',
+        ('route_to_markets', 'create'): 'create_route_to_market',
+        ('route_to_markets', 'update'): 'update_route_to_market',
+        ('route_to_markets', 'delete'): 'delete_route_to_market',
+        ('target_market_documents', 'create'): 'create_target_market_documents',
+        ('target_market_documents', 'update'): 'update_target_market_documents',
+        ('target_market_documents', 'delete'): 'delete_target_market_documents',
+    }
+
+    def run_operation(self, sso_session_id, operation):
+        helper = getattr(helpers, self.helper_names[(operation['resource'], operation['action'])])
+        try:
+            response = helper(sso_session_id, operation['data'])
+        except HTTPError as error:
+            return {'status': error.response.status_code if error.response is not None else 502, 'data': None}
+        except RequestException:
+            return {'status': 502, 'data': None}
+        return {'status': 200, 'data': {} if operation['action'] == 'delete' else response}
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = concurrency.run_concurrently(*[
+            functools.partial(self.run_operation, self.request.user.session_id, operation)
+            for operation in serializer.validated_data['operations']
+        ])
+        return Response({'results': results})
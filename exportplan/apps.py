@@ -1,4 +1,6 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
+from wagtail.core.signals import page_published, page_unpublished, post_page_move
 
 
 class ExportPlanConfig(AppConfig):
@@ -6,3 +8,10 @@ class ExportPlanConfig(AppConfig):
 
     def ready(self):
         from exportplan import context  # noqa F401
+        from core.models import DetailPage
+        from exportplan import signals
+
+        page_published.connect(receiver=signals.update_lesson_catalogue)
+        for signal in (page_unpublished, post_delete):
+            signal.connect(receiver=signals.remove_from_lesson_catalogue, sender=DetailPage)
+        post_page_move.connect(receiver=signals.invalidate_lesson_catalogue)
@@ -1,44 +1,106 @@
+import itertools
+
 import pytz
 
 from directory_api_client import api_client
+from django.conf import settings
 from iso3166 import countries_by_alpha3
-from core import models
+from requests.exceptions import HTTPError
+from wagtail.core.models import Page
+
+from core import cache, models, request_cache
+from core.utils import get_raw_topics
 from exportplan import data
+from sso.helpers import hash_session_id
+
+
+LESSON_CATALOGUE_CACHE_KEY = 'lesson-catalogue'
+
+
+def get_exportplan_pk_key(sso_session_id):
+    return f'exportplan-pk:{hash_session_id(sso_session_id)}'
 
 
+def set_exportplan_pk(sso_session_id, pk):
+    # the pk is all the write-only endpoints need to know about the export plan, and unlike its content it does not
+    # change when the plan is edited elsewhere
+    key = get_exportplan_pk_key(sso_session_id)
+    if pk is not None:
+        cache.cache.set(key, pk, timeout=settings.EXPORTPLAN_PK_CACHE_TIMEOUT)
+    else:
+        cache.cache.delete(key)
+
+
+@request_cache.invalidates('exportplan')
 def create_export_plan(sso_session_id, exportplan_data):
     response = api_client.exportplan.exportplan_create(sso_session_id=sso_session_id, data=exportplan_data)
     response.raise_for_status()
-    return response.json()
+    export_plan = response.json()
+    set_exportplan_pk(sso_session_id, export_plan.get('pk'))
+    return export_plan
 
 
+@request_cache.memoize('exportplan')
 def get_exportplan(sso_session_id):
     response = api_client.exportplan.exportplan_list(sso_session_id)
     response.raise_for_status()
     parsed = response.json()
     if parsed:
+        set_exportplan_pk(sso_session_id, parsed[0].get('pk'))
         return parsed[0]
 
 
+@request_cache.invalidates('exportplan')
 def update_exportplan(sso_session_id, id, data):
     response = api_client.exportplan.exportplan_update(sso_session_id=sso_session_id, id=id, data=data)
     response.raise_for_status()
-    return response.json()
+    export_plan = response.json()
+    set_exportplan_pk(sso_session_id, id)
+    return export_plan
 
 
+def update_exportplan_by_pk(sso_session_id, data):
+    """
+    Updates the user's export plan without reading it first, using the pk remembered by the export plan helpers.
+    Only for updates that do not depend on the plan's current content: those must read it first, as it may have been
+    changed since in another session. Falls back to reading the export plan when the pk is not known, or when the
+    update 404s because it is stale.
+    """
+    pk = cache.cache.get(get_exportplan_pk_key(sso_session_id))
+    if pk is not None:
+        try:
+            return update_exportplan(sso_session_id=sso_session_id, id=pk, data=data)
+        except HTTPError as error:
+            if error.response is None or error.response.status_code != 404:
+                raise
+    export_plan = get_exportplan(sso_session_id=sso_session_id)
+    return update_exportplan(sso_session_id=sso_session_id, id=export_plan['pk'], data=data)
+
+
+@request_cache.memoize('dataservices.marketdata')
 def get_exportplan_marketdata(country_code):
     # This is a temp wrapper for MVP as we finalise the source(s) this should move to backend
     exportplan_marketdata = {}
     exportplan_marketdata['timezone'] = get_timezone(country_code)
+    exportplan_marketdata['corruption_perceptions_index'] = get_corruption_perceptions_index(country_code)
+    exportplan_marketdata['easeofdoingbusiness'] = get_ease_of_doing_business(country_code)
+    return exportplan_marketdata
 
-    exportplan_response = api_client.dataservices.get_corruption_perceptions_index(country_code)
-    exportplan_response.raise_for_status()
-    exportplan_marketdata['corruption_perceptions_index'] = exportplan_response.json()
 
-    marketdata_response = api_client.dataservices.get_ease_of_doing_business(country_code)
-    marketdata_response.raise_for_status()
-    exportplan_marketdata['easeofdoingbusiness'] = marketdata_response.json()
-    return exportplan_marketdata
+@cache.stale_while_revalidate('dataservices.corruption_perceptions_index')
+@cache.read_through('dataservices.corruption_perceptions_index')
+def get_corruption_perceptions_index(country_code):
+    response = api_client.dataservices.get_corruption_perceptions_index(country_code)
+    response.raise_for_status()
+    return response.json()
+
+
+@cache.stale_while_revalidate('dataservices.ease_of_doing_business')
+@cache.read_through('dataservices.ease_of_doing_business')
+def get_ease_of_doing_business(country_code):
+    response = api_client.dataservices.get_ease_of_doing_business(country_code)
+    response.raise_for_status()
+    return response.json()
 
 
 def country_code_iso3_to_iso2(iso3_country_code):
@@ -52,18 +114,25 @@ def get_timezone(country_code):
         return pytz.country_timezones(iso3_country_code)[0]
 
 
+@request_cache.memoize('dataservices.last_year_import_data')
+@cache.stale_while_revalidate('dataservices.last_year_import_data')
+@cache.read_through('dataservices.last_year_import_data')
 def get_comtrade_last_year_import_data(commodity_code, country):
     response = api_client.dataservices.get_last_year_import_data(commodity_code=commodity_code, country=country)
     response.raise_for_status()
     return response.json()
 
 
+@request_cache.memoize('dataservices.historical_import_data')
+@cache.stale_while_revalidate('dataservices.historical_import_data')
+@cache.read_through('dataservices.historical_import_data')
 def get_comtrade_historical_import_data(commodity_code, country):
     response = api_client.dataservices.get_historical_import_data(commodity_code=commodity_code, country=country)
     response.raise_for_status()
     return response.json()
 
 
+@request_cache.memoize('personalisation.recommended_countries')
 def get_recommended_countries(sso_session_id, sectors):
     response = api_client.personalisation.recommended_countries_by_sector(sso_session_id=sso_session_id, sector=sectors)
     response.raise_for_status()
@@ -97,12 +166,14 @@ def get_or_create_export_plan(user):
     return export_plan
 
 
+@request_cache.invalidates('exportplan')
 def create_objective(sso_session_id, data):
     response = api_client.exportplan.exportplan_objectives_create(sso_session_id=sso_session_id, data=data)
     response.raise_for_status()
     return response.json()
 
 
+@request_cache.invalidates('exportplan')
 def update_objective(sso_session_id, data):
     response = api_client.exportplan.exportplan_objectives_update(
         sso_session_id=sso_session_id, id=data['pk'], data=data)
@@ -110,18 +181,21 @@ def update_objective(sso_session_id, data):
     return response.json()
 
 
+@request_cache.invalidates('exportplan')
 def delete_objective(sso_session_id, data):
     response = api_client.exportplan.exportplan_objectives_delete(sso_session_id=sso_session_id, id=data['pk'])
     response.raise_for_status()
     return response
 
 
+@request_cache.invalidates('exportplan')
 def create_route_to_market(sso_session_id, data):
     response = api_client.exportplan.route_to_market_create(sso_session_id=sso_session_id, data=data)
     response.raise_for_status()
     return response.json()
 
 
+@request_cache.invalidates('exportplan')
 def update_route_to_market(sso_session_id, data):
     response = api_client.exportplan.route_to_market_update(
         sso_session_id=sso_session_id, id=data['pk'], data=data)
@@ -129,18 +203,21 @@ def update_route_to_market(sso_session_id, data):
     return response.json()
 
 
+@request_cache.invalidates('exportplan')
 def delete_route_to_market(sso_session_id, data):
     response = api_client.exportplan.route_to_market_delete(sso_session_id=sso_session_id, id=data['pk'])
     response.raise_for_status()
     return response
 
 
+@request_cache.invalidates('exportplan')
 def create_target_market_documents(sso_session_id, data):
     response = api_client.exportplan.target_market_documents_create(sso_session_id=sso_session_id, data=data)
     response.raise_for_status()
     return response.json()
 
 
+@request_cache.invalidates('exportplan')
 def update_target_market_documents(sso_session_id, data):
     response = api_client.exportplan.target_market_documents_update(
         sso_session_id=sso_session_id, id=data['pk'], data=data)
@@ -148,24 +225,34 @@ def update_target_market_documents(sso_session_id, data):
     return response.json()
 
 
+@request_cache.invalidates('exportplan')
 def delete_target_market_documents(sso_session_id, data):
     response = api_client.exportplan.target_market_documents_delete(sso_session_id=sso_session_id, id=data['pk'])
     response.raise_for_status()
     return response
 
 
+@request_cache.memoize('dataservices.country_data')
+@cache.stale_while_revalidate('dataservices.country_data')
+@cache.read_through('dataservices.country_data')
 def get_country_data(country):
     response = api_client.dataservices.get_country_data(country)
     response.raise_for_status()
     return response.json()
 
 
+@request_cache.memoize('dataservices.cia_world_factbook_data')
+@cache.stale_while_revalidate('dataservices.cia_world_factbook_data')
+@cache.read_through('dataservices.cia_world_factbook_data')
 def get_cia_world_factbook_data(country, key):
     response = api_client.dataservices.get_cia_world_factbook_data(country=country, data_key=key)
     response.raise_for_status()
     return response.json()
 
 
+@request_cache.memoize('dataservices.population_data')
+@cache.stale_while_revalidate('dataservices.population_data')
+@cache.read_through('dataservices.population_data')
 def get_population_data(country, target_ages):
     response = api_client.dataservices.get_population_data(country=country, target_ages=target_ages)
     response.raise_for_status()
@@ -178,16 +265,66 @@ def get_check_duties_link(exportplan):
     return url
 
 
+def get_lesson_details(lesson, topic_titles):
+    return {
+        'topic_name': topic_titles.get(lesson.topic_block_id),
+        'title': lesson.title,
+        'estimated_read_duration': lesson.estimated_read_duration,
+        'url': lesson.url,
+    }
+
+
+def get_topic_titles(module):
+    return {topic['id']: topic['title'] for topic in get_raw_topics(module)}
+
+
+def build_lesson_catalogue():
+    """
+    The details of every live lesson by slug, and the slug of each by id so a lesson can be replaced when it is
+    published again. The topic names are read from each module's topics once, rather than once per lesson.
+    """
+    lessons = list(models.DetailPage.objects.live().order_by('path'))
+    modules = models.CuratedListPage.objects.filter(path__in={lesson.path[:-Page.steplen] for lesson in lessons})
+    topic_titles = {module.path: get_topic_titles(module) for module in modules}
+    catalogue = {'lessons': {}, 'slugs': {}}
+    for lesson in lessons:
+        module_path = lesson.path[:-Page.steplen]
+        catalogue['lessons'][lesson.slug] = get_lesson_details(lesson, topic_titles.get(module_path, {}))
+        catalogue['slugs'][lesson.pk] = lesson.slug
+    return catalogue
+
+
+def get_lesson_catalogue():
+    # kept up to date by exportplan.signals as lessons and modules are published and unpublished
+    catalogue = cache.cache.get(LESSON_CATALOGUE_CACHE_KEY)
+    if catalogue is None:
+        catalogue = build_lesson_catalogue()
+        cache.cache.set(LESSON_CATALOGUE_CACHE_KEY, catalogue, timeout=settings.LESSON_CACHE_TIMEOUT)
+    return catalogue
+
+
+def update_lesson_catalogue(lessons=(), removed=()):
+    """Replaces the details of the given live lessons, and removes the other given lessons, in the cached catalogue."""
+    catalogue = cache.cache.get(LESSON_CATALOGUE_CACHE_KEY)
+    if catalogue is None:
+        # built in full when next read
+        return
+    for pk in itertools.chain((lesson.pk for lesson in lessons), removed):
+        catalogue['lessons'].pop(catalogue['slugs'].pop(pk, None), None)
+    for lesson in lessons:
+        module = lesson.get_parent().specific
+        topic_titles = get_topic_titles(module) if isinstance(module, models.CuratedListPage) else {}
+        catalogue['lessons'][lesson.slug] = get_lesson_details(lesson, topic_titles)
+        catalogue['slugs'][lesson.pk] = lesson.slug
+    cache.cache.set(LESSON_CATALOGUE_CACHE_KEY, catalogue, timeout=settings.LESSON_CACHE_TIMEOUT)
+
+
+def invalidate_lesson_catalogue():
+    cache.cache.delete(LESSON_CATALOGUE_CACHE_KEY)
+
+
 def get_all_lesson_details():
-    lessons = {}
-    for lesson in models.DetailPage.objects.live():
-        lessons[lesson.slug] = {
-            'topic_name': lesson.topic_title,
-            'title': lesson.title,
-            'estimated_read_duration': lesson.estimated_read_duration,
-            'url': lesson.url,
-        }
-    return lessons
+    return get_lesson_catalogue()['lessons']
 
 
 def get_current_url(slug, export_plan):
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from django.conf import settings
+
 
 class ExportPlanRecommendedCountriesSerializer(serializers.Serializer):
     sectors = serializers.ListField(child=serializers.CharField())
@@ -16,6 +18,20 @@ class PopulationDataSerializer(serializers.Serializer):
         return value[0].split(',')
 
 
+class MarketComparisonSerializer(serializers.Serializer):
+    countries = serializers.ListField(child=serializers.CharField())
+    target_age_groups = serializers.ListField(child=serializers.CharField(), required=False)
+
+    def validate_countries(self, value):
+        countries = list(dict.fromkeys(value[0].split(',')))
+        if len(countries) > settings.MARKET_COMPARISON_MAX_COUNTRIES:
+            raise serializers.ValidationError(f'Compare at most {settings.MARKET_COMPARISON_MAX_COUNTRIES} countries')
+        return countries
+
+    def validate_target_age_groups(self, value):
+        return value[0].split(',')
+
+
 class AboutYourBuinessSerializer(serializers.Serializer):
     story = serializers.CharField(required=False, allow_blank=True)
     location = serializers.CharField(required=False, allow_blank=True)
@@ -128,3 +144,33 @@ class NewObjectiveSerializer(CompanyObjectiveSerializer):
 
 class PkOnlySerializer(serializers.Serializer):
     pk = serializers.IntegerField()
+
+
+BATCH_OPERATION_SERIALIZERS = {
+    ('objectives', 'create'): NewObjectiveSerializer,
+    ('objectives', 'update'): CompanyObjectiveSerializer,
+    ('objectives', 'delete'): PkOnlySerializer,
+    ('route_to_markets', 'create'): NewRouteToMarketSerializer,
+    ('route_to_markets', 'update'): RouteToMarketSerializer,
+    ('route_to_markets', 'delete'): PkOnlySerializer,
+    ('target_market_documents', 'create'): NewTargetMarketDocumentSerializer,
+    ('target_market_documents', 'update'): TargetMarketDocumentSerializer,
+    ('target_market_documents', 'delete'): PkOnlySerializer,
+}
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    resource = serializers.ChoiceField(choices=['objectives', 'route_to_markets', 'target_market_documents'])
+    action = serializers.ChoiceField(choices=['create', 'update', 'delete'])
+    data = serializers.DictField()
+
+    def validate(self, attrs):
+        serializer_class = BATCH_OPERATION_SERIALIZERS[(attrs['resource'], attrs['action'])]
+        serializer = serializer_class(data=attrs['data'])
+        if not serializer.is_valid():
+            raise serializers.ValidationError({'data': serializer.errors})
+        return {**attrs, 'data': serializer.validated_data}
+
+
+class BatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(child=BatchOperationSerializer(), min_length=1, max_length=50)
@@ -0,0 +1,21 @@
+from core import models
+from exportplan import helpers
+
+
+def update_lesson_catalogue(sender, instance, *args, **kwargs):
+    if isinstance(instance, models.DetailPage):
+        helpers.update_lesson_catalogue(lessons=[instance])
+    elif isinstance(instance, models.CuratedListPage):
+        # the names of its lessons' topics may have changed
+        helpers.update_lesson_catalogue(lessons=models.DetailPage.objects.live().child_of(instance))
+    elif models.DetailPage.objects.descendant_of(instance).exists():
+        # the urls of the lessons below it may have changed
+        helpers.invalidate_lesson_catalogue()
+
+
+def remove_from_lesson_catalogue(sender, instance, *args, **kwargs):
+    helpers.update_lesson_catalogue(removed=[instance.pk])
+
+
+def invalidate_lesson_catalogue(sender, *args, **kwargs):
+    helpers.invalidate_lesson_catalogue()
@@ -64,6 +64,7 @@ urlpatterns = [
     path('api/country-data/', skip_ga360(api.ExportPlanCountryDataView.as_view()), name='api-country-data'),
     path('api/marketing-country-data/', skip_ga360(api.RetrieveMarketingCountryData.as_view()),
          name='api-marketing-country-data'),
+    path('api/market-comparison/', skip_ga360(api.MarketComparisonView.as_view()), name='api-market-comparison'),
     path('api/objectives/create/', skip_ga360(api.ObjectivesCreateAPIView.as_view()), name='api-objectives-create'),
     path('api/objectives/update/', skip_ga360(api.ObjectivesUpdateAPIView.as_view()), name='api-objectives-update'),
     path('api/objectives/delete/', skip_ga360(api.ObjectivesDestroyAPIView.as_view()), name='api-objectives-delete'),
@@ -86,4 +87,5 @@ urlpatterns = [
         skip_ga360(api.TargetMarketDocumentsDestroyAPIView.as_view()),
         name='api-target-markets-documents-delete'
     ),
+    path('api/batch/', skip_ga360(api.BatchAPIView.as_view()), name='api-batch'),
 ]
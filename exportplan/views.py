@@ -11,6 +11,7 @@ from requests.exceptions import RequestException
 from directory_constants.choices import INDUSTRIES, COUNTRY_CHOICES, MARKET_ROUTE_CHOICES, PRODUCT_PROMOTIONAL_CHOICES
 from directory_api_client.client import api_client
 from exportplan import data, helpers, forms
+from sso import helpers as sso_helpers
 
 
 class ExportPlanMixin:
@@ -224,6 +225,7 @@ class BaseFormView(FormView):
                 api_response=response
             )
             raise
+        sso_helpers.invalidate_cached_company_profile(self.request.user.session_id)
         return redirect(self.success_url)
 
     def serialize_form(self, form):
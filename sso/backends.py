@@ -12,8 +12,18 @@ class BusinessSSOUserBackend(directory_sso_api_client.backends.SSOUserBackend):
         if not helpers.is_admin_url(request.path):
             return super().authenticate(request)
 
+    def get_user(self, session_id):
+        parsed = helpers.get_cached_session_user(session_id)
+        if parsed is not None:
+            return self.build_user_from_parsed(session_id=session_id, parsed=parsed)
+        return super().get_user(session_id)
+
     def build_user(self, session_id, response):
         parsed = response.json()
+        helpers.set_cached_session_user(session_id, parsed)
+        return self.build_user_from_parsed(session_id=session_id, parsed=parsed)
+
+    def build_user_from_parsed(self, session_id, parsed):
         user_kwargs = self.user_kwargs(session_id=session_id, parsed=parsed)
         return models.BusinessSSOUser(**user_kwargs)
 
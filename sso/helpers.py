@@ -1,5 +1,7 @@
 from http import cookiejar
+import hashlib
 import re
+import uuid
 
 from directory_api_client import api_client
 from directory_forms_api_client import actions
@@ -10,9 +12,11 @@ from rest_framework.response import Response
 from rest_framework.exceptions import APIException
 
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import formats
 from django.utils.dateparse import parse_datetime
 
+from core import request_cache, tasks
 from core.constants import SERVICE_NAME
 from core.models import DetailPage
 
@@ -87,6 +91,7 @@ def send_verification_code_email(email, verification_code, form_url, verificatio
     return response
 
 
+@tasks.task
 def send_welcome_notification(email, form_url):
     action = actions.GovNotifyEmailAction(
         template_id=settings.ENROLMENT_WELCOME_TEMPLATE_ID,
@@ -114,22 +119,58 @@ def create_user(email, password):
     return response.json()
 
 
+def hash_session_id(sso_session_id):
+    # the session id is a credential, so only its hash goes in cache keys
+    return hashlib.sha256(str(sso_session_id).encode()).hexdigest()
+
+
+def get_session_user_cache_key(sso_session_id):
+    return f'sso-session-user:{hash_session_id(sso_session_id)}'
+
+
+def get_cached_session_user(sso_session_id):
+    return cache.get(get_session_user_cache_key(sso_session_id))
+
+
+def set_cached_session_user(sso_session_id, session_user):
+    """
+    Keeps the session user returned by SSO for SSO_SESSION_USER_CACHE_TIMEOUT seconds, so the authentication backend
+    does not ask SSO on every request. Changes made through this service invalidate it straight away, changes made
+    elsewhere, e.g. logging out of another service, are seen once it expires.
+    """
+    cache.set(get_session_user_cache_key(sso_session_id), session_user, timeout=settings.SSO_SESSION_USER_CACHE_TIMEOUT)
+
+
+def invalidate_cached_session_user(sso_session_id):
+    cache.delete(get_session_user_cache_key(sso_session_id))
+
+
+@request_cache.memoize('sso.user_profile')
 def get_user_profile(sso_session_id):
+    session_user = get_cached_session_user(sso_session_id)
+    if session_user is not None:
+        return session_user
     response = sso_api_client.user.get_session_user(sso_session_id)
     if response.status_code == 400:
         raise APIException(detail=response.json(), code=response.status_code)
     response.raise_for_status()
-    return response.json()
+    session_user = response.json()
+    set_cached_session_user(sso_session_id, session_user)
+    return session_user
 
 
+@request_cache.invalidates('sso.user_profile')
 def update_user_profile(sso_session_id, data):
     response = sso_api_client.user.update_user_profile(sso_session_id, data)
     if response.status_code == 400:
         raise APIException(detail=response.json(), code=response.status_code)
     response.raise_for_status()
+    invalidate_cached_session_user(sso_session_id)
     return response.json()
 
 
+@tasks.task
+@request_cache.invalidates('sso.page_views')
 def set_user_page_view(sso_session_id, page):
     response = sso_api_client.user.set_user_page_view(sso_session_id, SERVICE_NAME, page)
     if response.status_code in [400, 404]:
@@ -138,6 +179,7 @@ def set_user_page_view(sso_session_id, page):
     return response.json()
 
 
+@request_cache.memoize('sso.page_views')
 def get_user_page_views(sso_session_id, page=None):
     response = sso_api_client.user.get_user_page_views(sso_session_id, SERVICE_NAME, page)
     if response.status_code in [400, 404]:
@@ -146,6 +188,7 @@ def get_user_page_views(sso_session_id, page=None):
     return response.json()
 
 
+@request_cache.invalidates('sso.lesson_completed')
 def set_lesson_completed(sso_session_id, lesson):
     lesson_obj = DetailPage.objects.get(pk=lesson)
     lesson_page = lesson_obj.url_path
@@ -163,6 +206,7 @@ def set_lesson_completed(sso_session_id, lesson):
     return response.json()
 
 
+@request_cache.memoize('sso.lesson_completed')
 def get_lesson_completed(sso_session_id, lesson=None):
     response = sso_api_client.user.get_user_lesson_completed(sso_session_id, SERVICE_NAME, lesson)
     if response.status_code in [400, 404]:
@@ -171,6 +215,7 @@ def get_lesson_completed(sso_session_id, lesson=None):
     return response.json()
 
 
+@request_cache.invalidates('sso.lesson_completed')
 def delete_lesson_completed(sso_session_id, lesson=None):
     response = sso_api_client.user.delete_user_lesson_completed(sso_session_id, SERVICE_NAME, lesson)
     if response.status_code in [400, 404]:
@@ -184,7 +229,31 @@ def has_visited_page(sso_session_id, page):
     return result and result.get('page_views') if result else None
 
 
-def get_company_profile(sso_session_id):
+def get_company_profile_cache_keys(sso_session_id):
+    digest = hash_session_id(sso_session_id)
+    return f'company-profile-version:{digest}', f'company-profile:{digest}'
+
+
+def invalidate_cached_company_profile(sso_session_id):
+    version_key, _ = get_company_profile_cache_keys(sso_session_id)
+    cache.set(version_key, uuid.uuid4().hex, timeout=settings.COMPANY_PROFILE_CACHE_TIMEOUT)
+
+
+@request_cache.invalidates('company.profile')
+def set_cached_company_profile(sso_session_id, profile):
+    """
+    Writes the profile through to the cache as a new version, for an update made later, e.g. by the task worker, to be
+    seen straight away. Making the update invalidates it, so the profile is then read back from the API.
+    """
+    version_key, key = get_company_profile_cache_keys(sso_session_id)
+    version = uuid.uuid4().hex
+    cache.set_many(
+        {version_key: version, key: {'version': version, 'profile': profile}},
+        timeout=settings.COMPANY_PROFILE_CACHE_TIMEOUT,
+    )
+
+
+def fetch_company_profile(sso_session_id):
     response = api_client.company.profile_retrieve(sso_session_id)
 
     if response.status_code == 404:
@@ -193,6 +262,29 @@ def get_company_profile(sso_session_id):
     return response.json()
 
 
+@request_cache.memoize('company.profile')
+def get_company_profile(sso_session_id):
+    """
+    Keeps the user's company profile, or that they have none, in the default cache for COMPANY_PROFILE_CACHE_TIMEOUT
+    seconds. Each entry records the version of the profile it was read at, and writes through this service set a new
+    version, so an entry read before a write is never served after it, even if it is stored after it.
+    """
+    version_key, key = get_company_profile_cache_keys(sso_session_id)
+    cached = cache.get_many([version_key, key])
+    version = cached.get(version_key)
+    entry = cached.get(key)
+    if version is not None and entry is not None and entry['version'] == version:
+        return entry['profile']
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(version_key, version, timeout=settings.COMPANY_PROFILE_CACHE_TIMEOUT):
+            # invalidated by a concurrent write
+            return fetch_company_profile(sso_session_id)
+    profile = fetch_company_profile(sso_session_id)
+    cache.set(key, {'version': version, 'profile': profile}, timeout=settings.COMPANY_PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
 def is_admin_url(url):
     return ADMIN_URL_PATTERN.match(url)
 
@@ -48,7 +48,7 @@ class BusinessSSOUser(AbstractUser):
         return helpers.update_user_profile(self.session_id, data)
 
     def set_page_view(self, page):
-        return helpers.set_user_page_view(self.session_id, page)
+        helpers.set_user_page_view.enqueue(self.session_id, page)
 
     def get_page_views(self, page=None):
         return helpers.get_user_page_views(self.session_id, page)
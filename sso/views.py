@@ -1,4 +1,6 @@
-import requests
+from logging import getLogger
+
+from requests.exceptions import RequestException
 from rest_framework import generics
 from rest_framework.response import Response
 
@@ -6,9 +8,16 @@ from django.conf import settings
 from django.contrib import auth
 
 from sso import helpers, serializers
+from core import http_sessions
+from core.circuit_breaker import sso_proxy_breaker
 from core.constants import SSO_COOKIE_DOMAIN_NAME_KEY
 
 
+SSO_LOGOUT_ERROR = 'Unable to log out of SSO'
+
+logger = getLogger(__name__)
+
+
 class SSOBusinessUserLoginView(generics.GenericAPIView):
     serializer_class = serializers.SSOBusinessUserSerializer
     permission_classes = []
@@ -22,7 +31,10 @@ class SSOBusinessUserLoginView(generics.GenericAPIView):
             'password': serializer.validated_data['password'],
             'login': serializer.validated_data['email'],
         }
-        upstream_response = requests.post(url=settings.SSO_PROXY_LOGIN_URL, data=data, allow_redirects=False)
+        session = http_sessions.get_session(http_sessions.SSO_PROXY)
+        upstream_response = sso_proxy_breaker.call(
+            session.post, url=settings.SSO_PROXY_LOGIN_URL, data=data, allow_redirects=False
+        )
         if upstream_response.status_code == 302:
             # Redirect from sso indicates the credentials were correct
             # Store the domain of the sso_session_cookie so we can delete it at logout
@@ -43,10 +55,21 @@ class SSOBusinessUserLogoutView(generics.GenericAPIView):
         sso_session_cookie_domain = request.session.get(SSO_COOKIE_DOMAIN_NAME_KEY, '')
 
         # Call logout on directory_sso to kill the token.
-        upstream_response = requests.post(url=settings.SSO_PROXY_LOGOUT_URL, allow_redirects=False)
-        # Nothing we can do if that fails
+        session = http_sessions.get_session(http_sessions.SSO_PROXY)
+        try:
+            upstream_response = sso_proxy_breaker.call(
+                session.post, url=settings.SSO_PROXY_LOGOUT_URL, allow_redirects=False
+            )
+        except RequestException:
+            # Nothing we can do if that fails, or the breaker is open, but the user is still logged out here
+            logger.warning(SSO_LOGOUT_ERROR, exc_info=True)
+            response = Response(status=200)
+        else:
+            response = helpers.response_factory(upstream_response=upstream_response)
+        sso_session_id = request.COOKIES.get(settings.SSO_SESSION_COOKIE)
+        if sso_session_id:
+            helpers.invalidate_cached_session_user(sso_session_id)
         auth.logout(request=request)
-        response = helpers.response_factory(upstream_response=upstream_response)
         response.delete_cookie(settings.SSO_SESSION_COOKIE, domain=sso_session_cookie_domain)
         return response
 
@@ -95,7 +118,7 @@ class SSOBusinessVerifyCodeView(generics.GenericAPIView):
             email=serializer.validated_data['email'],
             code=serializer.validated_data['code'],
         )
-        helpers.send_welcome_notification(
+        helpers.send_welcome_notification.enqueue(
             email=serializer.validated_data['email'],
             form_url=self.request.path
         )
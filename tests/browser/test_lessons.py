@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from random import choice
 from typing import List
-from unittest import mock
 
 import pytest
 from selenium.webdriver.remote.webdriver import WebDriver
@@ -17,7 +16,7 @@ from tests.browser.steps import should_see_all_elements, should_not_see_any_elem
 from tests.browser.util import attach_jpg_screenshot, selenium_action
 from tests.unit.core.factories import DetailPageFactory, ListPageFactory, CuratedListPageFactory
 from core import constants
-from sso import helpers as sso_helpers
+from core.models import ReadProgress
 
 pytestmark = [
     pytest.mark.browser,
@@ -81,9 +80,7 @@ def test_can_view_lessons_from_different_topics(
     visit_lesson_page(live_server, browser, 'Topic B - Lesson B2', topic_b_lessons[1].url)
 
 
-@mock.patch.object(sso_helpers, 'get_lesson_completed')
 def test_can_mark_lesson_as_read_and_check_read_progress_on_dashboard_page(
-    mock_get_lesson_completed,
     mock_dashboard_profile_events_opportunities,
     mock_export_plan_requests,
     topics_with_lessons,
@@ -93,15 +90,13 @@ def test_can_mark_lesson_as_read_and_check_read_progress_on_dashboard_page(
     live_server, user, browser = server_user_browser_dashboard
     topic_a, topic_a_lessons = topics_with_lessons[0]
     module_page = CuratedListPageFactory(parent=domestic_homepage, title='Test module page')
-    lesson_page = DetailPageFactory(parent=module_page, title='test detail page 1')
+    DetailPageFactory(parent=module_page, title='test detail page 1')
     DetailPageFactory(parent=module_page, title='test detail page 2')
 
     visit_page(live_server, browser, None, 'Dashboard', endpoint=constants.DASHBOARD_URL)
     should_not_see_any_element(browser, DashboardReadingProgress)
-    # Setting a lesson complete should show progress card with 1/1 complete
-    mock_get_lesson_completed.return_value = {'result': 'ok', 'lesson_completed': [
-        {'lesson': lesson_page.id}
-    ]}
+    # Reading a lesson should show progress card with 1/2 complete
+    ReadProgress.objects.create(sso_id=str(user.pk), module=module_page, read_count=1)
 
     visit_page(live_server, browser, None, 'Dashboard', endpoint=constants.DASHBOARD_URL)
     should_see_all_elements(browser, DashboardReadingProgress)
@@ -9,10 +9,12 @@ import tests.unit.exportplan.factories
 from airtable import Airtable
 from directory_api_client import api_client
 from exportplan import helpers as exportplan_helpers
+from core import page_views, tasks
 from sso.models import BusinessSSOUser
 from tests.helpers import create_response
 from wagtail.core.models import Page
 from wagtail_factories import PageFactory, SiteFactory
+from django.core.cache import cache
 from django.test.client import RequestFactory
 
 # This is to reduce logging verbosity of these two libraries when running pytests
@@ -141,6 +143,36 @@ def mock_airtable_rules_regs():
     patch.stop()
 
 
+@pytest.fixture(autouse=True)
+def task_backend():
+    backend = tasks.InMemoryBackend()
+    with mock.patch.object(tasks, 'get_backend', return_value=backend):
+        yield backend
+
+
+@pytest.fixture(autouse=True)
+def page_view_buffer():
+    buffer = page_views.InMemoryBuffer()
+    with mock.patch.object(page_views, 'get_buffer', return_value=buffer):
+        yield buffer
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    # the caches are disabled in tests, see config/env/test. For tests of what is cached
+    settings.CACHES = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def run_tasks(task_backend):
+    def run():
+        tasks.Worker(backend=task_backend, name='test').work(burst=True)
+    return run
+
+
 @pytest.fixture(autouse=True)
 def mock_user_location_create():
     response = create_response()
@@ -0,0 +1,17 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+
+def test_benchmark_geolocation():
+    stdout = StringIO()
+
+    call_command('benchmark_geolocation', database='country', lookups=100, distinct=10, stdout=stdout)
+
+    lines = stdout.getvalue().splitlines()
+    assert [line.split(':')[0] for line in lines] == [
+        'Reader per lookup',
+        'Shared reader',
+        'Shared reader with cache',
+    ]
+    assert all(line.endswith(' lookups/sec') for line in lines)
@@ -0,0 +1,33 @@
+from io import StringIO
+import os
+
+import pytest
+
+from django.core.management import call_command, CommandError
+
+from core import datasets
+
+
+def test_compile_fixtures(settings, tmp_path):
+    settings.COMPILED_FIXTURES_DIR = str(tmp_path)
+    stdout = StringIO()
+
+    call_command('compile_fixtures', stdout=stdout)
+
+    assert sorted(os.listdir(tmp_path)) == sorted(f'{name}.bin' for name in datasets.DATASETS)
+    assert f'Compiled average_income to {tmp_path}/average_income.bin' in stdout.getvalue()
+
+
+def test_compile_fixtures_named(settings, tmp_path):
+    settings.COMPILED_FIXTURES_DIR = str(tmp_path)
+
+    call_command('compile_fixtures', 'average_income', stdout=StringIO())
+
+    assert os.listdir(tmp_path) == ['average_income.bin']
+
+
+def test_compile_fixtures_unknown(settings, tmp_path):
+    settings.COMPILED_FIXTURES_DIR = str(tmp_path)
+
+    with pytest.raises(CommandError):
+        call_command('compile_fixtures', 'nope')
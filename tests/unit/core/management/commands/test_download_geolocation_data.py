@@ -1,3 +1,4 @@
+import io
 import os
 import tarfile
 from unittest.mock import call, patch
@@ -52,3 +53,23 @@ def test_call_command(mock_geolocation_navigator, settings):
         call(file_like_object=city_file, file_name=settings.GEOIP_CITY),
         call(file_like_object=country_file, file_name=settings.GEOIP_COUNTRY),
     ]
+
+
+def test_decompress_replaces_database(settings, tmp_path):
+    settings.GEOIP_PATH = str(tmp_path)
+    (tmp_path / settings.GEOIP_COUNTRY).write_bytes(b'old')
+    old_inode = os.stat(tmp_path / settings.GEOIP_COUNTRY).st_ino
+    content = b'new'
+    file_like_object = io.BytesIO()
+    with tarfile.open(mode='w:gz', fileobj=file_like_object) as tar:
+        member = tarfile.TarInfo('GeoLite2-Country_20200101/' + settings.GEOIP_COUNTRY)
+        member.size = len(content)
+        tar.addfile(member, io.BytesIO(content))
+    file_like_object.seek(0)
+
+    GeolocationRemoteFileArchive().decompress(file_like_object=file_like_object, file_name=settings.GEOIP_COUNTRY)
+
+    assert os.listdir(tmp_path) == [settings.GEOIP_COUNTRY]
+    assert (tmp_path / settings.GEOIP_COUNTRY).read_bytes() == b'new'
+    # renamed into place rather than written over, so readers of the old file are unaffected
+    assert os.stat(tmp_path / settings.GEOIP_COUNTRY).st_ino != old_inode
@@ -0,0 +1,23 @@
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+
+from core import models
+from tests.unit.core import factories
+
+
+@pytest.mark.django_db
+def test_rebuild_read_progress(domestic_homepage):
+    list_page = factories.ListPageFactory(parent=domestic_homepage, slug='topic', record_read_progress=True)
+    module = factories.CuratedListPageFactory(parent=list_page, slug='module')
+    lesson = factories.DetailPageFactory(parent=module, slug='lesson')
+    models.PageView.objects.create(page=lesson, list_page=list_page, sso_id='1')
+    models.ReadProgress.objects.create(sso_id='1', module=module, read_count=5)
+    stdout = StringIO()
+
+    call_command('rebuild_read_progress', stdout=stdout)
+
+    assert list(models.ReadProgress.objects.values_list('sso_id', 'module_id', 'read_count')) == [('1', module.pk, 1)]
+    assert stdout.getvalue() == 'Rebuilt read progress\n'
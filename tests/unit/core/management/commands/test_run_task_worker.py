@@ -0,0 +1,27 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from core import tasks
+
+
+def test_run_task_worker_burst(mock_update_company_profile, task_backend):
+    tasks.enqueue('core.helpers.update_company_profile', data={'name': 'Example'}, sso_session_id='123')
+
+    call_command('run_task_worker', burst=True)
+
+    assert mock_update_company_profile.call_count == 1
+    assert mock_update_company_profile.call_args == mock.call(data={'name': 'Example'}, sso_session_id='123')
+    assert task_backend.get_stats()['queued'] == 0
+
+
+def test_run_task_worker_stats(task_backend):
+    tasks.enqueue('core.helpers.update_company_profile', data={'name': 'Example'}, sso_session_id='123')
+    stdout = StringIO()
+
+    call_command('run_task_worker', stats=True, stdout=stdout)
+
+    lines = stdout.getvalue().splitlines()
+    assert lines[0] == "Queue: {'queued': 1, 'scheduled': 0, 'failed': 0}"
+    assert "core.helpers.update_company_profile: {'enqueued': 0, 'dropped': 0, 'succeeded': 0" in stdout.getvalue()
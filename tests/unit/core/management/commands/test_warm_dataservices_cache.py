@@ -0,0 +1,33 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from requests.exceptions import HTTPError
+
+from core import helpers
+from exportplan import helpers as exportplan_helpers
+
+
+@mock.patch.object(exportplan_helpers.get_ease_of_doing_business, 'warm')
+@mock.patch.object(exportplan_helpers.get_corruption_perceptions_index, 'warm')
+@mock.patch.object(exportplan_helpers.get_cia_world_factbook_data, 'warm')
+@mock.patch.object(exportplan_helpers.get_country_data, 'warm')
+@mock.patch.object(helpers, 'get_top_export_destinations', return_value=['Germany', 'Russia'])
+def test_warm_dataservices_cache(
+    mock_get_top_export_destinations,
+    mock_country_data_warm,
+    mock_cia_world_factbook_data_warm,
+    mock_corruption_perceptions_index_warm,
+    mock_ease_of_doing_business_warm,
+):
+    mock_country_data_warm.side_effect = [None, HTTPError('502')]
+    stderr = StringIO()
+
+    call_command('warm_dataservices_cache', top=2, stdout=StringIO(), stderr=stderr)
+
+    assert mock_get_top_export_destinations.call_args == mock.call(2)
+    assert mock_country_data_warm.call_args_list == [mock.call('Germany'), mock.call('Russia')]
+    assert mock_cia_world_factbook_data_warm.call_args_list == [mock.call(country='Germany', key='people,languages')]
+    assert mock_corruption_perceptions_index_warm.call_args_list == [mock.call('DEU')]
+    assert mock_ease_of_doing_business_warm.call_args_list == [mock.call('DEU')]
+    assert 'Unable to warm Russia' in stderr.getvalue()
@@ -3,6 +3,9 @@ from unittest import mock
 import pytest
 from wagtail.core import blocks
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from core import blocks as core_blocks
 from tests.unit.core.factories import (
     CaseStudyFactory,
@@ -144,6 +147,38 @@ def test_learning_link_component(domestic_site, domestic_homepage):
     assert target_list_page.get_url() in result_list_link
 
 
+@pytest.mark.django_db
+def test_section_side_links_loaded_together(locmem_cache, domestic_site, domestic_homepage):
+    list_page = ListPageFactory(parent=domestic_homepage, title='List page title', slug='topic')
+    lessons = [
+        DetailPageFactory(parent=list_page, slug=f'lesson-{number}', estimated_read_duration='0:02:30')
+        for number in range(4)
+    ]
+    block = core_blocks.SectionBlock()
+
+    def render(pages):
+        value = block.to_python([
+            {'type': 'side_link', 'value': {'link': {'internal_link': page.pk, 'external_link': ''}}} for page in pages
+        ] + [{'type': 'side_link', 'value': {'link': {'internal_link': None, 'external_link': 'external/link'}}}])
+        with CaptureQueriesContext(connection) as queries:
+            result = block.render(value)
+        return result, len(queries)
+
+    # warms the cached site root paths
+    render(lessons[:1])
+    # the pages are loaded with a query per page type
+    _, two_links = render(lessons[:1] + [list_page])
+    result, five_links = render(lessons + [list_page])
+
+    assert five_links == two_links
+    # the lede of each lesson and the title of the list page
+    assert result.count('List page title') == 5
+    assert result.count('</i>3 min') == 4
+    assert domestic_homepage.title in result
+    assert lessons[3].get_url() in result
+    assert 'external/link' in result
+
+
 @pytest.mark.django_db
 def test_case_study_static_block_annotate_with_no_personalisation_selection(rf, user):
     case_study_1 = CaseStudyFactory()
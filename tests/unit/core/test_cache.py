@@ -0,0 +1,386 @@
+import threading
+from unittest import mock
+
+import pytest
+from directory_api_client import api_client
+from requests.exceptions import HTTPError
+
+from django.core.cache import cache as django_cache, caches
+from django_redis.cache import RedisCache
+from redis.exceptions import LockNotOwnedError
+
+from core import cache, concurrency
+from exportplan import helpers as exportplan_helpers
+from tests.helpers import create_response
+
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture
+def fallback_cache(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        'api_fallback': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api_fallback'},
+    }
+    caches['api_fallback'].clear()
+    yield caches['api_fallback']
+    caches['api_fallback'].clear()
+
+
+@pytest.fixture
+def get_country_data():
+    upstream = mock.Mock(return_value={'cpi': 100})
+
+    @cache.stale_while_revalidate('test.country_data')
+    def get_country_data(country):
+        return upstream(country)
+
+    get_country_data.upstream = upstream
+    return get_country_data
+
+
+@pytest.fixture
+def run_in_background():
+    futures = []
+    run = concurrency.run_in_background
+
+    def run_and_record(call):
+        futures.append(run(call))
+        return futures[-1]
+
+    with mock.patch.object(concurrency, 'run_in_background', side_effect=run_and_record) as patched:
+        patched.futures = futures
+        yield patched
+
+
+@pytest.mark.parametrize('value,expected', (
+    (' Germany ', 'Germany'),
+    (['15-19', '0-14'], ['0-14', '15-19']),
+    ({'country': ' CHN'}, {'country': 'CHN'}),
+    (1, 1),
+))
+def test_normalise(value, expected):
+    assert cache.normalise(value) == expected
+
+
+def test_make_key_normalised_arguments():
+    def get_population_data(country, target_ages):
+        pass
+
+    assert cache.make_key('population', get_population_data, ('Germany', ['15-19', '0-14']), {}) == (
+        cache.make_key('population', get_population_data, (), {'country': 'Germany ', 'target_ages': ['0-14', '15-19']})
+    )
+    assert cache.make_key('population', get_population_data, ('Germany', ['0-14']), {}) != (
+        cache.make_key('population', get_population_data, ('France', ['0-14']), {})
+    )
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_read_through_shared_between_calls(mock_get_country_data):
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 100}})
+
+    assert exportplan_helpers.get_country_data('Germany') == {'country_data': {'cpi': 100}}
+    assert exportplan_helpers.get_country_data(' Germany') == {'country_data': {'cpi': 100}}
+
+    assert mock_get_country_data.call_count == 1
+    assert cache.get_counters('dataservices.country_data') == {'hits': 1, 'misses': 1, 'coalesced': 0}
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_read_through_does_not_cache_errors(mock_get_country_data):
+    mock_get_country_data.return_value = create_response(status_code=502)
+
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            exportplan_helpers.get_country_data('Germany')
+
+    assert mock_get_country_data.call_count == 2
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_read_through_timeout(mock_get_country_data, settings):
+    settings.SHARED_API_CACHE_TIMEOUTS = {'dataservices.country_data': 60}
+    mock_get_country_data.return_value = create_response({'country_data': {}})
+
+    with mock.patch.object(cache.cache, 'set', wraps=cache.cache.set) as mock_set:
+        exportplan_helpers.get_country_data('Germany')
+
+    assert mock_set.call_args[1] == {'timeout': 60}
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_read_through_warm(mock_get_country_data):
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 100}})
+    exportplan_helpers.get_country_data('Germany')
+
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 101}})
+    exportplan_helpers.get_country_data.warm('Germany')
+
+    assert exportplan_helpers.get_country_data('Germany') == {'country_data': {'cpi': 101}}
+    assert mock_get_country_data.call_count == 2
+
+
+def test_increment_counter_redis():
+    redis_cache = mock.Mock(spec=RedisCache)
+
+    with mock.patch.object(cache, 'caches', {'default': redis_cache}), mock.patch.object(cache, 'cache', redis_cache):
+        cache.increment_counter('dataservices.country_data', cache.HITS)
+
+    key = f'{cache.KEY_PREFIX}:counters:dataservices.country_data:hits'
+    assert redis_cache.incr.call_args == mock.call(key, ignore_key_check=True)
+    assert redis_cache.add.call_count == 0
+
+
+def test_get_counters_cache_disabled(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    cache.increment_counter('dataservices.country_data', cache.HITS)
+
+    assert cache.get_counters('dataservices.country_data') == {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+
+def test_stale_while_revalidate_first_read(fallback_cache, get_country_data, run_in_background):
+    assert get_country_data('Germany') == {'cpi': 100}
+    assert get_country_data('Germany') == {'cpi': 100}
+
+    assert get_country_data.upstream.call_count == 1
+    assert run_in_background.call_count == 0
+
+
+def test_stale_while_revalidate_first_read_error(fallback_cache, get_country_data):
+    get_country_data.upstream.side_effect = HTTPError()
+
+    with pytest.raises(HTTPError):
+        get_country_data('Germany')
+
+
+def test_stale_while_revalidate_stale_read(fallback_cache, get_country_data, run_in_background, settings):
+    get_country_data('Germany')
+    get_country_data.upstream.return_value = {'cpi': 101}
+    settings.API_FALLBACK_SOFT_TIMEOUT = 0
+
+    # the stale response is served while it is refreshed in the background
+    assert get_country_data('Germany') == {'cpi': 100}
+    run_in_background.futures[0].result(timeout=5)
+
+    assert get_country_data.upstream.call_count == 2
+    settings.API_FALLBACK_SOFT_TIMEOUT = 60
+    assert get_country_data('Germany') == {'cpi': 101}
+
+
+def test_stale_while_revalidate_one_refresh_per_key(fallback_cache, get_country_data, run_in_background, settings):
+    get_country_data('Germany')
+    settings.API_FALLBACK_SOFT_TIMEOUT = 0
+    fallback_cache.add(cache.make_key(
+        'test.country_data', get_country_data.__wrapped__, ('Germany',), {}, prefix=cache.FALLBACK_KEY_PREFIX
+    ) + ':refreshing', True, timeout=60)
+
+    get_country_data('Germany')
+
+    assert run_in_background.call_count == 0
+
+
+def age_fallback_entry(fallback_cache, func, args, seconds):
+    # func is wrapped in request_cache.memoize, stale_while_revalidate and then read_through
+    read_through = func.__wrapped__.__wrapped__
+    key = cache.make_key('dataservices.country_data', read_through, args, {}, prefix=cache.FALLBACK_KEY_PREFIX)
+    fetched_at, value = fallback_cache.get(key)
+    fallback_cache.set(key, (fetched_at - seconds, value))
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_stale_while_revalidate_stacked_on_read_through_soft_timeout(
+    mock_get_country_data, fallback_cache, run_in_background, settings
+):
+    settings.SHARED_API_CACHE_TIMEOUTS = {'dataservices.country_data': 3600}
+    settings.API_FALLBACK_SOFT_TIMEOUT = 0
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 100}})
+    exportplan_helpers.get_country_data.__wrapped__('Germany')
+    age_fallback_entry(fallback_cache, exportplan_helpers.get_country_data, ('Germany',), seconds=3599)
+
+    # stale only once the shared cache would have expired it
+    exportplan_helpers.get_country_data.__wrapped__('Germany')
+    assert run_in_background.call_count == 0
+    age_fallback_entry(fallback_cache, exportplan_helpers.get_country_data, ('Germany',), seconds=1)
+    exportplan_helpers.get_country_data.__wrapped__('Germany')
+    assert run_in_background.call_count == 1
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_stale_while_revalidate_stacked_on_read_through_refresh(
+    mock_get_country_data, fallback_cache, run_in_background
+):
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 100}})
+    exportplan_helpers.get_country_data.__wrapped__('Germany')
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 101}})
+    age_fallback_entry(fallback_cache, exportplan_helpers.get_country_data, ('Germany',), seconds=60 * 60 * 24)
+
+    assert exportplan_helpers.get_country_data.__wrapped__('Germany') == {'country_data': {'cpi': 100}}
+    run_in_background.futures[0].result(timeout=5)
+
+    # the refresh went upstream, rather than reading back the shared cache, and updated both caches
+    assert mock_get_country_data.call_count == 2
+    assert exportplan_helpers.get_country_data.__wrapped__('Germany') == {'country_data': {'cpi': 101}}
+    fallback_cache.clear()
+    assert exportplan_helpers.get_country_data.__wrapped__('Germany') == {'country_data': {'cpi': 101}}
+    assert mock_get_country_data.call_count == 2
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_stale_while_revalidate_stacked_on_read_through_warm(mock_get_country_data, fallback_cache):
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 100}})
+    exportplan_helpers.get_country_data('Germany')
+    mock_get_country_data.return_value = create_response({'country_data': {'cpi': 101}})
+
+    exportplan_helpers.get_country_data.warm('Germany')
+
+    assert exportplan_helpers.get_country_data.__wrapped__('Germany') == {'country_data': {'cpi': 101}}
+    fallback_cache.clear()
+    assert exportplan_helpers.get_country_data.__wrapped__('Germany') == {'country_data': {'cpi': 101}}
+    assert mock_get_country_data.call_count == 2
+
+
+@mock.patch.object(concurrency.logger, 'error')
+def test_stale_while_revalidate_refresh_error(
+    mock_error, fallback_cache, get_country_data, run_in_background, settings
+):
+    get_country_data('Germany')
+    get_country_data.upstream.side_effect = HTTPError()
+    settings.API_FALLBACK_SOFT_TIMEOUT = 0
+
+    assert get_country_data('Germany') == {'cpi': 100}
+    with pytest.raises(HTTPError):
+        run_in_background.futures[0].result(timeout=5)
+
+    # the stale response is still served, and can be refreshed again
+    assert get_country_data('Germany') == {'cpi': 100}
+    assert run_in_background.call_count == 2
+
+
+def test_local_lru_cache_evicts_least_recently_used():
+    local_cache = cache.LocalLRUCache(maxsize=2)
+    local_cache.set('a', 1, timeout=60)
+    local_cache.set('b', 2, timeout=60)
+    local_cache.get('a')
+    local_cache.set('c', 3, timeout=60)
+
+    assert local_cache.get('a') == 1
+    assert local_cache.get('b') is None
+    assert local_cache.get('c') == 3
+
+
+def test_local_lru_cache_expires():
+    local_cache = cache.LocalLRUCache(maxsize=2)
+    local_cache.set('a', 1, timeout=0)
+
+    assert local_cache.get('a') is None
+    assert local_cache.entries == {}
+
+
+@pytest.fixture
+def single_flight_settings(settings):
+    settings.SINGLE_FLIGHT_WAIT = 1
+    settings.SINGLE_FLIGHT_POLL_INTERVAL = 0.01
+
+
+def test_single_flight_leader():
+    fetch = mock.Mock(return_value={'cpi': 100})
+
+    assert cache.single_flight('test', 'key', fetch, timeout=60) == {'cpi': 100}
+
+    assert django_cache.get('key') == {'cpi': 100}
+    assert django_cache.get('key:lock') is None
+
+
+def test_single_flight_leader_error():
+    fetch = mock.Mock(side_effect=HTTPError())
+
+    with pytest.raises(HTTPError):
+        cache.single_flight('test', 'key', fetch, timeout=60)
+
+    assert django_cache.get('key:lock') is None
+
+
+def test_single_flight_lock_taken_over():
+    def fetch():
+        # the lock expired while fetching, and another worker took it
+        django_cache.set('key:lock', 'other-worker')
+        return {'cpi': 100}
+
+    assert cache.single_flight('test', 'key', fetch, timeout=60) == {'cpi': 100}
+
+    assert django_cache.get('key:lock') == 'other-worker'
+
+
+@pytest.mark.parametrize('release_error', (None, LockNotOwnedError()))
+def test_single_flight_redis_lock(release_error, settings):
+    settings.SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+    redis_cache = mock.Mock(spec=RedisCache)
+    lock = redis_cache.lock.return_value
+    lock.acquire.return_value = True
+    # the lock expired while fetching
+    lock.release.side_effect = release_error
+    fetch = mock.Mock(return_value={'cpi': 100})
+
+    with mock.patch.object(cache, 'caches', {'default': redis_cache}), mock.patch.object(cache, 'cache', redis_cache):
+        assert cache.single_flight('test', 'key', fetch, timeout=60) == {'cpi': 100}
+
+    assert redis_cache.lock.call_args == mock.call('key:lock', timeout=10)
+    assert lock.acquire.call_args == mock.call(blocking=False)
+    assert lock.release.call_count == 1
+
+
+def test_single_flight_coalesced(single_flight_settings):
+    # another worker is fetching the value
+    django_cache.add('key:lock', True)
+    threading.Timer(0.05, django_cache.set, args=('key', {'cpi': 100})).start()
+    fetch = mock.Mock()
+
+    assert cache.single_flight('test', 'key', fetch, timeout=60) == {'cpi': 100}
+
+    assert fetch.call_count == 0
+    assert cache.get_counters('test')['coalesced'] == 1
+
+
+def test_single_flight_leader_failed(single_flight_settings):
+    django_cache.add('key:lock', True)
+    threading.Timer(0.05, django_cache.delete, args=('key:lock',)).start()
+    fetch = mock.Mock(return_value={'cpi': 100})
+
+    assert cache.single_flight('test', 'key', fetch, timeout=60) == {'cpi': 100}
+
+    assert fetch.call_count == 1
+    assert cache.get_counters('test')['coalesced'] == 0
+
+
+def test_single_flight_wait_timeout(single_flight_settings, settings):
+    settings.SINGLE_FLIGHT_WAIT = 0.05
+    django_cache.add('key:lock', True)
+    fetch = mock.Mock(return_value={'cpi': 100})
+
+    assert cache.single_flight('test', 'key', fetch, timeout=60) == {'cpi': 100}
+
+    assert fetch.call_count == 1
+
+
+@mock.patch.object(api_client.dataservices, 'get_country_data')
+def test_read_through_coalesces_concurrent_misses(mock_get_country_data, single_flight_settings):
+    started = threading.Event()
+    release = threading.Event()
+
+    def get_country_data(country):
+        started.set()
+        release.wait(timeout=5)
+        return create_response({'country_data': {'cpi': 100}})
+
+    mock_get_country_data.side_effect = get_country_data
+    leader = threading.Thread(target=exportplan_helpers.get_country_data, args=('Germany',))
+    leader.start()
+    started.wait(timeout=5)
+    threading.Timer(0.05, release.set).start()
+
+    assert exportplan_helpers.get_country_data('Germany') == {'country_data': {'cpi': 100}}
+    leader.join(timeout=5)
+
+    assert mock_get_country_data.call_count == 1
+    assert cache.get_counters('dataservices.country_data') == {'hits': 0, 'misses': 2, 'coalesced': 1}
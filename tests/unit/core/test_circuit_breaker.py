@@ -0,0 +1,143 @@
+import re
+import time
+from unittest import mock
+
+import pytest
+from directory_api_client import api_client
+from requests.exceptions import ConnectionError
+
+from django.core.cache import cache
+
+from core import circuit_breaker
+from tests.helpers import create_response
+
+
+pytestmark = pytest.mark.usefixtures('locmem_cache')
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(settings):
+    settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD = 2
+    settings.CIRCUIT_BREAKER_RESET_TIMEOUT = 30
+
+
+@pytest.fixture
+def breaker():
+    return circuit_breaker.CircuitBreaker('test')
+
+
+@pytest.fixture
+def upstream():
+    return mock.Mock(return_value=create_response(status_code=502))
+
+
+def trip(breaker, upstream):
+    for _ in range(2):
+        breaker.call(upstream)
+
+
+def expire(breaker):
+    # as if CIRCUIT_BREAKER_RESET_TIMEOUT had passed since the breaker opened
+    breaker.opened_until = 0
+    cache.set('circuit-breaker:test:opened', time.time() - 31)
+
+
+def test_circuit_breaker_closed(breaker, upstream):
+    upstream.return_value = create_response()
+
+    for _ in range(3):
+        assert breaker.call(upstream, 'a', b=1).status_code == 200
+
+    assert upstream.call_args == mock.call('a', b=1)
+
+
+def test_circuit_breaker_client_errors_are_not_failures(breaker, upstream):
+    upstream.return_value = create_response(status_code=404)
+
+    for _ in range(3):
+        breaker.call(upstream)
+
+    assert upstream.call_count == 3
+
+
+@pytest.mark.parametrize('side_effect', (ConnectionError(), None))
+def test_circuit_breaker_opens(breaker, upstream, side_effect):
+    upstream.side_effect = side_effect
+
+    for _ in range(2):
+        try:
+            breaker.call(upstream)
+        except ConnectionError:
+            pass
+    with pytest.raises(circuit_breaker.CircuitBreakerOpen):
+        breaker.call(upstream)
+
+    assert upstream.call_count == 2
+    assert cache.get('shared-api-cache:counters:circuit-breaker.test:opened') == 1
+
+
+def test_circuit_breaker_shared_between_workers(breaker, upstream):
+    trip(breaker, upstream)
+
+    # e.g., another gunicorn worker
+    with pytest.raises(circuit_breaker.CircuitBreakerOpen):
+        circuit_breaker.CircuitBreaker('test').call(upstream)
+
+    assert upstream.call_count == 2
+
+
+def test_circuit_breaker_open_does_not_use_cache(breaker, upstream):
+    trip(breaker, upstream)
+
+    with mock.patch.object(circuit_breaker.cache, 'get') as mock_get:
+        with pytest.raises(circuit_breaker.CircuitBreakerOpen):
+            breaker.call(upstream)
+
+    assert mock_get.call_count == 0
+
+
+def test_circuit_breaker_half_open_probe_success(breaker, upstream):
+    trip(breaker, upstream)
+    expire(breaker)
+    upstream.return_value = create_response()
+
+    assert breaker.call(upstream).status_code == 200
+    assert breaker.call(upstream).status_code == 200
+    assert cache.get('shared-api-cache:counters:circuit-breaker.test:closed') == 1
+
+
+def test_circuit_breaker_half_open_single_probe(breaker, upstream):
+    trip(breaker, upstream)
+    expire(breaker)
+    cache.add('circuit-breaker:test:probe', True)
+
+    with pytest.raises(circuit_breaker.CircuitBreakerOpen):
+        breaker.call(upstream)
+
+    assert upstream.call_count == 2
+
+
+def test_circuit_breaker_half_open_probe_failure(breaker, upstream):
+    trip(breaker, upstream)
+    expire(breaker)
+
+    breaker.call(upstream)
+
+    with pytest.raises(circuit_breaker.CircuitBreakerOpen):
+        breaker.call(upstream)
+    assert upstream.call_count == 3
+    assert cache.get('shared-api-cache:counters:circuit-breaker.test:opened') == 2
+
+
+def test_protect_api_client(requests_mock):
+    requests_mock.get(re.compile('.*'), status_code=502)
+
+    try:
+        for _ in range(2):
+            api_client.ping()
+        with pytest.raises(circuit_breaker.CircuitBreakerOpen):
+            api_client.ping()
+    finally:
+        circuit_breaker.directory_api_breaker.opened_until = 0
+
+    assert requests_mock.call_count == 2
@@ -0,0 +1,78 @@
+from concurrent.futures import Future
+import threading
+from unittest import mock
+
+from directory_api_client import api_client
+import pytest
+from requests.exceptions import HTTPError, Timeout
+
+from core import concurrency, request_cache
+from exportplan import helpers as exportplan_helpers
+from tests.helpers import create_response
+
+
+def test_run_concurrently_returns_results_in_order():
+    assert concurrency.run_concurrently(lambda: 1, lambda: 2, lambda: 3) == [1, 2, 3]
+
+
+def test_run_concurrently_runs_calls_at_the_same_time():
+    # each call blocks until all three are running, so this would time out if they were run one after another
+    barrier = threading.Barrier(3, timeout=5)
+
+    assert sorted(concurrency.run_concurrently(barrier.wait, barrier.wait, barrier.wait)) == [0, 1, 2]
+
+
+@pytest.mark.parametrize('exception_class', (HTTPError, Timeout))
+def test_run_concurrently_propagates_errors(exception_class):
+    def fail():
+        raise exception_class()
+
+    with pytest.raises(exception_class):
+        concurrency.run_concurrently(lambda: 1, fail)
+
+
+def test_run_concurrently_bounded(settings):
+    settings.UPSTREAM_MAX_CONCURRENCY = 1
+    thread_names = concurrency.run_concurrently(*[lambda: threading.current_thread().name] * 3)
+
+    assert len(set(thread_names)) == 1
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_run_concurrently_shares_request_cache(mock_exportplan_list):
+    mock_exportplan_list.return_value = create_response([{'pk': 1}])
+    request_cache.activate()
+    try:
+        exportplan_helpers.get_exportplan('123')
+        concurrency.run_concurrently(
+            lambda: exportplan_helpers.get_exportplan('123'), lambda: exportplan_helpers.get_exportplan('123')
+        )
+    finally:
+        request_cache.deactivate()
+
+    assert mock_exportplan_list.call_count == 1
+
+
+def test_run_in_background():
+    assert concurrency.run_in_background(lambda: 1).result(timeout=5) == 1
+
+
+@mock.patch.object(concurrency.logger, 'error')
+def test_log_background_call_error(mock_error):
+    future = Future()
+    future.set_exception(HTTPError())
+
+    concurrency.log_background_call_error(future)
+
+    assert mock_error.call_count == 1
+    assert mock_error.call_args[0] == (concurrency.BACKGROUND_CALL_ERROR,)
+
+
+@mock.patch.object(concurrency.logger, 'error')
+def test_log_background_call_error_success(mock_error):
+    future = Future()
+    future.set_result(1)
+
+    concurrency.log_background_call_error(future)
+
+    assert mock_error.call_count == 0
@@ -0,0 +1,86 @@
+import math
+import os
+
+import pytest
+
+from core import datasets
+
+
+@pytest.fixture(autouse=True)
+def compiled_fixtures_dir(settings, tmp_path):
+    settings.COMPILED_FIXTURES_DIR = str(tmp_path / 'compiled')
+    datasets.get_table.cache_clear()
+    yield tmp_path
+    datasets.get_table.cache_clear()
+
+
+@pytest.fixture
+def dataset(settings, tmp_path):
+    settings.ROOT_DIR = str(tmp_path)
+    path = tmp_path / 'core/fixtures'
+    path.mkdir(parents=True)
+    (path / 'countries-test.csv').write_text(
+        'Title,,,\n'
+        ',,,\n'
+        'Index,"Country\nname",2018,2019\n'
+        '1,France,"  1 250",...\n'
+        '2,Germany,3.5,4\n'
+        ',,,\n'
+    )
+    dataset = datasets.Dataset('countries-test.csv', header='Index', text_columns=('Country name',))
+    datasets.DATASETS['test'] = dataset
+    yield dataset
+    del datasets.DATASETS['test']
+
+
+def test_parse(dataset):
+    table = datasets.parse(dataset)
+
+    assert len(table) == 2
+    assert list(table.columns) == ['Index', 'Country name', '2018', '2019']
+    assert list(table['Country name']) == ['France', 'Germany']
+    assert list(table['2018']) == [1250, 3.5]
+    assert math.isnan(table['2019'][0])
+
+
+def test_compile_and_load(dataset):
+    datasets.compile_dataset('test')
+
+    table = datasets.load_compiled('test')
+
+    assert isinstance(table['2018'], memoryview)
+    assert [str(row) for row in table.rows()] == [str(row) for row in datasets.parse(dataset).rows()]
+
+
+def test_load_compiled_stale(dataset):
+    datasets.compile_dataset('test')
+    os.utime(dataset.path, ns=(0, 0))
+
+    assert datasets.load_compiled('test') is None
+
+
+def test_load_compiled_missing(dataset):
+    assert datasets.load_compiled('test') is None
+
+
+def test_get_table_compiled(dataset):
+    datasets.compile_dataset('test')
+
+    assert datasets.get_table('test').buffer is not None
+    assert datasets.get_table('test') is datasets.get_table('test')
+
+
+def test_get_table_not_compiled(dataset):
+    assert datasets.get_table('test').buffer is None
+    assert list(datasets.get_table('test')['Country name']) == ['France', 'Germany']
+
+
+@pytest.mark.parametrize('name', sorted(datasets.DATASETS))
+def test_fixtures_compile(name):
+    # the fixtures shipped in core/fixtures
+    datasets.compile_dataset(name)
+
+    table = datasets.load_compiled(name)
+
+    assert len(table) > 0
+    assert list(table.columns) == list(datasets.parse(datasets.DATASETS[name]).columns)
@@ -0,0 +1,130 @@
+import math
+from array import array
+
+import pytest
+
+from core import datasets, demographics
+
+BANDS = ['0-4', '5-9', '10-14', '15-19', '20+']
+
+
+def make_table(rows):
+    names = list(rows[0])
+    dataset = datasets.Dataset('test.csv', text_columns=(demographics.COUNTRY_NAME, 'Type'))
+    return datasets.Table(
+        columns={name: datasets.make_column(name, [row[name] for row in rows], dataset) for name in names},
+        length=len(rows),
+    )
+
+
+def make_row(name, code, year, values, row_type='Country/Area'):
+    return {
+        demographics.COUNTRY_NAME: name, demographics.COUNTRY_CODE: code, 'Type': row_type, demographics.YEAR: year,
+        **dict(zip(BANDS, values)),
+    }
+
+
+@pytest.fixture
+def populations():
+    male = make_table([
+        make_row('World', 900, 2020, [100, 100, 100, 100, 100], row_type='World'),
+        make_row('United Kingdom', 826, 2015, [1, 2, 3, 4, 5]),
+        make_row('United Kingdom', 826, 2020, [2, 3, 4, 5, math.nan]),
+    ])
+    female = make_table([
+        make_row('World', 900, 2020, [100, 100, 100, 100, 100], row_type='World'),
+        make_row('United Kingdom', 826, 2015, [10, 20, 30, 40, 50]),
+        make_row('United Kingdom', 826, 2020, [20, 30, 40, 50, 60]),
+    ])
+    urban_rural = datasets.Table(
+        columns={
+            demographics.COUNTRY_CODE: array('d', [826, 900]),
+            demographics.PERCENTAGE_URBAN: array('d', [80, math.nan]),
+        },
+        length=2,
+    )
+    return demographics.Populations(male=male, female=female, urban_rural=urban_rural)
+
+
+@pytest.mark.parametrize('value,expected', (
+    ('25-34', (25, 34)),
+    (' 65+ ', (65, None)),
+))
+def test_parse_age_range(value, expected):
+    assert demographics.parse_age_range(value) == expected
+
+
+@pytest.mark.parametrize('value', ('', 'adults', '25-', '-34'))
+def test_parse_age_range_invalid(value):
+    with pytest.raises(ValueError):
+        demographics.parse_age_range(value)
+
+
+@pytest.mark.parametrize('age_ranges,expected', (
+    (['0-4'], {'0-4'}),
+    (['0-9', '15+'], {'0-4', '5-9', '15-19', '20+'}),
+    (['10+'], {'10-14', '15-19', '20+'}),
+))
+def test_get_bands(populations, age_ranges, expected):
+    assert populations.get_bands(age_ranges) == expected
+
+
+@pytest.mark.parametrize('age_ranges', (['0-5'], ['3-9'], ['12+'], ['15-25'], ['30+']))
+def test_get_bands_not_aligned(populations, age_ranges):
+    with pytest.raises(ValueError):
+        populations.get_bands(age_ranges)
+
+
+def test_get_population_data(populations):
+    assert populations.get_population_data('United Kingdom', ['0-9', '20+']) == {
+        'population_data': {
+            'country': 'United Kingdom',
+            'target_ages': ['0-9', '20+'],
+            'year': 2020,
+            # the missing male 20+ estimate counts as nothing
+            'total_population': 14 + 200,
+            'male_target_age_population': 5,
+            'female_target_age_population': 110,
+            'total_target_age_population': 115,
+            'urban_percentage': 0.8,
+            'rural_percentage': pytest.approx(0.2),
+        }
+    }
+
+
+def test_get_population_data_year(populations):
+    data = populations.get_population_data('United Kingdom', ['0-4'], year=2015)['population_data']
+
+    assert data['year'] == 2015
+    assert data['total_target_age_population'] == 11
+    assert data['total_population'] == 165
+
+
+@pytest.mark.parametrize('country,target_ages,year', (
+    ('Narnia', ['0-4'], None),
+    # only countries are answered, not regions
+    ('World', ['0-4'], None),
+    ('United Kingdom', ['0-5'], None),
+    ('United Kingdom', ['0-4'], 1990),
+))
+def test_get_population_data_not_estimated(populations, country, target_ages, year):
+    assert populations.get_population_data(country, target_ages, year) is None
+
+
+def test_get_population_data_by_country(populations):
+    data = populations.get_population_data_by_country(['United Kingdom', 'Narnia'], ['0-4'])
+
+    assert data['United Kingdom']['population_data']['total_target_age_population'] == 22
+    assert data['Narnia'] is None
+
+
+def test_get_population_data_by_country_not_aligned(populations):
+    assert populations.get_population_data_by_country(['United Kingdom'], ['0-5']) == {'United Kingdom': None}
+
+
+def test_get_population_data_fixtures():
+    # export plan country names resolve to the UN estimates by ISO 3166 code
+    data = demographics.get_population_data_by_country(['United States', 'Russia'], ['0-14', '65+'])
+
+    assert data['United States']['population_data']['total_population'] == 331005
+    assert data['Russia']['population_data']['total_target_age_population'] > 0
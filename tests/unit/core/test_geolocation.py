@@ -0,0 +1,83 @@
+from unittest import mock
+
+import pytest
+
+from django.contrib.gis.geoip2 import GeoIP2Exception
+
+from core import geolocation
+
+
+@pytest.fixture
+def mock_geoip():
+    with mock.patch.object(geolocation, 'GeoIP2') as mock_geoip:
+        mock_geoip.return_value.country.side_effect = lambda ip: {'country_code': ip}
+        yield mock_geoip
+
+
+def test_reader_country():
+    reader = geolocation.GeoIPReader(maxsize=10)
+
+    assert reader.country('8.8.8.8') == {'country_code': 'US', 'country_name': 'United States'}
+
+
+def test_reader_opens_once(mock_geoip):
+    reader = geolocation.GeoIPReader(maxsize=10)
+
+    reader.country('1.1.1.1')
+    reader.country('2.2.2.2')
+
+    assert mock_geoip.call_count == 1
+
+
+def test_reader_caches_lookups(mock_geoip):
+    reader = geolocation.GeoIPReader(maxsize=10)
+
+    assert reader.country('1.1.1.1') == {'country_code': '1.1.1.1'}
+    assert reader.country('1.1.1.1') == {'country_code': '1.1.1.1'}
+
+    assert mock_geoip.return_value.country.call_count == 1
+
+
+def test_reader_does_not_cache_errors(mock_geoip):
+    mock_geoip.return_value.city.side_effect = GeoIP2Exception
+    reader = geolocation.GeoIPReader(maxsize=10)
+
+    for _ in range(2):
+        with pytest.raises(GeoIP2Exception):
+            reader.city('1.1.1.1')
+
+    assert mock_geoip.return_value.city.call_count == 2
+
+
+def test_reader_reloads_new_database(mock_geoip, settings):
+    settings.GEOIP_RELOAD_CHECK_INTERVAL = 0
+    reader = geolocation.GeoIPReader(maxsize=10)
+    reader.country('1.1.1.1')
+
+    with mock.patch.object(reader, 'get_signature', return_value=(1, 2)):
+        reader.country('1.1.1.1')
+        reader.country('1.1.1.1')
+
+    assert mock_geoip.call_count == 2
+    # the lookups cached before the reload are discarded
+    assert mock_geoip.return_value.country.call_count == 2
+
+
+def test_reader_checks_database_periodically(mock_geoip, settings):
+    settings.GEOIP_RELOAD_CHECK_INTERVAL = 60
+    reader = geolocation.GeoIPReader(maxsize=10)
+    reader.country('1.1.1.1')
+
+    with mock.patch.object(reader, 'get_signature', return_value=(1, 2)) as mock_get_signature:
+        reader.country('1.1.1.1')
+
+    assert mock_get_signature.call_count == 0
+    assert mock_geoip.call_count == 1
+
+
+def test_reader_no_database(settings, tmp_path):
+    settings.GEOIP_PATH = str(tmp_path)
+    reader = geolocation.GeoIPReader(maxsize=10)
+
+    with pytest.raises(GeoIP2Exception):
+        reader.country('8.8.8.8')
@@ -7,6 +7,7 @@ import pytest
 from requests.exceptions import HTTPError
 
 from core import helpers
+from sso import helpers as sso_helpers
 from tests.helpers import create_response
 from django.conf import settings
 
@@ -23,7 +24,7 @@ def test_get_location_unknown_ip(mock_get_client_ip, rf):
     assert mock_get_client_ip.call_args == mock.call(request)
 
 
-@mock.patch.object(helpers.GeoIP2, 'city')
+@mock.patch.object(helpers.geolocation.reader, 'city')
 @mock.patch.object(helpers, 'get_client_ip', return_value=('127.0.0.1', True))
 def test_get_location_unable_to_determine(mock_get_client_ip, mock_city, rf):
     mock_city.side_effect = helpers.GeoIP2Exception
@@ -36,7 +37,7 @@ def test_get_location_unable_to_determine(mock_get_client_ip, mock_city, rf):
     assert mock_city.call_args == mock.call('127.0.0.1')
 
 
-@mock.patch.object(helpers.GeoIP2, 'city')
+@mock.patch.object(helpers.geolocation.reader, 'city')
 @mock.patch.object(helpers, 'get_client_ip', return_value=('127.0.0.1', True))
 def test_get_location_success(mock_get_client_ip, mock_city, rf):
     request = rf.get('/')
@@ -70,26 +71,55 @@ def test_get_location_success(mock_get_client_ip, mock_city, rf):
 
 @mock.patch.object(helpers, 'get_location')
 @mock.patch.object(api_client.personalisation, 'user_location_create')
-def test_store_user_location_error(mock_user_location_create, mock_get_location, user, rf):
+def test_store_user_location_error(mock_user_location_create, mock_get_location, user, rf, run_tasks):
     mock_user_location_create.return_value = create_response(status_code=400)
     mock_get_location.return_value = {'country': 'US'}
     request = rf.get('/')
     request.user = user
 
-    helpers.store_user_location(request)
+    with mock.patch.object(helpers.logger, 'error') as mock_error:
+        helpers.store_user_location(request)
+        run_tasks()
 
     assert mock_user_location_create.call_count == 1
+    assert mock_error.call_args == mock.call(helpers.USER_LOCATION_CREATE_ERROR)
+
+
+@mock.patch.object(helpers, 'get_location')
+@mock.patch.object(api_client.personalisation, 'user_location_create')
+def test_store_user_location_retried(mock_user_location_create, mock_get_location, user, rf, settings, run_tasks):
+    settings.TASK_RETRY_DELAY = 0
+    mock_user_location_create.side_effect = [create_response(status_code=502), create_response(status_code=201)]
+    mock_get_location.return_value = {'country': 'US'}
+    request = rf.get('/')
+    request.user = user
+
+    helpers.store_user_location(request)
+    run_tasks()
+
+    assert mock_user_location_create.call_count == 2
+
+
+@mock.patch.object(helpers, 'get_location', return_value=None)
+def test_store_user_location_unknown_location(mock_get_location, user, rf, task_backend):
+    request = rf.get('/')
+    request.user = user
+
+    helpers.store_user_location(request)
+
+    assert task_backend.get_stats()['queued'] == 0
 
 
 @mock.patch.object(helpers, 'get_location')
 @mock.patch.object(api_client.personalisation, 'user_location_create')
-def test_store_user_location_success(mock_user_location_create, mock_get_location, user, rf):
+def test_store_user_location_success(mock_user_location_create, mock_get_location, user, rf, run_tasks):
     mock_user_location_create.return_value = create_response(status_code=200)
     mock_get_location.return_value = {'country': 'US'}
     request = rf.get('/')
     request.user = user
 
     helpers.store_user_location(request)
+    run_tasks()
 
     assert mock_user_location_create.call_count == 1
     assert mock_user_location_create.call_args == mock.call(
@@ -139,6 +169,27 @@ def test_update_company_profile(mock_profile_update, patch_update_company_profil
     assert mock_profile_update.call_args == mock.call(data=data, sso_session_id=sso_session_id)
 
 
+@mock.patch.object(api_client.company, 'profile_update')
+def test_update_company_profile_invalidates_cached_profile(mock_profile_update, patch_update_company_profile):
+    patch_update_company_profile.stop()
+
+    with mock.patch.object(sso_helpers, 'invalidate_cached_company_profile') as mock_invalidate:
+        helpers.update_company_profile(data={'foo': 'bar'}, sso_session_id='123')
+
+    assert mock_invalidate.call_args == mock.call('123')
+
+
+def test_company_parser_labels_memoised():
+    company = helpers.CompanyParser({'expertise_industries': ['SL10001'], 'expertise_countries': ['FR']})
+
+    with mock.patch.object(helpers, 'values_to_labels', wraps=helpers.values_to_labels) as mock_values_to_labels:
+        for _ in range(3):
+            assert company.expertise_industries_labels == ['Advanced Engineering']
+            assert company.expertise_countries_labels == ['France']
+
+    assert mock_values_to_labels.call_count == 2
+
+
 @pytest.mark.parametrize('company_profile,expected', [
     [{'expertise_countries': [], 'expertise_industries': []}, None],
     [
@@ -197,7 +248,7 @@ def test_company_parser_expertise_countries_hard_code_industries(settings):
     )
 
 
-def test_helper_search_commodity_by_term(requests_mock):
+def test_helper_search_commodity_by_term(requests_mock, commodity_search_cache):
     data = {
         'results': [
             {'commodity_code': '123323', 'description': 'some description'},
@@ -233,3 +284,78 @@ def test_get_popular_export_destinations_fuzzy_match(mock_is_fuzzy):
     mock_is_fuzzy.return_value = True
     destinations = helpers.get_popular_export_destinations('Aerospace')
     assert destinations[0] == ('China', 29)
+
+
+def test_get_export_destinations_index():
+    index = helpers.get_export_destinations_index()
+
+    assert index['Aerospace'][0][:2] == ('China', 29)
+    # top level sectors only
+    assert not any(' :' in sector_label for sector_label in index)
+
+
+@mock.patch.object(helpers, 'is_fuzzy_match', return_value=False)
+def test_get_popular_export_destinations_no_match(mock_is_fuzzy):
+    assert helpers.get_popular_export_destinations('Not a sector') == []
+
+
+def test_get_top_export_destinations():
+    assert helpers.get_top_export_destinations(3) == ['China', 'Germany', 'United Arab Emirates']
+
+
+@pytest.mark.parametrize('term,expected', (
+    ('Gin', 'gin'),
+    ('  Gin   and  tonic ', 'gin and tonic'),
+    ('Whiskies', 'whisky'),
+    ('cheeses', 'cheese'),
+    ('glasses', 'glass'),
+    ('boxes', 'box'),
+    ('peaches', 'peach'),
+    ('asparagus', 'asparagus'),
+    ('gas', 'gas'),
+))
+def test_normalise_commodity_search_term(term, expected):
+    assert helpers.normalise_commodity_search_term(term) == expected
+
+
+@pytest.fixture
+def commodity_search_cache(locmem_cache):
+    helpers.commodity_search_local_cache.clear()
+    yield
+    helpers.commodity_search_local_cache.clear()
+
+
+@mock.patch.object(helpers, 'fetch_commodity_search')
+def test_search_commodity_by_term_cached(mock_fetch_commodity_search, commodity_search_cache):
+    mock_fetch_commodity_search.return_value = {'txId': '1'}
+
+    assert helpers.search_commodity_by_term('Gins') == {'txId': '1'}
+    assert helpers.search_commodity_by_term('gin ') == {'txId': '1'}
+    # the shared tier serves other processes
+    helpers.commodity_search_local_cache.clear()
+    assert helpers.search_commodity_by_term('gin') == {'txId': '1'}
+
+    assert mock_fetch_commodity_search.call_count == 1
+    assert helpers.cache.get_counters(helpers.COMMODITY_SEARCH_CACHE_NAMESPACE) == {
+        'hits': 1, 'misses': 1, 'coalesced': 0
+    }
+
+
+@mock.patch.object(helpers, 'fetch_commodity_refine')
+def test_search_commodity_refine_cached(mock_fetch_commodity_refine, commodity_search_cache):
+    mock_fetch_commodity_refine.side_effect = lambda interraction_id, tx_id, values: {'values': values}
+
+    assert helpers.search_commodity_refine('1', '2', [{'first': 1}]) == {'values': [{'first': 1}]}
+    assert helpers.search_commodity_refine('1', '2', [{'first': 1}]) == {'values': [{'first': 1}]}
+    # a different answer is a different refine state
+    assert helpers.search_commodity_refine('1', '2', [{'first': 2}]) == {'values': [{'first': 2}]}
+
+    assert mock_fetch_commodity_refine.call_count == 2
+
+
+def test_commodity_search_cache_key():
+    # a start and a refine never share a key
+    assert helpers.get_commodity_search_cache_key('start', 'gin') != helpers.get_commodity_search_cache_key('gin')
+    assert helpers.get_commodity_search_cache_key('refine', '1', '2', {'a': 1, 'b': 2}) == (
+        helpers.get_commodity_search_cache_key('refine', '1', '2', {'b': 2, 'a': 1})
+    )
@@ -0,0 +1,82 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import threading
+
+import pytest
+
+from core import http_sessions
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):  # noqa N802
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'sso_display_logged_in=true')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'[]')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    session = http_sessions.PooledSession(pool_maxsize=2, timeout=(1, 2))
+    yield session
+    session.close()
+
+
+def test_pooled_session_reuses_connections(server, session):
+    for _ in range(3):
+        assert session.post(server, json={}).status_code == 200
+
+    stats = session.get_pool_stats()[server[:-1]]
+
+    assert stats == {'maxsize': 2, 'idle': 1, 'connections_opened': 1, 'requests': 3}
+
+
+def test_pooled_session_does_not_keep_cookies(server, session):
+    response = session.post(server, json={})
+
+    assert response.cookies['sso_display_logged_in'] == 'true'
+    assert len(session.cookies) == 0
+
+
+def test_pooled_session_default_timeout(requests_mock, session):
+    requests_mock.post('http://example.com/')
+
+    session.post('http://example.com/')
+    session.post('http://example.com/', timeout=5)
+
+    assert requests_mock.request_history[0].timeout == (1, 2)
+    assert requests_mock.request_history[1].timeout == 5
+
+
+def test_get_session(settings):
+    settings.HTTP_POOL_MAXSIZES = {'test': 3}
+    http_sessions.get_session.cache_clear()
+
+    try:
+        session = http_sessions.get_session('test')
+
+        assert http_sessions.get_session('test') is session
+        assert session.adapter._pool_maxsize == 3
+        assert session.timeout == (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+    finally:
+        http_sessions.get_session.cache_clear()
+
+
+def test_get_pool_stats():
+    assert http_sessions.get_pool_stats().keys() == {http_sessions.COMMODITY_SEARCH, http_sessions.SSO_PROXY}
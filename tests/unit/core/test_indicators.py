@@ -0,0 +1,65 @@
+import math
+from array import array
+
+import pytest
+
+from core import datasets, indicators
+
+
+def make_table(columns):
+    dataset = datasets.Dataset('test.csv', text_columns=('Country', 'Country Code'))
+    return datasets.Table(
+        columns={name: datasets.make_column(name, values, dataset) for name, values in columns.items()},
+        length=len(next(iter(columns.values()))),
+    )
+
+
+def test_get_latest_values():
+    table = datasets.Table(
+        columns={'2018': array('d', [1, 2, math.nan]), '2019': array('d', [3, math.nan, math.nan])}, length=3,
+    )
+
+    assert indicators.get_latest_values(table, codes=[826, 250, 840]) == {
+        826: {'value': 3, 'year': 2019},
+        250: {'value': 2, 'year': 2018},
+    }
+
+
+def test_get_latest_values_unknown_code():
+    table = datasets.Table(columns={'2019': array('d', [1])}, length=1)
+
+    assert indicators.get_latest_values(table, codes=[None]) == {}
+
+
+def test_get_indicators_by_country():
+    store = indicators.Indicators(
+        populations=indicators.demographics.get_populations(),
+        consumer_price_index=make_table({'Country Code': ['GBR', 'WLD'], '2019': [119.5, 100.0]}),
+        average_income=make_table({'Country': ['United Kingdom', 'France'], '2018': [41353.2, math.nan]}),
+    )
+
+    data = store.get_indicators_by_country(['United Kingdom', 'France', 'Narnia'], target_ages=['65+'])
+
+    assert data['United Kingdom']['total_population'] == 67888
+    assert data['United Kingdom']['total_target_age_population'] < data['United Kingdom']['total_population']
+    assert data['United Kingdom']['urban_percentage'] == pytest.approx(0.834)
+    assert data['United Kingdom']['consumer_price_index'] == {'value': 119.5, 'year': 2019}
+    assert data['United Kingdom']['average_income'] == {'value': 41353.2, 'year': 2018}
+    assert data['France']['consumer_price_index'] is None
+    assert data['France']['average_income'] is None
+    assert data['Narnia'] == {
+        'country': 'Narnia',
+        'total_population': None,
+        'total_target_age_population': None,
+        'urban_percentage': None,
+        'rural_percentage': None,
+        'consumer_price_index': None,
+        'average_income': None,
+    }
+
+
+def test_get_indicators_by_country_fixtures():
+    data = indicators.get_indicators_by_country(['Germany', 'Japan'])
+
+    assert data['Germany']['total_population'] == data['Germany']['total_target_age_population']
+    assert data['Japan']['consumer_price_index']['year'] >= 2019
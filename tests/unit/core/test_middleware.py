@@ -25,6 +25,7 @@ def mock_company_profile(mock_get_company_profile):
 def test_stores_user_location(mock_store_user_location, rf, user):
     request = rf.get('/')
     request.user = user
+    request.session = {}
 
     middleware.UserLocationStoreMiddleware().process_request(request)
 
@@ -32,6 +33,27 @@ def test_stores_user_location(mock_store_user_location, rf, user):
     assert mock_store_user_location.call_args == mock.call(request)
 
 
+@mock.patch.object(helpers, 'store_user_location')
+def test_stores_user_location_once_per_session(mock_store_user_location, rf, user):
+    session = {}
+    for _ in range(2):
+        request = rf.get('/')
+        request.user = user
+        request.session = session
+        middleware.UserLocationStoreMiddleware().process_request(request)
+
+    assert mock_store_user_location.call_count == 1
+
+    # the user has moved
+    request = rf.get('/', REMOTE_ADDR='8.8.8.8')
+    request.user = user
+    request.session = session
+    middleware.UserLocationStoreMiddleware().process_request(request)
+
+    assert mock_store_user_location.call_count == 2
+    assert session == {middleware.UserLocationStoreMiddleware.SESSION_KEY_IP: '8.8.8.8'}
+
+
 @mock.patch.object(helpers, 'store_user_location')
 def test_stores_user_location_anon_user(mock_store_user_location, rf):
     request = rf.get('/')
@@ -125,7 +147,10 @@ def test_user_specific_redirect_exportplan_middleware_logged_in_company_name_not
 
 
 @pytest.mark.django_db
-def test_user_product_expertise_middleware(domestic_site, client, mock_update_company_profile, user):
+@mock.patch.object(middleware.sso_helpers, 'set_cached_company_profile')
+def test_user_product_expertise_middleware(
+    mock_set_cached_company_profile, domestic_site, client, mock_update_company_profile, user
+):
     client.force_login(user)
 
     topic_page = factories.ListPageFactory(parent=domestic_site.root_page)
@@ -136,14 +161,21 @@ def test_user_product_expertise_middleware(domestic_site, client, mock_update_co
         {'product': ['Vodka', 'Potassium'], 'remember-expertise-products-services': True, 'hs_codes': [1, 2]}
     )
     assert response.status_code == 200
-    assert mock_update_company_profile.call_count == 1
-    assert mock_update_company_profile.call_args == mock.call(
+    assert mock_update_company_profile.enqueue.call_count == 1
+    assert mock_update_company_profile.enqueue.call_args == mock.call(
         sso_session_id=user.session_id,
         data={
             'expertise_products_services': {'other': ['Vodka', 'Potassium']},
             'hs_codes': ['1', '2']
         }
     )
+    # written through, so later requests show the update before the task worker makes it
+    assert mock_set_cached_company_profile.call_args == mock.call(user.session_id, {
+        'expertise_products_services': {'other': ['Vodka', 'Potassium']},
+        'expertise_countries': [],
+        'expertise_industries': [],
+        'hs_codes': ['1', '2'],
+    })
 
 
 @pytest.mark.django_db
@@ -161,8 +193,8 @@ def test_user_product_expertise_middleware_no_company(
         {'product': ['Vodka', 'Potassium'], 'remember-expertise-products-services': True, 'hs_codes': [1, 2]}
     )
     assert response.status_code == 200
-    assert mock_update_company_profile.call_count == 1
-    assert mock_update_company_profile.call_args == mock.call(
+    assert mock_update_company_profile.enqueue.call_count == 1
+    assert mock_update_company_profile.enqueue.call_args == mock.call(
         sso_session_id=user.session_id,
         data={
             'expertise_products_services': {'other': ['Vodka', 'Potassium']},
@@ -182,7 +214,7 @@ def test_user_product_expertise_middleware_not_logged_in(domestic_site, client,
     )
 
     assert response.status_code == 200
-    assert mock_update_company_profile.call_count == 0
+    assert mock_update_company_profile.enqueue.call_count == 0
 
 
 @pytest.mark.django_db
@@ -197,7 +229,7 @@ def test_user_product_expertise_middleware_not_store(domestic_site, client, mock
         {'product': ['Vodka', 'Potassium']}
     )
     assert response.status_code == 200
-    assert mock_update_company_profile.call_count == 0
+    assert mock_update_company_profile.enqueue.call_count == 0
 
 
 @pytest.mark.django_db
@@ -214,7 +246,7 @@ def test_user_product_expertise_middleware_not_store_idempotent(
         {'product': ['Vodka'], 'remember-expertise-products-services': True}
     )
     assert response.status_code == 200
-    assert mock_update_company_profile.call_count == 0
+    assert mock_update_company_profile.enqueue.call_count == 0
 
 
 def dummy_valid_ga_360_response():
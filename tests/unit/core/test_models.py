@@ -19,7 +19,10 @@ from core.models import (
     InterstitialPage,
     LandingPage,
     ListPage,
+    ReadProgress,
+    build_lesson_navigation,
     case_study_body_validation,
+    get_lesson_navigation,
 )
 
 from domestic.models import DomesticDashboard, DomesticHomePage
@@ -37,7 +40,7 @@ def test_object_hash():
 
 
 @pytest.mark.django_db
-def test_detail_page_can_mark_as_read(client, domestic_homepage, user, domestic_site):
+def test_detail_page_can_mark_as_read(client, domestic_homepage, user, domestic_site, run_tasks):
     # given the user has not read a lesson
     client.force_login(user)
 
@@ -46,6 +49,8 @@ def test_detail_page_can_mark_as_read(client, domestic_homepage, user, domestic_
     detail_page = factories.DetailPageFactory(parent=curated_list_page)
 
     client.get(detail_page.url)
+    client.get(detail_page.url)
+    run_tasks()
 
     # then the progress is saved
     read_hit = detail_page.page_views.get()
@@ -54,7 +59,7 @@ def test_detail_page_can_mark_as_read(client, domestic_homepage, user, domestic_
 
 
 @pytest.mark.django_db
-def test_detail_page_cannot_mark_as_read(client, domestic_homepage, user, domestic_site):
+def test_detail_page_cannot_mark_as_read(client, domestic_homepage, user, domestic_site, run_tasks):
     # given the user has not read a lesson
     client.force_login(user)
     list_page = factories.ListPageFactory(parent=domestic_homepage, record_read_progress=False)
@@ -62,18 +67,20 @@ def test_detail_page_cannot_mark_as_read(client, domestic_homepage, user, domest
     detail_page = factories.DetailPageFactory(parent=curated_list_page)
 
     client.get(detail_page.url)
+    run_tasks()
 
     # then the progress is saved
     assert detail_page.page_views.count() == 0
 
 
 @pytest.mark.django_db
-def test_detail_page_anon_user_not_marked_as_read(client, domestic_homepage, domestic_site):
+def test_detail_page_anon_user_not_marked_as_read(client, domestic_homepage, domestic_site, run_tasks):
     # given the user has not read a lesson
     list_page = factories.CuratedListPageFactory(parent=domestic_homepage)
     detail_page = factories.DetailPageFactory(parent=list_page)
 
     client.get(detail_page.url)
+    run_tasks()
 
     # then the progress is unaffected
     assert detail_page.page_views.count() == 0
@@ -103,6 +110,34 @@ def test_curated_list_page_has_link_in_context_back_to_parent(client, domestic_h
     assert expected_link_string.encode('utf-8') in resp.content
 
 
+@pytest.mark.django_db
+def test_list_page_shows_module_read_progress(client, domestic_homepage, domestic_site, user):
+    list_page = factories.ListPageFactory(
+        parent=domestic_homepage,
+        record_read_progress=True,
+        slug='learn',
+        template='learn/automated_list_page.html',
+    )
+    module_one = factories.CuratedListPageFactory(parent=list_page, slug='module-one')
+    module_two = factories.CuratedListPageFactory(parent=list_page, slug='module-two')
+    factories.DetailPageFactory(parent=module_one, slug='lesson-one')
+    factories.DetailPageFactory(parent=module_one, slug='lesson-two')
+    factories.DetailPageFactory(parent=module_two, slug='lesson-three')
+    ReadProgress.objects.create(sso_id=str(user.pk), module=module_one, read_count=1)
+
+    response = client.get(list_page.url)
+    assert response.context['modules'] == [module_one, module_two]
+    assert b'lessons read' not in response.content
+
+    client.force_login(user)
+    response = client.get(list_page.url)
+    assert [module.read_counts for module in response.context['modules']] == [
+        {'read_count': 1, 'total_pages': 2}, {'read_count': 0, 'total_pages': 1},
+    ]
+    assert response.content.count(b'lessons read') == 1
+    assert b'1/2 lessons read' in response.content
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'querystring_to_add,expected_backlink_value',
@@ -444,3 +479,78 @@ class TestGreatMedia(TestCase):
             'type': 'video/mp4',
             'transcript': 'A test transcript text',
         }])
+
+
+@pytest.fixture
+def lesson_modules(domestic_homepage):
+    list_page = factories.ListPageFactory(parent=domestic_homepage, record_read_progress=True)
+    module_1 = factories.CuratedListPageFactory(parent=list_page, slug='module-1', topics__0__title='Topic 1')
+    module_2 = factories.CuratedListPageFactory(parent=list_page, slug='module-2', topics__0__title='Topic 2')
+    lesson_1 = DetailPageFactory(parent=module_1, slug='lesson-1')
+    lesson_2 = DetailPageFactory(parent=module_1, slug='lesson-2')
+    draft = DetailPageFactory(parent=module_1, slug='draft', live=False)
+    lesson_3 = DetailPageFactory(parent=module_2, slug='lesson-3')
+    module_1.topics = [
+        ('topic', factories.CuratedTopicBlockfactory(title='Topic 1', pages=[lesson_2, draft])),
+        ('topic', factories.CuratedTopicBlockfactory(title='Topic 2', pages=[lesson_1])),
+    ]
+    module_1.save()
+    module_2.topics = [('topic', factories.CuratedTopicBlockfactory(title='Topic 3', pages=[lesson_3]))]
+    module_2.save()
+    return module_1, module_2, lesson_1, lesson_2, draft, lesson_3
+
+
+@pytest.mark.django_db
+def test_build_lesson_navigation(lesson_modules):
+    module_1, module_2, lesson_1, lesson_2, draft, lesson_3 = lesson_modules
+
+    navigation = build_lesson_navigation()
+
+    assert navigation[module_1.path] == {
+        'id': module_1.pk,
+        'lessons': [lesson_2.pk, lesson_1.pk],
+        'positions': {lesson_2.pk: 0, lesson_1.pk: 1},
+        'next_module': module_2.path,
+    }
+    assert navigation[module_2.path] == {
+        'id': module_2.pk, 'lessons': [lesson_3.pk], 'positions': {lesson_3.pk: 0}, 'next_module': None,
+    }
+
+
+@pytest.mark.django_db
+def test_detail_page_navigation_context(lesson_modules, django_assert_num_queries):
+    module_1, module_2, lesson_1, lesson_2, draft, lesson_3 = lesson_modules
+    navigation = build_lesson_navigation()
+
+    # the current and next module and the next lesson, by content type
+    with django_assert_num_queries(3):
+        context = lesson_1.get_navigation_context(navigation)
+    assert context == {'current_module': module_1, 'next_module': module_2, 'next_lesson': lesson_3}
+    assert lesson_2.get_navigation_context(navigation) == {'current_module': module_1, 'next_lesson': lesson_1}
+    assert lesson_3.get_navigation_context(navigation) == {'current_module': module_2}
+    # not in any of the module's topics
+    assert draft.get_navigation_context(navigation) == {
+        'current_module': module_1, 'next_module': module_2, 'next_lesson': lesson_3,
+    }
+
+
+@pytest.mark.django_db
+def test_lesson_navigation_refreshed(lesson_modules, locmem_cache):
+    module_1, module_2, lesson_1, lesson_2, draft, lesson_3 = lesson_modules
+    get_lesson_navigation()
+
+    draft.save_revision().publish()
+    assert get_lesson_navigation()[module_1.path]['lessons'] == [lesson_2.pk, draft.pk, lesson_1.pk]
+
+    lesson_2.unpublish()
+    assert get_lesson_navigation()[module_1.path]['lessons'] == [draft.pk, lesson_1.pk]
+
+    module_2.move(module_1.get_parent(), pos='first-child')
+    module_1.refresh_from_db()
+    module_2.refresh_from_db()
+    navigation = get_lesson_navigation()
+    assert navigation[module_2.path]['next_module'] == module_1.path
+    assert navigation[module_1.path]['next_module'] is None
+
+    lesson_3.delete()
+    assert get_lesson_navigation()[module_2.path]['lessons'] == []
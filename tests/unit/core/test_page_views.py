@@ -0,0 +1,170 @@
+import json
+from unittest import mock
+
+import pytest
+import redis
+from redis.exceptions import LockNotOwnedError
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core import models, page_views
+from tests.unit.core import factories
+
+
+@pytest.fixture
+def lesson(domestic_homepage):
+    list_page = factories.ListPageFactory(parent=domestic_homepage, slug='topic', record_read_progress=True)
+    module = factories.CuratedListPageFactory(parent=list_page, slug='module')
+    return factories.DetailPageFactory(parent=module, slug='lesson')
+
+
+def test_record(page_view_buffer, task_backend, settings):
+    settings.PAGE_VIEW_FLUSH_INTERVAL = 10
+
+    page_views.record(page_id=1, list_page_id=2, sso_id=3)
+
+    assert [json.loads(message) for message in page_view_buffer.messages] == [
+        {'page_id': 1, 'list_page_id': 2, 'sso_id': '3'}
+    ]
+    assert task_backend.get_stats() == {'queued': 0, 'scheduled': 1, 'failed': 0}
+    assert json.loads(task_backend.scheduled[0][1])['name'] == 'core.page_views.flush'
+
+
+def test_record_flush_scheduled_once(locmem_cache, page_view_buffer, task_backend, settings):
+    settings.PAGE_VIEW_FLUSH_INTERVAL = 10
+
+    page_views.record(page_id=1, list_page_id=2, sso_id=3)
+    page_views.record(page_id=4, list_page_id=2, sso_id=3)
+
+    assert len(page_view_buffer.messages) == 2
+    assert task_backend.get_stats()['scheduled'] == 1
+
+
+@pytest.mark.django_db
+def test_handle_page_view_does_not_write(lesson, rf, user, page_view_buffer, task_backend):
+    request = rf.get('/')
+    request.user = user
+
+    with CaptureQueriesContext(connection) as queries:
+        lesson.handle_page_view(request)
+
+    assert all(query['sql'].startswith('SELECT') for query in queries)
+    assert len(page_view_buffer.messages) == 1
+
+
+@pytest.mark.django_db
+def test_flush(lesson, page_view_buffer, run_tasks, settings, user):
+    settings.PAGE_VIEW_FLUSH_BATCH_SIZE = 2
+    list_page = lesson.get_parent().get_parent()
+    models.PageView.objects.create(page=lesson, list_page=list_page.specific, sso_id='1')
+    page_views.record(page_id=lesson.pk, list_page_id=list_page.pk, sso_id=1)
+    page_views.record(page_id=lesson.pk, list_page_id=list_page.pk, sso_id=2)
+    page_views.record(page_id=lesson.pk, list_page_id=list_page.pk, sso_id=2)
+    # deleted since it was viewed
+    page_views.record(page_id=lesson.pk + 100, list_page_id=list_page.pk, sso_id=2)
+
+    run_tasks()
+
+    assert sorted(models.PageView.objects.values_list('sso_id', flat=True)) == ['1', '2']
+    assert len(page_view_buffer.messages) == 0
+    # the view already recorded is counted once
+    assert sorted(models.ReadProgress.objects.values_list('sso_id', 'module_id', 'read_count')) == [
+        ('1', lesson.get_parent().pk, 1), ('2', lesson.get_parent().pk, 1),
+    ]
+
+
+@pytest.mark.django_db
+def test_flush_failed_keeps_views(lesson, page_view_buffer):
+    page_views.record(page_id=lesson.pk, list_page_id=lesson.get_parent().get_parent().pk, sso_id=1)
+
+    with mock.patch.object(models.PageView.objects, 'bulk_create', side_effect=ValueError()):
+        with pytest.raises(ValueError):
+            page_views.flush()
+
+    assert len(page_view_buffer.messages) == 1
+
+
+@pytest.mark.django_db
+def test_flush_lost_lock_keeps_views(lesson, page_view_buffer):
+    page_views.record(page_id=lesson.pk, list_page_id=lesson.get_parent().get_parent().pk, sso_id=1)
+
+    # the lock expired while writing, and another flush may have read the same views
+    with mock.patch.object(page_view_buffer.flush_lock, 'reacquire', side_effect=LockNotOwnedError()):
+        with pytest.raises(LockNotOwnedError):
+            page_views.flush()
+
+    assert len(page_view_buffer.messages) == 1
+
+
+@pytest.mark.django_db
+def test_flush_holds_lock(lesson, page_view_buffer):
+    page_views.record(page_id=lesson.pk, list_page_id=lesson.get_parent().get_parent().pk, sso_id=1)
+
+    def write(messages):
+        assert page_view_buffer.flush_lock.lock.locked()
+
+    with mock.patch.object(page_views, 'write', side_effect=write) as mock_write:
+        page_views.flush()
+
+    assert mock_write.call_count == 1
+    assert not page_view_buffer.flush_lock.lock.locked()
+
+
+def test_redis_buffer_lock(settings):
+    settings.PAGE_VIEW_FLUSH_LOCK_TIMEOUT = 60
+
+    with mock.patch.object(redis.Redis, 'lock') as mock_lock:
+        page_views.RedisBuffer().lock()
+
+    assert mock_lock.call_args == mock.call('page-views:flush-lock', timeout=60, blocking_timeout=60)
+
+
+@mock.patch.object(redis.Redis, 'rpush', side_effect=redis.ConnectionError())
+def test_redis_buffer_unavailable(mock_rpush):
+    with mock.patch.object(page_views.logger, 'error') as mock_error:
+        assert page_views.RedisBuffer().push('[]') is False
+
+    assert mock_error.call_args == mock.call(page_views.PAGE_VIEW_BUFFER_ERROR, exc_info=True)
+
+
+@pytest.mark.django_db
+def test_read_progress_list_pages_invalidated(lesson, locmem_cache):
+    list_page = lesson.get_parent().get_parent().specific
+    assert lesson.get_read_progress_list_page_id() == list_page.pk
+
+    list_page.record_read_progress = False
+    list_page.save_revision().publish()
+
+    assert lesson.get_read_progress_list_page_id() is None
+
+
+@pytest.mark.django_db
+def test_rebuild_read_progress(lesson):
+    module = lesson.get_parent()
+    list_page = module.get_parent().specific
+    other_module = factories.CuratedListPageFactory(parent=list_page, slug='other-module')
+    other_lesson = factories.DetailPageFactory(parent=module, slug='other-lesson')
+    for page, sso_id in [(lesson, '1'), (other_lesson, '1'), (lesson, '2')]:
+        models.PageView.objects.create(page=page, list_page=list_page, sso_id=sso_id)
+    page_views.rebuild_read_progress()
+    other_lesson.move(other_module, pos='last-child')
+
+    page_views.rebuild_read_progress(sso_ids=['1'])
+
+    assert sorted(models.ReadProgress.objects.values_list('sso_id', 'module_id', 'read_count')) == [
+        ('1', module.pk, 1), ('1', other_module.pk, 1), ('2', module.pk, 1),
+    ]
+
+
+@pytest.mark.django_db
+def test_rebuild_read_progress_counts_live_lessons(lesson):
+    module = lesson.get_parent()
+    draft = factories.DetailPageFactory(parent=module, slug='draft')
+    for page in [lesson, draft]:
+        models.PageView.objects.create(page=page, list_page=module.get_parent(), sso_id='1')
+    draft.unpublish()
+
+    page_views.rebuild_read_progress()
+
+    assert list(models.ReadProgress.objects.values_list('sso_id', 'module_id', 'read_count')) == [('1', module.pk, 1)]
@@ -0,0 +1,269 @@
+import functools
+import re
+from unittest import mock
+
+import pytest
+import requests_mock as requests_mock_module
+from directory_api_client import api_client
+from directory_sso_api_client import sso_api_client
+from requests.exceptions import HTTPError
+
+from django.urls import reverse
+
+from core import constants, http_sessions, middleware, request_cache
+from exportplan import helpers as exportplan_helpers
+from sso import helpers as sso_helpers
+from tests.helpers import create_response
+
+
+@pytest.fixture(autouse=True)
+def unpatched_api_clients():
+    # some fixtures start patches of these client methods without stopping them
+    methods = [
+        (api_client.exportplan, 'exportplan_list'),
+        (sso_api_client.user, 'get_user_page_views'),
+        (sso_api_client.user, 'set_user_page_view'),
+        (sso_api_client.user, 'get_user_lesson_completed'),
+    ]
+    patches = [mock.patch.object(client, name, getattr(type(client), name).__get__(client)) for client, name in methods]
+    for patch in patches:
+        patch.start()
+    yield
+    for patch in patches:
+        patch.stop()
+
+
+@pytest.fixture
+def active_request_cache():
+    yield request_cache.activate()
+    request_cache.deactivate()
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_memoize_no_active_cache(mock_exportplan_list):
+    mock_exportplan_list.return_value = create_response([{'pk': 1}])
+
+    exportplan_helpers.get_exportplan('123')
+    exportplan_helpers.get_exportplan('123')
+
+    assert mock_exportplan_list.call_count == 2
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_memoize_active_cache(mock_exportplan_list, active_request_cache):
+    mock_exportplan_list.return_value = create_response([{'pk': 1}])
+
+    assert exportplan_helpers.get_exportplan('123') == {'pk': 1}
+    assert exportplan_helpers.get_exportplan(sso_session_id='123') == {'pk': 1}
+
+    assert mock_exportplan_list.call_count == 1
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_memoize_keyed_by_session_id(mock_exportplan_list, active_request_cache):
+    mock_exportplan_list.return_value = create_response([{'pk': 1}])
+
+    exportplan_helpers.get_exportplan('123')
+    exportplan_helpers.get_exportplan('456')
+
+    assert mock_exportplan_list.call_count == 2
+
+
+@mock.patch.object(api_client.dataservices, 'get_population_data')
+def test_memoize_unhashable_arguments(mock_get_population_data, active_request_cache):
+    mock_get_population_data.return_value = create_response({'population_data': {}})
+
+    exportplan_helpers.get_population_data(country='Germany', target_ages=['25-34', '35-44'])
+    exportplan_helpers.get_population_data(country='Germany', target_ages=['25-34', '35-44'])
+    exportplan_helpers.get_population_data(country='Germany', target_ages=['25-34'])
+
+    assert mock_get_population_data.call_count == 2
+
+
+def test_memoize_does_not_cache_errors(auth_backend, active_request_cache):
+    auth_backend.return_value = create_response(status_code=500)
+
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            sso_helpers.get_user_profile('123')
+
+    assert auth_backend.call_count == 2
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_update')
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_write_invalidates_cached_read(mock_exportplan_list, mock_exportplan_update, active_request_cache):
+    mock_exportplan_list.return_value = create_response([{'pk': 1}])
+    mock_exportplan_update.return_value = create_response({'pk': 1})
+
+    exportplan_helpers.get_exportplan('123')
+    exportplan_helpers.update_exportplan(sso_session_id='123', id=1, data={'sectors': []})
+    exportplan_helpers.get_exportplan('123')
+
+    assert mock_exportplan_list.call_count == 2
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_update')
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_failed_write_invalidates_cached_read(mock_exportplan_list, mock_exportplan_update, active_request_cache):
+    mock_exportplan_list.return_value = create_response([{'pk': 1}])
+    mock_exportplan_update.return_value = create_response(status_code=500)
+
+    exportplan_helpers.get_exportplan('123')
+    with pytest.raises(HTTPError):
+        exportplan_helpers.update_exportplan(sso_session_id='123', id=1, data={'sectors': []})
+    exportplan_helpers.get_exportplan('123')
+
+    assert mock_exportplan_list.call_count == 2
+
+
+def test_request_cache_middleware(rf):
+    request = rf.get('/')
+    instance = middleware.RequestCacheMiddleware()
+
+    instance.process_request(request)
+
+    assert request_cache.get_current() is request.request_cache
+
+    instance.process_response(request, mock.Mock())
+
+    assert request_cache.get_current() is None
+
+
+def test_memoize_api_client_no_active_cache(requests_mock):
+    requests_mock.get(re.compile('.*/exportplan/company-export-plan/'), json=[{'pk': 1}])
+
+    api_client.exportplan.exportplan_list('123')
+    api_client.exportplan.exportplan_list('123')
+
+    assert requests_mock.call_count == 2
+
+
+def test_memoize_api_client(requests_mock, active_request_cache):
+    requests_mock.get(re.compile('.*/exportplan/company-export-plan/'), json=[{'pk': 1}])
+
+    assert api_client.exportplan.exportplan_list('123').json() == [{'pk': 1}]
+    assert api_client.exportplan.exportplan_list('123').json() == [{'pk': 1}]
+    api_client.exportplan.exportplan_list('456')
+
+    assert requests_mock.call_count == 2
+    assert active_request_cache.upstream_calls == {'GET /exportplan/company-export-plan/': 2}
+
+
+@pytest.fixture
+def unpatched_get_session_user(auth_backend):
+    auth_backend.side_effect = functools.partial(type(sso_api_client.user).get_session_user, sso_api_client.user)
+
+
+def test_memoize_api_client_not_helper_specific(requests_mock, active_request_cache, unpatched_get_session_user):
+    # a read made by a helper that is not memoized, e.g. the session lookup of the authentication backend
+    requests_mock.get(re.compile('.*/api/v1/session-user/'), json={'id': 1})
+
+    sso_api_client.user.get_session_user('123')
+    sso_api_client.user.get_session_user('123')
+
+    assert requests_mock.call_count == 1
+    assert active_request_cache.upstream_call_count == 1
+
+
+def test_memoize_api_client_server_errors_not_cached(requests_mock, active_request_cache):
+    requests_mock.get(re.compile('.*/exportplan/company-export-plan/'), status_code=500)
+
+    api_client.exportplan.exportplan_list('123')
+    api_client.exportplan.exportplan_list('123')
+
+    assert requests_mock.call_count == 2
+
+
+def test_memoize_api_client_write_invalidates(requests_mock, active_request_cache):
+    requests_mock.get(re.compile('.*/exportplan/company-export-plan/'), json=[{'pk': 1}])
+    requests_mock.patch(re.compile('.*/exportplan/company-export-plan/1/'), json={'pk': 1})
+
+    api_client.exportplan.exportplan_list('123')
+    api_client.exportplan.exportplan_update('123', id=1, data={'sectors': []})
+    api_client.exportplan.exportplan_list('123')
+
+    assert requests_mock.call_count == 3
+    assert active_request_cache.upstream_calls == {
+        'GET /exportplan/company-export-plan/': 2,
+        'PATCH /exportplan/company-export-plan/1/': 1,
+    }
+
+
+def test_pooled_session_counted(requests_mock, active_request_cache):
+    requests_mock.post(re.compile('.*'), json={})
+
+    http_sessions.get_session(http_sessions.COMMODITY_SEARCH).post('http://example.com/search/', json={})
+
+    assert active_request_cache.upstream_calls == {'POST /search/': 1}
+
+
+UPSTREAM_RESPONSES = {
+    '/api/v1/session-user/': {'id': 1, 'email': 'jim@example.com', 'hashed_uuid': 'abc', 'user_profile': {}},
+    '/supplier/company/': {'name': 'Cool Company', 'expertise_industries': ['SL10001']},
+    '/exportplan/company-export-plan/': [{
+        'pk': 1,
+        'about_your_business': '',
+        'target_markets_research': '',
+        'export_countries': [],
+        'export_commodity_codes': [],
+    }],
+    '/personalisation/events/': {'results': []},
+    '/personalisation/export-opportunities/': {'results': []},
+    '/api/v1/user/page-view/': {'result': 'ok', 'page_views': {}},
+    '/api/v1/user/lesson-completed/': {'result': 'ok', 'lesson_completed': []},
+}
+
+
+@pytest.fixture
+def upstream(
+    requests_mock,
+    client,
+    unpatched_get_session_user,
+    patch_get_company_profile,
+    patch_get_dashboard_events,
+    patch_get_dashboard_export_opportunities,
+    user,
+):
+    """Serves every upstream API over HTTP, so all the calls a page makes are counted."""
+    patch_get_company_profile.stop()
+    patch_get_dashboard_events.stop()
+    patch_get_dashboard_export_opportunities.stop()
+
+    def respond(request, context):
+        for path, body in UPSTREAM_RESPONSES.items():
+            if request.path.startswith(path):
+                return body
+        return {}
+
+    requests_mock.register_uri(requests_mock_module.ANY, re.compile('.*'), json=respond)
+    client.force_login(user)
+    return requests_mock
+
+
+@pytest.mark.django_db
+def test_dashboard_upstream_call_budget(upstream, client, domestic_homepage, domestic_dashboard):
+    response = client.get(constants.DASHBOARD_URL)
+
+    assert response.status_code == 200
+    # each read once, however many times the request needs it
+    assert response.wsgi_request.request_cache.upstream_calls == {
+        'GET /api/v1/session-user/': 1,
+        'GET /supplier/company/': 1,
+        'GET /exportplan/company-export-plan/': 1,
+        'GET /api/v1/user/page-view/': 1,
+        'GET /personalisation/events/': 1,
+        'GET /personalisation/export-opportunities/': 1,
+    }
+
+
+@pytest.mark.django_db
+def test_export_plan_section_upstream_call_budget(upstream, client, exportplan_dashboard):
+    response = client.get(reverse('exportplan:section', kwargs={'slug': 'about-your-business'}))
+
+    assert response.status_code == 200
+    assert response.wsgi_request.request_cache.upstream_calls == {
+        'GET /api/v1/session-user/': 1,
+        'GET /supplier/company/': 1,
+        'GET /exportplan/company-export-plan/': 1,
+    }
@@ -0,0 +1,195 @@
+import json
+from unittest import mock
+
+import pytest
+import redis
+from requests.exceptions import HTTPError, Timeout
+
+from core import cache, tasks
+from tests.helpers import create_response
+
+
+@tasks.task
+def record(value, calls):
+    calls.append(value)
+
+
+RECORD = f'{__name__}.record'
+
+
+@pytest.fixture
+def mock_record():
+    # run by the worker via its import path, so patched as the module attribute
+    with mock.patch(RECORD) as patched:
+        yield patched
+
+
+def test_task_registers():
+    assert tasks.registry[RECORD] is record
+
+
+def test_enqueue(task_backend):
+    record.enqueue(1, calls=[])
+
+    message = json.loads(task_backend.queue[0])
+    assert message['name'] == RECORD
+    assert message['args'] == [1]
+    assert message['kwargs'] == {'calls': []}
+    assert message['attempt'] == 1
+
+
+def test_enqueue_not_run_in_request(task_backend, mock_record):
+    tasks.enqueue(RECORD, 1, calls=[])
+
+    assert mock_record.call_count == 0
+    assert task_backend.get_stats() == {'queued': 1, 'scheduled': 0, 'failed': 0}
+
+
+def test_worker_runs_tasks_in_order(task_backend, mock_record, run_tasks):
+    tasks.enqueue(RECORD, 1, calls=[])
+    tasks.enqueue(RECORD, 2, calls=[])
+
+    run_tasks()
+
+    assert mock_record.call_args_list == [mock.call(1, calls=[]), mock.call(2, calls=[])]
+    assert task_backend.get_stats() == {'queued': 0, 'scheduled': 0, 'failed': 0}
+
+
+def test_worker_retries_request_errors(task_backend, mock_record, run_tasks, settings):
+    settings.TASK_RETRY_DELAY = 0
+    mock_record.side_effect = [Timeout(), HTTPError(response=create_response(status_code=502)), None]
+    tasks.enqueue(RECORD, 1, calls=[])
+
+    run_tasks()
+
+    assert mock_record.call_count == 3
+    assert task_backend.get_stats() == {'queued': 0, 'scheduled': 0, 'failed': 0}
+
+
+def test_worker_retries_with_backoff(task_backend, mock_record, settings):
+    settings.TASK_RETRY_DELAY = 10
+    mock_record.side_effect = Timeout()
+    tasks.enqueue(RECORD, 1, calls=[])
+    worker = tasks.Worker(backend=task_backend, name='test')
+
+    with mock.patch('time.time', return_value=1000):
+        worker.work(burst=True)
+    with mock.patch('time.time', return_value=1010):
+        worker.work(burst=True)
+
+    assert mock_record.call_count == 2
+    run_at, message = task_backend.scheduled[0]
+    # 10 seconds after the first attempt, then 20 after the second
+    assert run_at == 1030
+    assert json.loads(message)['attempt'] == 3
+
+
+def test_worker_gives_up(task_backend, mock_record, run_tasks, settings):
+    settings.TASK_RETRY_DELAY = 0
+    settings.TASK_MAX_ATTEMPTS = 2
+    mock_record.side_effect = Timeout()
+    tasks.enqueue(RECORD, 1, calls=[])
+
+    with mock.patch.object(tasks.logger, 'error') as mock_error:
+        run_tasks()
+
+    assert mock_record.call_count == 2
+    assert mock_error.call_count == 1
+    assert task_backend.get_stats() == {'queued': 0, 'scheduled': 0, 'failed': 1}
+
+
+def test_worker_client_errors_not_retried(task_backend, mock_record, run_tasks):
+    mock_record.side_effect = HTTPError(response=create_response(status_code=400))
+    tasks.enqueue(RECORD, 1, calls=[])
+
+    with mock.patch.object(tasks.logger, 'error') as mock_error:
+        run_tasks()
+
+    assert mock_record.call_count == 1
+    assert mock_error.call_args == mock.call(tasks.TASK_FAILED_ERROR, exc_info=True, extra=mock.ANY)
+    assert task_backend.get_stats() == {'queued': 0, 'scheduled': 0, 'failed': 1}
+
+
+def test_worker_failure_leaves_out_arguments(task_backend, mock_record, run_tasks):
+    mock_record.side_effect = ValueError()
+    tasks.enqueue(RECORD, 'session-id', calls=[])
+    task_id = json.loads(task_backend.queue[0])['id']
+
+    with mock.patch.object(tasks.logger, 'error') as mock_error:
+        run_tasks()
+
+    summary = {'id': task_id, 'name': RECORD, 'attempt': 1}
+    assert mock_error.call_args == mock.call(tasks.TASK_FAILED_ERROR, exc_info=True, extra={'task': summary})
+    assert [json.loads(message) for message in task_backend.failed] == [summary]
+
+
+def test_worker_other_errors_not_retried(task_backend, mock_record, run_tasks):
+    mock_record.side_effect = ValueError()
+    tasks.enqueue(RECORD, 1, calls=[])
+
+    with mock.patch.object(tasks.logger, 'error') as mock_error:
+        run_tasks()
+
+    assert mock_record.call_count == 1
+    assert mock_error.call_args == mock.call(tasks.TASK_FAILED_ERROR, exc_info=True, extra=mock.ANY)
+    assert task_backend.get_stats() == {'queued': 0, 'scheduled': 0, 'failed': 1}
+
+
+def test_worker_unregistered_task(task_backend, run_tasks):
+    tasks.enqueue('core.helpers.get_location', None)
+
+    with mock.patch('core.helpers.get_location') as mock_get_location:
+        run_tasks()
+
+    assert mock_get_location.call_count == 0
+    assert task_backend.get_stats() == {'queued': 0, 'scheduled': 0, 'failed': 1}
+
+
+def test_worker_stop(task_backend, mock_record):
+    worker = tasks.Worker(backend=task_backend, name='test')
+    tasks.enqueue(RECORD, 1, calls=[])
+    tasks.enqueue(RECORD, 2, calls=[])
+    mock_record.side_effect = lambda *args, **kwargs: worker.stop()
+
+    worker.work()
+
+    assert mock_record.call_count == 1
+    assert task_backend.get_stats()['queued'] == 1
+
+
+def test_counters(locmem_cache, mock_record, run_tasks, settings):
+    settings.TASK_RETRY_DELAY = 0
+    mock_record.side_effect = [Timeout(), None]
+    tasks.enqueue(RECORD, 1, calls=[])
+
+    run_tasks()
+
+    assert cache.get_counters(tasks.get_counter_namespace(RECORD), tasks.OUTCOMES) == {
+        'enqueued': 1, 'dropped': 0, 'succeeded': 1, 'retried': 1, 'failed': 0,
+    }
+
+
+@mock.patch.object(redis.Redis, 'lpush', side_effect=redis.ConnectionError())
+def test_redis_backend_unavailable(mock_lpush):
+    with mock.patch.object(tasks.logger, 'error') as mock_error:
+        assert tasks.RedisBackend().push('[]') is False
+
+    assert mock_error.call_args == mock.call(tasks.TASK_ENQUEUE_ERROR, exc_info=True)
+
+
+@mock.patch.object(redis.Redis, 'rpoplpush')
+def test_redis_backend_recover(mock_rpoplpush):
+    mock_rpoplpush.side_effect = ['[]', '[]', None]
+
+    tasks.RedisBackend().recover('worker-1')
+
+    assert mock_rpoplpush.call_args_list == [mock.call('tasks:processing:worker-1', 'tasks:queue')] * 3
+
+
+def test_schedule(task_backend):
+    with mock.patch('time.time', return_value=1000):
+        record.schedule(10, 1, calls=[])
+
+    run_at, message = task_backend.scheduled[0]
+    assert run_at == 1010
+    assert json.loads(message)['args'] == [1]
@@ -4,13 +4,13 @@ from unittest import mock
 from unittest.mock import patch, Mock
 
 from directory_api_client import api_client
-from directory_sso_api_client import sso_api_client
 from formtools.wizard.views import normalize_name
 import pytest
 
 from django.urls import reverse
 
 from core import forms, helpers, serializers, views, constants
+from core.models import ReadProgress
 from tests.helpers import create_response
 from tests.unit.core.factories import CuratedListPageFactory, DetailPageFactory, ListPageFactory
 from tests.unit.learn.factories import LessonPageFactory
@@ -131,9 +131,7 @@ def test_api_update_company_not_logged_in(client, company_data):
 @pytest.mark.django_db
 @mock.patch.object(api_client.personalisation, 'events_by_location_list')
 @mock.patch.object(api_client.personalisation, 'export_opportunities_by_relevance_list')
-@mock.patch.object(sso_api_client.user, 'get_user_lesson_completed')
 def test_dashboard_page_logged_in(
-    mock_get_user_lesson_completed,
     mock_events_by_location_list,
     mock_export_opportunities_by_relevance_list,
     patch_set_user_page_view,
@@ -144,7 +142,6 @@ def test_dashboard_page_logged_in(
     client,
     user
 ):
-    mock_get_user_lesson_completed.return_value = create_response(json_body={'results': []})
     mock_events_by_location_list.return_value = create_response(json_body={'results': []})
     mock_export_opportunities_by_relevance_list.return_value = create_response(json_body={'results': []})
     client.force_login(user)
@@ -167,9 +164,7 @@ def test_dashboard_page_not_logged_in(
 @pytest.mark.django_db
 @mock.patch.object(api_client.personalisation, 'events_by_location_list')
 @mock.patch.object(api_client.personalisation, 'export_opportunities_by_relevance_list')
-@mock.patch.object(sso_api_client.user, 'get_user_lesson_completed')
 def test_dashboard_page_lesson_progress(
-    mock_get_user_lesson_completed,
     mock_export_opportunities_by_relevance_list,
     mock_events_by_location_list,
     patch_set_user_page_view,
@@ -191,18 +186,15 @@ def test_dashboard_page_lesson_progress(
     module_one = CuratedListPageFactory(parent=section_one, slug='section-one-module-one')
     module_two = CuratedListPageFactory(parent=section_two, slug='section-two-module-one')
     CuratedListPageFactory(parent=section_two, slug='section-two-module-two')
-    lesson_one = DetailPageFactory(parent=module_one, slug='lesson-one')
-    lesson_two = DetailPageFactory(parent=module_one, slug='lesson-two')
+    DetailPageFactory(parent=module_one, slug='lesson-one')
+    DetailPageFactory(parent=module_one, slug='lesson-two')
     DetailPageFactory(parent=module_two, slug='lesson-three',)
     DetailPageFactory(parent=module_two, slug='lesson-four')
-    lesson_five = DetailPageFactory(parent=module_two, slug='lesson-five')
+    DetailPageFactory(parent=module_two, slug='lesson-five')
     # create dashboard
     dashboard = DomesticDashboardFactory(parent=domestic_homepage, slug='dashboard')
 
-    mock_get_user_lesson_completed.return_value = create_response(json_body={'result': 'ok', 'lesson_completed': [
-        {'lesson': lesson_one.id},
-        {'lesson': lesson_two.id},
-    ]})
+    ReadProgress.objects.create(sso_id=str(get_request.user.pk), module=module_one, read_count=2)
 
     context_data = dashboard.get_context(get_request)
     # check the progress
@@ -214,11 +206,7 @@ def test_dashboard_page_lesson_progress(
     assert context_data['module_pages'][0]['read_count'] == 2
     assert context_data['module_pages'][1]['read_count'] == 0
 
-    mock_get_user_lesson_completed.return_value = create_response(json_body={'result': 'ok', 'lesson_completed': [
-        {'lesson': lesson_one.id},
-        {'lesson': lesson_two.id},
-        {'lesson': lesson_five.id}
-    ]})
+    ReadProgress.objects.create(sso_id=str(get_request.user.pk), module=module_two, read_count=1)
 
     context_data = dashboard.get_context(get_request)
     # the topics should swap round as two is in progress and has more unread than one
@@ -237,7 +225,6 @@ def test_dashboard_apis_ok(
     patch_get_dashboard_export_opportunities,
     patch_set_user_page_view,
     patch_get_user_page_views,
-    patch_get_user_lesson_completed,
     domestic_homepage
 ):
     patch_get_dashboard_events.stop()
@@ -315,12 +302,10 @@ def test_dashboard_apis_fail(
         patch_get_dashboard_export_opportunities,
         patch_set_user_page_view,
         patch_get_user_page_views,
-        patch_get_user_lesson_completed,
         domestic_homepage
 ):
     patch_get_dashboard_events.stop()
     patch_get_dashboard_export_opportunities.stop()
-    patch_get_user_lesson_completed.stop()
     with patch(
         'directory_api_client.api_client.personalisation.events_by_location_list'
     ) as events_api_results:
@@ -0,0 +1,149 @@
+from unittest import mock
+
+import pytest
+from requests.exceptions import Timeout
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import ReadProgress
+from domestic import helpers
+from tests.unit.core.factories import CuratedListPageFactory, DetailPageFactory, ListPageFactory
+
+
+def test_with_default_success():
+    assert helpers.with_default(lambda: [1], default=[])() == [1]
+
+
+def test_with_default_error():
+    def timeout():
+        raise Timeout()
+
+    assert helpers.with_default(timeout, default=[])() == []
+
+
+def test_get_page_visit_records_visit_after_check(user):
+    calls = []
+    with mock.patch.object(user, 'has_visited_page', side_effect=lambda page: calls.append('check') or True):
+        with mock.patch.object(user, 'set_page_view', side_effect=lambda page: calls.append('record')):
+            assert helpers.get_page_visit(user, 'dashboard') is True
+
+    assert calls == ['check', 'record']
+
+
+@mock.patch.object(helpers.core_helpers, 'get_dashboard_export_opportunities')
+@mock.patch.object(helpers.core_helpers, 'get_dashboard_events')
+def test_get_dashboard_context(
+    mock_get_dashboard_events,
+    mock_get_dashboard_export_opportunities,
+    run_tasks,
+    patch_get_user_page_views,
+    patch_set_user_page_view,
+    mock_get_company_profile,
+    user,
+):
+    mock_get_dashboard_events.return_value = [{'title': 'event'}]
+    mock_get_dashboard_export_opportunities.side_effect = Timeout()
+    mock_get_company_profile.return_value = {'expertise_industries': ['SL10001']}
+
+    context = helpers.get_dashboard_context(user, page_slug='dashboard')
+    run_tasks()
+
+    assert context == {
+        'visited_already': None,
+        'events': [{'title': 'event'}],
+        'export_opportunities': [],
+    }
+    assert patch_set_user_page_view.call_count == 1
+
+
+@pytest.mark.django_db
+def test_build_lesson_modules(domestic_homepage):
+    list_page = ListPageFactory(parent=domestic_homepage, slug='topic', record_read_progress=True)
+    module_one = CuratedListPageFactory(parent=list_page, slug='module-one')
+    module_two = CuratedListPageFactory(parent=list_page, slug='module-two')
+    lesson_one = DetailPageFactory(parent=module_one, slug='lesson-one')
+    lesson_two = DetailPageFactory(parent=module_two, slug='lesson-two')
+    lesson_three = DetailPageFactory(parent=module_one, slug='lesson-three')
+    DetailPageFactory(parent=module_one, slug='draft', live=False)
+    # not in a module
+    DetailPageFactory(parent=list_page, slug='lesson-four')
+
+    assert list(helpers.build_lesson_modules().items()) == [
+        (lesson_one.id, module_one.id), (lesson_three.id, module_one.id), (lesson_two.id, module_two.id),
+    ]
+
+
+@pytest.mark.django_db
+def test_get_read_progress_query_count(domestic_homepage, user):
+    list_page = ListPageFactory(parent=domestic_homepage, slug='topic', record_read_progress=True)
+    module = CuratedListPageFactory(parent=list_page, slug='module-one')
+    DetailPageFactory(parent=module, slug='lesson-one')
+    ReadProgress.objects.create(sso_id=str(user.pk), module=module, read_count=1)
+
+    with CaptureQueriesContext(connection) as one_lesson:
+        helpers.get_read_progress(user)
+
+    for module in [module, CuratedListPageFactory(parent=list_page, slug='module-two')]:
+        for number in range(3):
+            DetailPageFactory(parent=module, slug=f'{module.slug}-lesson-{number}')
+
+    with CaptureQueriesContext(connection) as seven_lessons:
+        progress = helpers.get_read_progress(user)
+
+    assert len(seven_lessons) == len(one_lesson)
+    assert [(module['total_pages'], module['read_count']) for module in progress['module_pages']] == [(4, 1), (3, 0)]
+    assert progress['lessons_in_progress'] is True
+
+
+@pytest.mark.django_db
+def test_lesson_modules_cached(locmem_cache, domestic_homepage, user):
+    list_page = ListPageFactory(parent=domestic_homepage, slug='topic', record_read_progress=True)
+    module = CuratedListPageFactory(parent=list_page, slug='module-one')
+    lesson = DetailPageFactory(parent=module, slug='lesson-one')
+
+    assert helpers.get_lesson_modules() == {lesson.id: module.id}
+    with CaptureQueriesContext(connection) as queries:
+        assert helpers.get_lesson_modules() == {lesson.id: module.id}
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_lesson_modules_invalidated(locmem_cache, domestic_homepage, user):
+    list_page = ListPageFactory(parent=domestic_homepage, slug='topic', record_read_progress=True)
+    module_one = CuratedListPageFactory(parent=list_page, slug='module-one')
+    module_two = CuratedListPageFactory(parent=list_page, slug='module-two')
+    lesson = DetailPageFactory(parent=module_one, slug='lesson-one')
+    draft = DetailPageFactory(parent=module_one, slug='draft', live=False)
+    assert helpers.get_lesson_modules() == {lesson.id: module_one.id}
+
+    draft.save_revision().publish()
+    assert helpers.get_lesson_modules() == {lesson.id: module_one.id, draft.id: module_one.id}
+
+    draft.refresh_from_db()
+    draft.unpublish()
+    assert helpers.get_lesson_modules() == {lesson.id: module_one.id}
+
+    lesson.move(module_two, pos='last-child')
+    assert helpers.get_lesson_modules() == {lesson.id: module_two.id}
+
+    lesson.delete()
+    assert helpers.get_lesson_modules() == {}
+
+
+@pytest.mark.django_db
+def test_get_module_read_counts(domestic_homepage, user):
+    list_page = ListPageFactory(parent=domestic_homepage, slug='topic', record_read_progress=True)
+    module_one = CuratedListPageFactory(parent=list_page, slug='module-one')
+    module_two = CuratedListPageFactory(parent=list_page, slug='module-two')
+    for number in range(3):
+        DetailPageFactory(parent=module_one, slug=f'lesson-{number}')
+    DetailPageFactory(parent=module_two, slug='lesson-four')
+    # counted before a lesson was unpublished
+    ReadProgress.objects.create(sso_id=str(user.pk), module=module_one, read_count=4)
+    ReadProgress.objects.create(sso_id='another-user', module=module_two, read_count=1)
+
+    assert helpers.get_module_read_counts(user) == {
+        module_one.pk: {'read_count': 3, 'total_pages': 3},
+        module_two.pk: {'read_count': 0, 'total_pages': 1},
+    }
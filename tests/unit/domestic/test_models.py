@@ -4,7 +4,7 @@ from unittest import mock
 
 from core import mixins
 from domestic.models import DomesticHomePage, DomesticDashboard
-from directory_sso_api_client import sso_api_client
+from core.models import ReadProgress
 from .factories import DomesticHomePageFactory, DomesticDashboardFactory
 from tests.unit.core.factories import DetailPageFactory, ListPageFactory, CuratedListPageFactory
 from tests.helpers import create_response
@@ -52,9 +52,7 @@ class DomesticDashboardTests(WagtailPageTests):
 @pytest.mark.django_db
 @mock.patch.object(api_client.personalisation, 'events_by_location_list')
 @mock.patch.object(api_client.personalisation, 'export_opportunities_by_relevance_list')
-@mock.patch.object(sso_api_client.user, 'get_user_lesson_completed')
 def test_dashboard_page_routing(
-    mock_get_user_lesson_completed,
     mock_events_by_location_list,
     mock_export_opportunities_by_relevance_list,
     patch_set_user_page_view,
@@ -70,7 +68,7 @@ def test_dashboard_page_routing(
     mock_export_opportunities_by_relevance_list.return_value = create_response(json_body={'results': []})
 
     topic_one = ListPageFactory(parent=domestic_homepage, slug='topic-one', record_read_progress=True)
-    lesson_one = DetailPageFactory(parent=topic_one, slug='lesson-one')
+    DetailPageFactory(parent=topic_one, slug='lesson-one')
 
     dashboard = DomesticDashboardFactory(
         parent=domestic_homepage,
@@ -89,7 +87,6 @@ def test_dashboard_page_routing(
         components__2__route__button={'label': 'Start planning'}
     )
     # All three routes should be visible
-    mock_get_user_lesson_completed.return_value = create_response(json_body={'result': 'ok'})
     context_data = dashboard.get_context(get_request)
     assert len(context_data['routes']) == 3
     assert context_data['routes'][0].value.get('route_type') == 'learn'
@@ -97,11 +94,8 @@ def test_dashboard_page_routing(
     # Build learning pages and set one to 'read'
     topic_one = ListPageFactory(parent=domestic_homepage, slug='topic-one', record_read_progress=True)
     section_one = CuratedListPageFactory(parent=topic_one, slug='topic-one-section-one')
-    lesson_one = DetailPageFactory(parent=section_one, slug='lesson-one')
-
-    mock_get_user_lesson_completed.return_value = create_response(json_body={'result': 'ok', 'lesson_completed': [
-        {'lesson': lesson_one.id},
-    ]})
+    DetailPageFactory(parent=section_one, slug='lesson-one')
+    ReadProgress.objects.create(sso_id=str(get_request.user.pk), module=section_one, read_count=1)
 
     # the learning one should vanish
     context_data = dashboard.get_context(get_request)
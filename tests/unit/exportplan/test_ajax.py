@@ -4,8 +4,10 @@ from freezegun import freeze_time
 from collections import OrderedDict
 
 from django.urls import reverse
+from requests.exceptions import HTTPError, Timeout
 
 from exportplan import helpers
+from tests.helpers import create_response
 
 
 @pytest.mark.django_db
@@ -196,6 +198,62 @@ def test_retrieve_marketing_country_data(mock_population_data, mock_factbook_dat
     }
 
 
+@pytest.mark.django_db
+@mock.patch.object(helpers, 'get_country_data')
+@mock.patch.object(helpers, 'get_cia_world_factbook_data')
+@mock.patch.object(helpers, 'get_population_data')
+def test_retrieve_marketing_country_data_local_population(
+    mock_population_data, mock_factbook_data, mock_country_data, client, user
+):
+    client.force_login(user)
+    mock_factbook_data.return_value = {'cia_factbook_data': {'languages': ['English']}}
+    mock_country_data.return_value = {'country_data': {'cpi': 100}}
+
+    url = reverse('exportplan:api-marketing-country-data')
+    response = client.get(url, {'country': 'Canada', 'target_age_groups': '0-14,65+'})
+
+    assert mock_population_data.call_count == 0
+    population_data = response.json()['population_data']
+    assert population_data['year'] == 2020
+    assert population_data['total_target_age_population'] == (
+        population_data['male_target_age_population'] + population_data['female_target_age_population']
+    )
+
+
+@pytest.mark.django_db
+@mock.patch.object(helpers, 'get_country_data')
+def test_market_comparison(mock_country_data, client, user):
+    client.force_login(user)
+    mock_country_data.side_effect = [
+        {'country_data': {'internet_usage': {'value': 90.0, 'year': 2019}}},
+        Timeout(),
+    ]
+
+    url = reverse('exportplan:api-market-comparison')
+    response = client.get(url, {'countries': 'United Kingdom,Narnia', 'target_age_groups': '0-14'})
+
+    assert response.status_code == 200
+    assert mock_country_data.call_args_list == [mock.call('United Kingdom'), mock.call('Narnia')]
+    united_kingdom, narnia = response.json()['countries']
+    assert united_kingdom['country'] == 'United Kingdom'
+    assert united_kingdom['total_population'] == 67888
+    assert united_kingdom['total_target_age_population'] < 67888
+    assert united_kingdom['internet_usage'] == {'value': 90.0, 'year': 2019}
+    assert narnia['total_population'] is None
+    assert narnia['internet_usage'] is None
+
+
+@pytest.mark.django_db
+def test_market_comparison_too_many_countries(client, user, settings):
+    settings.MARKET_COMPARISON_MAX_COUNTRIES = 2
+    client.force_login(user)
+
+    url = reverse('exportplan:api-market-comparison')
+    response = client.get(url, {'countries': 'France,Germany,Spain'})
+
+    assert response.status_code == 400
+
+
 @pytest.mark.django_db
 def test_retrieve_marketing_country_data_no_target_ages(client, user):
     client.force_login(user)
@@ -564,3 +622,52 @@ def test_target_market_documents_validation_create(mock_create_target_market_doc
     assert response.json() == {
         'companyexportplan': ['This field is required.']
     }
+
+
+@pytest.mark.django_db
+@mock.patch.object(helpers, 'delete_target_market_documents')
+@mock.patch.object(helpers, 'update_route_to_market')
+@mock.patch.object(helpers, 'create_objective')
+def test_batch_api_view(
+    mock_create_objective, mock_update_route_to_market, mock_delete_target_market_documents, client, user
+):
+    client.force_login(user)
+    objective = {'description': 'Some text', 'companyexportplan': 1}
+    route_to_market = {'route': 'DIRECT_SALES', 'companyexportplan': 1, 'pk': 2}
+    mock_create_objective.return_value = {'pk': 1, **objective}
+    mock_update_route_to_market.side_effect = HTTPError(response=create_response(status_code=404))
+
+    response = client.post(reverse('exportplan:api-batch'), {'operations': [
+        {'resource': 'objectives', 'action': 'create', 'data': objective},
+        {'resource': 'route_to_markets', 'action': 'update', 'data': route_to_market},
+        {'resource': 'target_market_documents', 'action': 'delete', 'data': {'pk': 3}},
+    ]}, content_type='application/json')
+
+    assert response.status_code == 200
+    assert response.json() == {'results': [
+        {'status': 200, 'data': {'pk': 1, **objective}},
+        {'status': 404, 'data': None},
+        {'status': 200, 'data': {}},
+    ]}
+    assert mock_create_objective.call_args == mock.call('123', objective)
+    assert mock_update_route_to_market.call_args == mock.call('123', route_to_market)
+    assert mock_delete_target_market_documents.call_args == mock.call('123', {'pk': 3})
+
+
+@pytest.mark.django_db
+@mock.patch.object(helpers, 'create_objective')
+def test_batch_api_view_validation(mock_create_objective, client, user):
+    client.force_login(user)
+
+    response = client.post(reverse('exportplan:api-batch'), {'operations': [
+        {'resource': 'objectives', 'action': 'create', 'data': {'description': 'Some text', 'companyexportplan': 1}},
+        {'resource': 'objectives', 'action': 'update', 'data': {'description': 'Some text', 'companyexportplan': 1}},
+        {'resource': 'objectives', 'action': 'archive', 'data': {}},
+    ]}, content_type='application/json')
+
+    assert response.status_code == 400
+    assert response.json() == {'operations': {
+        '1': {'data': {'pk': ['This field is required.']}},
+        '2': {'action': ['"archive" is not a valid choice.']},
+    }}
+    assert mock_create_objective.call_count == 0
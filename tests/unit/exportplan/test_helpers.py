@@ -2,6 +2,9 @@ from unittest import mock
 
 from directory_api_client import api_client
 import pytest
+from requests.exceptions import HTTPError
+
+from django.core.cache import cache
 
 from tests.helpers import create_response
 from exportplan import helpers
@@ -384,3 +387,126 @@ def test_get_current_url_country_required_not_in_check(mock_get_exportplan):
     mock_get_exportplan.return_value = export_plan_data
     current_url = helpers.get_current_url(slug='about-your-business', export_plan=export_plan_data)
     assert current_url.get('country_required') is None
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_update')
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_update_exportplan_by_pk(mock_exportplan_list, mock_exportplan_update, locmem_cache):
+    mock_exportplan_list.return_value = create_response([{'pk': 1, 'sectors': ['food']}])
+    mock_exportplan_update.return_value = create_response({'sectors': []})
+
+    helpers.get_exportplan('123')
+    helpers.update_exportplan_by_pk('123', {'sectors': []})
+    helpers.update_exportplan_by_pk('123', {'sectors': ['food']})
+
+    assert mock_exportplan_list.call_count == 1
+    assert mock_exportplan_update.call_args == mock.call(sso_session_id='123', id=1, data={'sectors': ['food']})
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_update')
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_update_exportplan_by_pk_unknown(mock_exportplan_list, mock_exportplan_update, locmem_cache):
+    mock_exportplan_list.return_value = create_response([{'pk': 1, 'target_markets': []}])
+    mock_exportplan_update.return_value = create_response({'sectors': []})
+
+    helpers.update_exportplan_by_pk('123', {'sectors': []})
+
+    assert mock_exportplan_list.call_count == 1
+    assert mock_exportplan_update.call_args == mock.call(sso_session_id='123', id=1, data={'sectors': []})
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_update')
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_update_exportplan_by_pk_stale(mock_exportplan_list, mock_exportplan_update, locmem_cache):
+    helpers.set_exportplan_pk('123', 1)
+    mock_exportplan_list.return_value = create_response([{'pk': 2, 'target_markets': []}])
+    mock_exportplan_update.side_effect = [create_response(status_code=404), create_response({'sectors': []})]
+
+    assert helpers.update_exportplan_by_pk('123', {'sectors': []}) == {'sectors': []}
+
+    assert mock_exportplan_list.call_count == 1
+    assert mock_exportplan_update.call_args_list[1] == mock.call(sso_session_id='123', id=2, data={'sectors': []})
+
+
+@mock.patch.object(api_client.exportplan, 'exportplan_update')
+@mock.patch.object(api_client.exportplan, 'exportplan_list')
+def test_update_exportplan_by_pk_error(mock_exportplan_list, mock_exportplan_update, locmem_cache):
+    helpers.set_exportplan_pk('123', 1)
+    mock_exportplan_update.return_value = create_response(status_code=500)
+
+    with pytest.raises(HTTPError):
+        helpers.update_exportplan_by_pk('123', {'sectors': []})
+
+    assert mock_exportplan_list.call_count == 0
+
+
+def test_exportplan_pk_key_hashes_session_id():
+    key = helpers.get_exportplan_pk_key('123')
+
+    assert '123' not in key
+    assert key == helpers.get_exportplan_pk_key('123')
+
+
+def test_set_exportplan_pk_none(locmem_cache):
+    helpers.set_exportplan_pk('123', 1)
+    helpers.set_exportplan_pk('123', None)
+
+    assert cache.get(helpers.get_exportplan_pk_key('123')) is None
+
+
+@pytest.mark.django_db
+def test_get_all_lesson_details_cached(topics_with_lessons, locmem_cache, django_assert_num_queries):
+    lessons = helpers.get_all_lesson_details()
+
+    with django_assert_num_queries(0):
+        assert helpers.get_all_lesson_details() == lessons
+
+
+@pytest.mark.django_db
+def test_lesson_catalogue_lesson_published(topics_with_lessons, locmem_cache):
+    (topic_a, [lesson_a1, _]), _ = topics_with_lessons
+    helpers.get_all_lesson_details()
+
+    lesson_a1.title = 'Lesson A1 renamed'
+    lesson_a1.slug = 'lesson-a1-renamed'
+    lesson_a1.save_revision().publish()
+
+    lessons = helpers.get_all_lesson_details()
+    assert 'lesson-a1' not in lessons
+    assert lessons['lesson-a1-renamed']['title'] == 'Lesson A1 renamed'
+    assert lessons['lesson-a1-renamed']['topic_name'] == 'Some title'
+
+
+@pytest.mark.django_db
+def test_lesson_catalogue_lesson_unpublished(topics_with_lessons, locmem_cache):
+    (topic_a, [lesson_a1, lesson_a2]), _ = topics_with_lessons
+    helpers.get_all_lesson_details()
+
+    lesson_a1.unpublish()
+    lesson_a2.delete()
+
+    assert list(helpers.get_all_lesson_details()) == ['lesson-b1']
+
+
+@pytest.mark.django_db
+def test_lesson_catalogue_module_published(topics_with_lessons, locmem_cache):
+    (topic_a, _), _ = topics_with_lessons
+    helpers.get_all_lesson_details()
+
+    topic_a.topics.stream_data[0]['value']['title'] = 'Renamed title'
+    topic_a.save_revision().publish()
+
+    lessons = helpers.get_all_lesson_details()
+    assert lessons['lesson-a1']['topic_name'] == 'Renamed title'
+    assert lessons['lesson-b1']['topic_name'] == 'Some title b'
+
+
+@pytest.mark.django_db
+def test_lesson_catalogue_lesson_moved(topics_with_lessons, locmem_cache):
+    (topic_a, [lesson_a1, _]), (topic_b, _) = topics_with_lessons
+    helpers.get_all_lesson_details()
+
+    lesson_a1.move(topic_b, pos='last-child')
+
+    # not in any of topic b's topics
+    assert helpers.get_all_lesson_details()['lesson-a1']['topic_name'] is None
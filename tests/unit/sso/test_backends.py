@@ -6,7 +6,7 @@ import pytest
 from django.contrib.auth import authenticate
 
 from sso import models
-from tests.helpers import reload_urlconf
+from tests.helpers import create_response, reload_urlconf
 from core import constants
 
 
@@ -53,6 +53,34 @@ def test_auth_ok(mock_get_session_user, sso_request, requests_mock, settings):
     assert user.profile_image == 'htts://image.com/image.png'
 
 
+@mock.patch.object(sso_api_client.user, 'get_session_user', wraps=sso_api_client.user.get_session_user)
+def test_auth_session_user_cached(mock_get_session_user, sso_request, requests_mock, settings, locmem_cache):
+    settings.AUTHENTICATION_BACKENDS = ['sso.backends.BusinessSSOUserBackend']
+    requests_mock.get(
+        'http://sso.trade.great:8003/api/v1/session-user/',
+        json={'id': 1, 'email': 'jim@example.com', 'hashed_uuid': 'thing', 'user_profile': None}
+    )
+
+    authenticate(sso_request)
+    user = authenticate(sso_request)
+
+    assert mock_get_session_user.call_count == 1
+    assert user.pk == 1
+    assert user.email == 'jim@example.com'
+    assert user.has_user_profile is False
+
+
+@mock.patch.object(sso_api_client.user, 'get_session_user')
+def test_auth_session_user_error_not_cached(mock_get_session_user, sso_request, settings, locmem_cache):
+    settings.AUTHENTICATION_BACKENDS = ['sso.backends.BusinessSSOUserBackend']
+    mock_get_session_user.return_value = create_response(status_code=500)
+
+    assert authenticate(sso_request) is None
+    assert authenticate(sso_request) is None
+
+    assert mock_get_session_user.call_count == 2
+
+
 @pytest.mark.django_db
 @mock.patch('authbroker_client.backends.AuthbrokerBackend.authenticate')
 @mock.patch('directory_sso_api_client.backends.SSOUserBackend.authenticate')
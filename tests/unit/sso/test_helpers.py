@@ -149,6 +149,59 @@ def test_get_company_profile_200(mock_profile_retrieve, patch_get_company_profil
     assert helpers.get_company_profile(123) == {'name': 'foo'}
 
 
+@mock.patch.object(api_client.company, 'profile_retrieve')
+def test_get_company_profile_cached(mock_profile_retrieve, patch_get_company_profile, locmem_cache):
+    patch_get_company_profile.stop()
+    mock_profile_retrieve.side_effect = [create_response(status_code=404), create_response({'name': 'foo'})]
+
+    assert helpers.get_company_profile.__wrapped__('123') is None
+    assert helpers.get_company_profile.__wrapped__('123') is None
+    helpers.invalidate_cached_company_profile('123')
+    assert helpers.get_company_profile.__wrapped__('123') == {'name': 'foo'}
+    assert helpers.get_company_profile.__wrapped__('123') == {'name': 'foo'}
+
+    assert mock_profile_retrieve.call_count == 2
+
+
+@mock.patch.object(api_client.company, 'profile_retrieve')
+def test_get_company_profile_invalidated_during_read(
+    mock_profile_retrieve, patch_get_company_profile, locmem_cache
+):
+    patch_get_company_profile.stop()
+
+    def profile_retrieve(sso_session_id):
+        # the profile is updated after it was read, but before the read is stored
+        helpers.invalidate_cached_company_profile(sso_session_id)
+        return create_response({'name': 'foo'})
+
+    mock_profile_retrieve.side_effect = profile_retrieve
+    helpers.invalidate_cached_company_profile('123')
+
+    helpers.get_company_profile.__wrapped__('123')
+    mock_profile_retrieve.side_effect = None
+    mock_profile_retrieve.return_value = create_response({'name': 'bar'})
+
+    assert helpers.get_company_profile.__wrapped__('123') == {'name': 'bar'}
+    assert mock_profile_retrieve.call_count == 2
+
+
+@mock.patch.object(api_client.company, 'profile_retrieve')
+def test_set_cached_company_profile(mock_profile_retrieve, patch_get_company_profile, locmem_cache):
+    patch_get_company_profile.stop()
+    mock_profile_retrieve.return_value = create_response({'name': 'foo'})
+    helpers.get_company_profile.__wrapped__('123')
+
+    # an update the task worker has not made yet
+    helpers.set_cached_company_profile('123', {'name': 'bar'})
+    assert helpers.get_company_profile.__wrapped__('123') == {'name': 'bar'}
+    assert mock_profile_retrieve.call_count == 1
+
+    # made, and read back from the API
+    mock_profile_retrieve.return_value = create_response({'name': 'baz'})
+    helpers.invalidate_cached_company_profile('123')
+    assert helpers.get_company_profile.__wrapped__('123') == {'name': 'baz'}
+
+
 @mock.patch.object(sso_api_client.user, 'get_session_user')
 def test_get_user_profile(mock_get_session_user):
     mock_get_session_user.return_value = create_response(status_code=200, json_body=test_response)
@@ -175,6 +228,31 @@ def test_update_user_profile_fail(mock_update_user_profile):
         helpers.update_user_profile(123, {})
 
 
+def test_session_user_cache_key_hashes_session_id():
+    assert '123' not in helpers.get_session_user_cache_key('123')
+    assert helpers.get_session_user_cache_key('123') != helpers.get_session_user_cache_key('124')
+
+
+@mock.patch.object(sso_api_client.user, 'get_session_user')
+def test_get_user_profile_cached(mock_get_session_user, locmem_cache):
+    mock_get_session_user.return_value = create_response(status_code=200, json_body=test_response)
+
+    assert helpers.get_user_profile('123') == test_response
+    assert helpers.get_user_profile.__wrapped__('123') == test_response
+
+    assert mock_get_session_user.call_count == 1
+
+
+@mock.patch.object(sso_api_client.user, 'update_user_profile')
+def test_update_user_profile_invalidates_session_user(mock_update_user_profile, locmem_cache):
+    helpers.set_cached_session_user('123', test_response)
+    mock_update_user_profile.return_value = create_response(status_code=200, json_body=test_response)
+
+    helpers.update_user_profile('123', {})
+
+    assert helpers.get_cached_session_user('123') is None
+
+
 @mock.patch.object(sso_api_client.user, 'set_user_page_view')
 def test_set_user_page_view(mock_set_user_page_view, user):
     test_response = create_response(status_code=200, json_body={'result': 'ok'})
@@ -5,9 +5,11 @@ import pytest
 from django.conf import settings
 from django.urls import reverse
 
+from core.circuit_breaker import CircuitBreakerOpen
 from sso import helpers
 from tests.helpers import create_response
 from requests.cookies import RequestsCookieJar
+from requests.exceptions import ConnectTimeout
 
 
 @pytest.mark.django_db
@@ -63,6 +65,32 @@ def test_business_sso_logout(client, requests_mock):
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+def test_business_sso_logout_invalidates_session_user(client, requests_mock, settings, locmem_cache):
+    helpers.set_cached_session_user('123', {'id': 1, 'email': 'jim@example.com', 'hashed_uuid': 'thing'})
+    requests_mock.post(settings.SSO_PROXY_LOGOUT_URL, status_code=302)
+    client.cookies[settings.SSO_SESSION_COOKIE] = '123'
+
+    client.post(reverse('sso:business-sso-logout-api'), {})
+
+    assert helpers.get_cached_session_user('123') is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('error', (ConnectTimeout, CircuitBreakerOpen))
+@mock.patch('django.contrib.auth.logout')
+def test_business_sso_logout_upstream_unavailable(mock_logout, error, client, requests_mock):
+    requests_mock.post(settings.SSO_PROXY_LOGOUT_URL, exc=error)
+    client.cookies[settings.SSO_SESSION_COOKIE] = '123'
+
+    response = client.post(reverse('sso:business-sso-logout-api'), {})
+
+    assert response.status_code == 200
+    assert mock_logout.call_count == 1
+    assert response.cookies[settings.SSO_SESSION_COOKIE].value == ''
+    assert response.cookies[settings.SSO_SESSION_COOKIE]['max-age'] == 0
+
+
 @pytest.mark.django_db
 @mock.patch.object(helpers, 'create_user')
 @mock.patch.object(helpers, 'send_verification_code_email')
@@ -122,5 +150,5 @@ def test_business_sso_verify_code_valid(mock_send_welcome_notification, mock_che
     assert response.status_code == 200
     assert mock_check_verification_code.call_count == 1
     assert mock_check_verification_code.call_args == mock.call(email=data['email'], code=data['code'])
-    assert mock_send_welcome_notification.call_count == 1
-    assert mock_send_welcome_notification.call_args == mock.call(email=data['email'], form_url=url)
+    assert mock_send_welcome_notification.enqueue.call_count == 1
+    assert mock_send_welcome_notification.enqueue.call_args == mock.call(email=data['email'], form_url=url)